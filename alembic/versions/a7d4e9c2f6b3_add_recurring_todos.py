@@ -0,0 +1,43 @@
+"""add recurrence rules to todos and stored todo occurrences
+
+Revision ID: a7d4e9c2f6b3
+Revises: f3c8a2d6b4e1
+Create Date: 2026-10-19 15:11:08.204663
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e9c2f6b3'
+down_revision: Union[str, None] = 'f3c8a2d6b4e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('recurrence', sa.String(), nullable=True))
+    op.add_column('todos', sa.Column('recurrence_interval', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('todos', sa.Column('recurrence_until', sa.Date(), nullable=True))
+    op.create_table('todo_occurrences',
+    sa.Column('todo_id', sa.Integer(), nullable=False),
+    sa.Column('occurrence_date', sa.Date(), nullable=False),
+    sa.Column('is_completed', sa.Boolean(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('priority', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['todo_id'], ['todos.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('todo_id', 'occurrence_date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('todo_occurrences')
+    op.drop_column('todos', 'recurrence_until')
+    op.drop_column('todos', 'recurrence_interval')
+    op.drop_column('todos', 'recurrence')
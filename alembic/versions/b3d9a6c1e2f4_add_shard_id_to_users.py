@@ -0,0 +1,28 @@
+"""add shard_id to users
+
+Revision ID: b3d9a6c1e2f4
+Revises: 4ff60e313afb
+Create Date: 2026-10-19 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9a6c1e2f4'
+down_revision: Union[str, None] = '4ff60e313afb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('shard_id', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index(op.f('ix_users_shard_id'), 'users', ['shard_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_shard_id'), table_name='users')
+    op.drop_column('users', 'shard_id')
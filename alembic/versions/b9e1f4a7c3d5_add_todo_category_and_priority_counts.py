@@ -0,0 +1,53 @@
+"""add per-user todo category and priority counts
+
+Revision ID: b9e1f4a7c3d5
+Revises: a7d4e9c2f6b3
+Create Date: 2026-10-19 16:24:50.771302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e1f4a7c3d5'
+down_revision: Union[str, None] = 'a7d4e9c2f6b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('todo_categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('todo_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'name', name='uq_todo_categories_owner_id_name')
+    )
+    op.create_index(op.f('ix_todo_categories_id'), 'todo_categories', ['id'], unique=False)
+    op.create_table('todo_priority_counts',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.String(), nullable=False),
+    sa.Column('todo_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id', 'priority')
+    )
+
+    op.execute(
+        "INSERT INTO todo_categories (owner_id, name, todo_count) "
+        "SELECT owner_id, category, count(id) FROM todos WHERE category IS NOT NULL GROUP BY owner_id, category"
+    )
+    op.execute(
+        "INSERT INTO todo_priority_counts (owner_id, priority, todo_count) "
+        "SELECT owner_id, priority, count(id) FROM todos WHERE priority IS NOT NULL GROUP BY owner_id, priority"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('todo_priority_counts')
+    op.drop_index(op.f('ix_todo_categories_id'), table_name='todo_categories')
+    op.drop_table('todo_categories')
@@ -0,0 +1,34 @@
+"""add subtask parent and cached child counts to todos
+
+Revision ID: c2f7a5e8d1b4
+Revises: b9e1f4a7c3d5
+Create Date: 2026-10-19 17:03:12.448190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a5e8d1b4'
+down_revision: Union[str, None] = 'b9e1f4a7c3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('todos', sa.Column('child_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('todos', sa.Column('completed_child_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_foreign_key('todos_parent_id_fkey', 'todos', 'todos', ['parent_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_todos_parent_id'), 'todos', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_todos_parent_id'), table_name='todos')
+    op.drop_constraint('todos_parent_id_fkey', 'todos', type_='foreignkey')
+    op.drop_column('todos', 'completed_child_count')
+    op.drop_column('todos', 'child_count')
+    op.drop_column('todos', 'parent_id')
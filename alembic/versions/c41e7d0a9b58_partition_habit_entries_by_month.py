@@ -0,0 +1,101 @@
+"""partition habit_entries by month and add habit_entry_archive
+
+Revision ID: c41e7d0a9b58
+Revises: b3d9a6c1e2f4
+Create Date: 2026-10-19 11:02:17.390114
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7d0a9b58'
+down_revision: Union[str, None] = 'b3d9a6c1e2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'habit_entry_archive',
+        sa.Column('habit_id', sa.Integer(), sa.ForeignKey('habits.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('entry_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_entries', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_total', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.create_index('ix_habit_entries_habit_id_date', 'habit_entries', ['habit_id', 'date'], unique=False)
+        return
+
+    # Partition keys must be part of the primary key, so it becomes (id, date).
+    # The id sequence is kept and handed over to the new table.
+    op.execute("ALTER TABLE habit_entries RENAME TO habit_entries_unpartitioned")
+    op.execute("ALTER INDEX IF EXISTS habit_entries_pkey RENAME TO habit_entries_unpartitioned_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_habit_entries_id RENAME TO ix_habit_entries_unpartitioned_id")
+    op.execute("""
+        CREATE TABLE habit_entries (
+            id integer NOT NULL DEFAULT nextval('habit_entries_id_seq'),
+            completed_count integer,
+            notes text,
+            date timestamp with time zone NOT NULL DEFAULT CURRENT_DATE,
+            habit_id integer NOT NULL REFERENCES habits (id),
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("ALTER SEQUENCE habit_entries_id_seq OWNED BY habit_entries.id")
+    op.execute("CREATE INDEX ix_habit_entries_id ON habit_entries (id)")
+    op.execute("CREATE INDEX ix_habit_entries_habit_id_date ON habit_entries (habit_id, date)")
+    op.execute("CREATE TABLE habit_entries_default PARTITION OF habit_entries DEFAULT")
+
+    oldest = bind.execute(sa.text("SELECT min(date) FROM habit_entries_unpartitioned")).scalar()
+    current = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE habit_entries_y{month.year}m{month.month:02d} PARTITION OF habit_entries "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        month = following
+
+    op.execute("INSERT INTO habit_entries SELECT id, completed_count, notes, date, habit_id FROM habit_entries_unpartitioned")
+    op.execute("DROP TABLE habit_entries_unpartitioned")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE habit_entries RENAME TO habit_entries_partitioned")
+        op.execute("ALTER INDEX IF EXISTS ix_habit_entries_id RENAME TO ix_habit_entries_partitioned_id")
+        op.execute("""
+            CREATE TABLE habit_entries (
+                id integer NOT NULL DEFAULT nextval('habit_entries_id_seq') PRIMARY KEY,
+                completed_count integer,
+                notes text,
+                date timestamp with time zone NOT NULL DEFAULT CURRENT_DATE,
+                habit_id integer NOT NULL REFERENCES habits (id)
+            )
+        """)
+        op.execute("ALTER SEQUENCE habit_entries_id_seq OWNED BY habit_entries.id")
+        op.execute("CREATE INDEX ix_habit_entries_id ON habit_entries (id)")
+        op.execute("INSERT INTO habit_entries SELECT id, completed_count, notes, date, habit_id FROM habit_entries_partitioned")
+        op.execute("DROP TABLE habit_entries_partitioned")
+    else:
+        op.drop_index('ix_habit_entries_habit_id_date', table_name='habit_entries')
+
+    op.drop_table('habit_entry_archive')
@@ -0,0 +1,54 @@
+"""add indexes backing the allowed list sort keys
+
+Revision ID: d8b3e6f1a9c7
+Revises: c2f7a5e8d1b4
+Create Date: 2026-10-19 18:21:40.517362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3e6f1a9c7'
+down_revision: Union[str, None] = 'c2f7a5e8d1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (table, columns)
+INDEXES = {
+    'ix_todos_owner_id_created_at': ('todos', ['owner_id', 'created_at', 'id']),
+    'ix_todos_owner_id_due_date': ('todos', ['owner_id', 'due_date', 'id']),
+    'ix_todos_owner_id_title': ('todos', ['owner_id', 'title', 'id']),
+    'ix_todos_created_at': ('todos', ['created_at', 'id']),
+    'ix_todos_title': ('todos', ['title', 'id']),
+    'ix_habits_owner_id_created_at': ('habits', ['owner_id', 'created_at', 'id']),
+    'ix_habits_owner_id_name': ('habits', ['owner_id', 'name', 'id']),
+    'ix_habits_created_at': ('habits', ['created_at', 'id']),
+    'ix_pomodoro_sessions_owner_id_created_at': ('pomodoro_sessions', ['owner_id', 'created_at', 'id']),
+    'ix_users_created_at': ('users', ['created_at', 'id']),
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, (table, columns) in INDEXES.items():
+            op.create_index(name, table, columns, unique=False)
+        return
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot
+    # run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, (table, columns) in INDEXES.items():
+            op.drop_index(name, table_name=table)
+        return
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
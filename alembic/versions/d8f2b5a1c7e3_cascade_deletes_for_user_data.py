@@ -0,0 +1,46 @@
+"""on delete cascade for user data foreign keys
+
+Revision ID: d8f2b5a1c7e3
+Revises: c41e7d0a9b58
+Create Date: 2026-10-19 11:48:52.617204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2b5a1c7e3'
+down_revision: Union[str, None] = 'c41e7d0a9b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table); constraint names are Postgres' defaults
+FOREIGN_KEYS = [
+    ('todos', 'owner_id', 'users'),
+    ('habits', 'owner_id', 'users'),
+    ('pomodoro_sessions', 'owner_id', 'users'),
+    ('habit_entries', 'habit_id', 'habits'),
+    ('habit_entry_archive', 'habit_id', 'habits'),
+]
+
+
+def _recreate(ondelete) -> None:
+    for table, column, referenced in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referenced, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    # SQLite cannot alter constraints in place; its tables get the cascades from
+    # the models when created, and app.database turns on PRAGMA foreign_keys
+    if op.get_bind().dialect.name == 'postgresql':
+        _recreate('CASCADE')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _recreate(None)
@@ -0,0 +1,85 @@
+"""add habit_year_calendars
+
+Revision ID: e3a9c6f2b7d4
+Revises: d8b3e6f1a9c7
+Create Date: 2026-10-19 22:47:05.118630
+
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c6f2b7d4'
+down_revision: Union[str, None] = 'd8b3e6f1a9c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'habit_year_calendars',
+        sa.Column('habit_id', sa.Integer(), sa.ForeignKey('habits.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('year', sa.Integer(), primary_key=True),
+        sa.Column('days', sa.LargeBinary(46), nullable=False),
+    )
+    _fill_calendars()
+
+
+# Snapshots of the tables at this revision, so the backfill does not depend on
+# the app's current models
+habits = sa.table('habits', sa.column('id', sa.Integer))
+habit_entries = sa.table(
+    'habit_entries',
+    sa.column('habit_id', sa.Integer), sa.column('date', sa.DateTime), sa.column('completed_count', sa.Integer),
+)
+habit_entry_archive = sa.table(
+    'habit_entry_archive',
+    sa.column('habit_id', sa.Integer), sa.column('day', sa.Date), sa.column('completed_entries', sa.Integer),
+)
+habit_year_calendars = sa.table(
+    'habit_year_calendars',
+    sa.column('habit_id', sa.Integer), sa.column('year', sa.Integer), sa.column('days', sa.LargeBinary),
+)
+
+
+def _fill_calendars(chunk_size: int = 1000) -> None:
+    """Set a bit per day with a completed entry, live or archived, ``chunk_size`` habits at a time.
+
+    Same layout as app/utils/habit_calendar.py: bit n of the little-endian
+    46-byte ``days`` is day n + 1 of the year.
+    """
+    bind = op.get_bind()
+    after = 0
+    while True:
+        ids = bind.execute(
+            sa.select(habits.c.id).where(habits.c.id > after).order_by(habits.c.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return
+        days = sa.union(
+            sa.select(habit_entries.c.habit_id, sa.func.date(habit_entries.c.date))
+            .where(habit_entries.c.habit_id.between(ids[0], ids[-1]), habit_entries.c.completed_count > 0),
+            sa.select(habit_entry_archive.c.habit_id, habit_entry_archive.c.day)
+            .where(habit_entry_archive.c.habit_id.between(ids[0], ids[-1]),
+                   habit_entry_archive.c.completed_entries > 0),
+        )
+        years = defaultdict(int)
+        for habit_id, day in bind.execute(days):
+            # date() comes back as a string on SQLite
+            day = date.fromisoformat(day) if isinstance(day, str) else day
+            years[(habit_id, day.year)] |= 1 << (day.timetuple().tm_yday - 1)
+        if years:
+            op.bulk_insert(habit_year_calendars, [
+                {'habit_id': habit_id, 'year': year, 'days': bits.to_bytes(46, 'little')}
+                for (habit_id, year), bits in years.items()
+            ])
+        after = ids[-1]
+
+
+def downgrade() -> None:
+    op.drop_table('habit_year_calendars')
@@ -0,0 +1,47 @@
+"""trigram and prefix indexes for admin user search
+
+Revision ID: e5a7c3f9d1b2
+Revises: d8f2b5a1c7e3
+Create Date: 2026-10-19 12:30:05.118472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c3f9d1b2'
+down_revision: Union[str, None] = 'd8f2b5a1c7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('email', 'username', 'full_name')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps users writable while the indexes build; it cannot run
+    # inside the migration's transaction
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_{column}_trgm "
+                f"ON users USING gin ({column} gin_trgm_ops)"
+            )
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_{column}_prefix "
+                f"ON users (lower({column}) text_pattern_ops)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_users_{column}_prefix")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_users_{column}_trgm")
@@ -0,0 +1,93 @@
+"""add users.timezone and indexed local date columns
+
+Revision ID: f1b8d4c6a2e9
+Revises: e3a9c6f2b7d4
+Create Date: 2026-10-19 23:58:12.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b8d4c6a2e9'
+down_revision: Union[str, None] = 'e3a9c6f2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> local date columns
+COLUMNS = {
+    'habit_entries': ['local_date'],
+    'todos': ['created_local_date', 'completed_local_date'],
+    'todo_occurrences': ['completed_local_date'],
+    'pomodoro_sessions': ['created_local_date'],
+}
+
+# name -> (table, columns)
+INDEXES = {
+    'ix_todos_owner_id_created_local_date': ('todos', ['owner_id', 'created_local_date']),
+    'ix_todos_owner_id_completed_local_date': ('todos', ['owner_id', 'completed_local_date']),
+    'ix_pomodoro_sessions_owner_id_created_local_date': ('pomodoro_sessions', ['owner_id', 'created_local_date']),
+}
+ENTRY_INDEX = 'ix_habit_entries_habit_id_local_date'
+
+
+def _partitions(bind):
+    return bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST('habit_entries' AS regclass)"
+    )).scalars().all()
+
+
+def upgrade() -> None:
+    # None of these rewrite the tables (a constant default does not on Postgres
+    # 11+); existing rows get their local dates from
+    # python -m app.utils.local_dates backfill
+    op.add_column('users', sa.Column('timezone', sa.String(), nullable=False, server_default='UTC'))
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            op.add_column(table, sa.Column(column, sa.Date(), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        for name, (table, columns) in INDEXES.items():
+            op.create_index(name, table, columns, unique=False)
+        op.create_index(ENTRY_INDEX, 'habit_entries', ['habit_id', 'local_date'], unique=False)
+        return
+
+    partitions = _partitions(bind)
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot
+    # run inside the migration's transaction, nor on a partitioned table, whose
+    # index is made from one built concurrently on every partition
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        if not partitions:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {ENTRY_INDEX} ON habit_entries (habit_id, local_date)")
+            return
+        op.execute(f"CREATE INDEX IF NOT EXISTS {ENTRY_INDEX} ON ONLY habit_entries (habit_id, local_date)")
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_habit_id_local_date_idx "
+                f"ON {partition} (habit_id, local_date)"
+            )
+            op.execute(f"ALTER INDEX {ENTRY_INDEX} ATTACH PARTITION {partition}_habit_id_local_date_idx")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index(ENTRY_INDEX, table_name='habit_entries')
+        for name, (table, columns) in INDEXES.items():
+            op.drop_index(name, table_name=table)
+    else:
+        with op.get_context().autocommit_block():
+            for name in INDEXES:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        # Takes the partitions' indexes with it
+        op.execute(f"DROP INDEX IF EXISTS {ENTRY_INDEX}")
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            op.drop_column(table, column)
+    op.drop_column('users', 'timezone')
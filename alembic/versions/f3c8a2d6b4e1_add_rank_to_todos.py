@@ -0,0 +1,63 @@
+"""add fractional rank to todos for manual ordering
+
+Revision ID: f3c8a2d6b4e1
+Revises: e5a7c3f9d1b2
+Create Date: 2026-10-19 14:02:41.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a2d6b4e1'
+down_revision: Union[str, None] = 'e5a7c3f9d1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def evenly_spaced_keys(count):
+    # A copy of app.utils.ranking.evenly_spaced_keys as of this revision, so the
+    # migration keeps producing the same keys whatever happens to the app code
+    width = 1
+    while len(ALPHABET) ** width < 2 * (count + 1):
+        width += 1
+    step = len(ALPHABET) ** width // (count + 1)
+    keys = []
+    for n in range(1, count + 1):
+        value, digits = n * step, []
+        for _ in range(width):
+            value, digit = divmod(value, len(ALPHABET))
+            digits.append(ALPHABET[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.add_column('todos', sa.Column('rank', sa.String().with_variant(sa.String(collation='C'), 'postgresql'), nullable=True))
+
+    # Existing lists keep the order they were shown in: newest first
+    todos = sa.table('todos', sa.column('id', sa.Integer), sa.column('owner_id', sa.Integer),
+                     sa.column('created_at', sa.DateTime), sa.column('rank', sa.String))
+    owner_ids = bind.execute(sa.select(todos.c.owner_id).distinct()).scalars().all()
+    for owner_id in owner_ids:
+        ids = bind.execute(
+            sa.select(todos.c.id).where(todos.c.owner_id == owner_id)
+            .order_by(todos.c.created_at.desc(), todos.c.id.desc())
+        ).scalars().all()
+        bind.execute(
+            todos.update().where(todos.c.id == sa.bindparam('todo_id')).values(rank=sa.bindparam('new_rank')),
+            [{'todo_id': todo_id, 'new_rank': key} for todo_id, key in zip(ids, evenly_spaced_keys(len(ids)))],
+        )
+
+    op.create_index('ix_todos_owner_id_rank', 'todos', ['owner_id', 'rank', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_owner_id_rank', table_name='todos')
+    op.drop_column('todos', 'rank')
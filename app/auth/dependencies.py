@@ -3,7 +3,9 @@ from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
+from app.utils.local_dates import use_timezone
 from app.utils.security import verify_token
+from app.sharding import shard_router
 
 security = HTTPBearer()
 
@@ -25,6 +27,10 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
     
+    # Point this request's session at the user's shard for their own data
+    shard_router.bind_user(db, user)
+    # Rows written in this request get their local dates in the user's timezone
+    use_timezone(db, user.timezone)
     return user
 
 async def get_current_active_user(
@@ -1,11 +1,17 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Optional
 
 
 
 
 class Settings(BaseSettings):
     database_url:str
+    # Optional read replica; writers are pinned to the primary for a short window
+    database_replica_url:Optional[str]=None
+    read_your_writes_seconds:float=5
+    # Per-user data shards, by index (see app/sharding.py); empty means one database
+    shard_urls:List[str]=[]
 
     secret_key:str
     algorithm:str='HS256'
@@ -29,6 +35,22 @@ class Settings(BaseSettings):
     app_url:str='http://localhost:3000'  # Frontend URL
     debug:bool=False
 
+    # SQL diagnostics (see app/utils/query_monitor.py)
+    query_diagnostics_enabled:bool=True
+    slow_query_ms:float=200
+    n_plus_one_threshold:int=10
+    query_strict_mode:bool=False
+
+    # Background jobs (see app/jobs); eager runs them in-process, without a worker
+    jobs_broker_url:Optional[str]=None  # defaults to redis_url
+    jobs_eager:bool=False
+    jobs_max_retries:int=5
+    jobs_retry_backoff_max:int=600  # seconds
+    reconcile_streaks_hour:int=0  # UTC hour of the nightly streak reconciliation
+
+    # Responses (JSON or MessagePack) at least this large are gzipped for clients that accept it
+    gzip_minimum_size:int=1024
+
     class Config:
         env_file='.env'
 
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine,MetaData
+import sqlite3
+from fastapi import Depends, Request
+from sqlalchemy import create_engine,event,MetaData
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import get_settings
+from app.utils.read_routing import primary_pins, request_subject
 
 settings = get_settings()
 
@@ -10,9 +14,42 @@ SessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=engine)
 Base=declarative_base()
 
 
+# SQLite only enforces foreign keys (and their ON DELETE CASCADE) when asked to
+@event.listens_for(Engine,"connect")
+def _enable_sqlite_foreign_keys(dbapi_connection,connection_record):
+    if isinstance(dbapi_connection,sqlite3.Connection):
+        cursor=dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Optional read replica for analytics and list endpoints (see get_read_db)
+replica_engine=create_engine(settings.database_replica_url) if settings.database_replica_url else None
+ReadSessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=replica_engine) if replica_engine else None
+
+
 def get_db():
     db=SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """Session for read-only routes: the replica when one is configured.
+
+    Falls back to the primary session (``db``, which stays unused otherwise)
+    when there is no replica, the caller wrote recently and is pinned, or
+    per-user data is sharded (shards have no replicas configured).
+    """
+    from app.sharding import shard_router
+
+    if (ReadSessionLocal is None or shard_router.enabled
+            or primary_pins.is_pinned(request_subject(request.headers))):
+        yield db
+        return
+    read_db=ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
@@ -0,0 +1,23 @@
+"""Background jobs: work that does not need to finish before the response.
+
+Jobs are plain functions registered with ``@job`` (see ``app/jobs/tasks.py``)
+and queued with ``.delay(...)``. They run on a Celery worker that takes them
+from a Redis list (``JOBS_BROKER_URL``, defaulting to ``REDIS_URL``)::
+
+    celery -A app.jobs.celery_app worker --loglevel=info
+
+A job that raises is retried with exponential backoff and jitter, up to
+``JOBS_MAX_RETRIES`` times; when it still fails it is recorded on the
+dead-letter list. Wait and run times, outcome counts, the queue depth and the
+dead letters are reported by ``GET /admin/jobs/metrics`` (``app/jobs/metrics.py``).
+
+With ``JOBS_EAGER=true`` (the test suite, local runs without a worker) jobs run
+in-process when queued, retries included but without the delays, and metrics
+are kept in memory.
+
+Celery is only imported when the first job is queued, so importing the app
+stays cheap.
+"""
+from app.jobs.core import Job, job
+
+__all__ = ["Job", "job"]
@@ -0,0 +1,77 @@
+"""The Celery application behind ``Job.delay``; also the worker's entry point.
+
+    celery -A app.jobs.celery_app worker --loglevel=info
+
+Scheduled jobs are queued by one beat process::
+
+    celery -A app.jobs.celery_app beat --loglevel=info
+"""
+import time
+
+from celery import Celery, Task
+from celery.schedules import crontab
+
+from app.config import get_settings
+from app.jobs import metrics
+from app.jobs.core import QUEUE, REGISTRY, eager
+from app.jobs.tasks import reconcile_habit_streaks  # also registers the other jobs
+
+settings = get_settings()
+
+
+class JobTask(Task):
+    """Records wait and run times, outcomes and dead letters for every job."""
+
+    def before_start(self, task_id, args, kwargs):
+        self.request.started_at = time.perf_counter()
+        enqueued_at = self.request.get("enqueued_at")
+        # Retries are scheduled with a countdown, so only the first attempt's wait is queueing time
+        if enqueued_at and not self.request.retries:
+            metrics.record_wait(self.name, max(0.0, time.time() - enqueued_at))
+
+    def _run_seconds(self) -> float:
+        started_at = getattr(self.request, "started_at", None)
+        return time.perf_counter() - started_at if started_at else 0.0
+
+    def on_success(self, retval, task_id, args, kwargs):
+        metrics.record_outcome(self.name, "succeeded", self._run_seconds())
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        metrics.record_outcome(self.name, "retried", self._run_seconds())
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        metrics.record_outcome(self.name, "failed", self._run_seconds())
+        metrics.dead_letter(self.name, task_id, args, kwargs, exc, self.request.retries)
+
+
+celery_app = Celery("app", broker=settings.jobs_broker_url or settings.redis_url)
+celery_app.conf.update(
+    task_always_eager=eager(),
+    task_default_queue=QUEUE,
+    task_ignore_result=True,
+    task_serializer="json",
+    accept_content=["json"],
+    # A job is acknowledged once it finishes, so a worker that dies mid-job
+    # leaves it to be delivered again
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    broker_connection_retry_on_startup=True,
+    beat_schedule={
+        "reconcile-habit-streaks": {
+            "task": reconcile_habit_streaks.name,
+            "schedule": crontab(hour=settings.reconcile_streaks_hour, minute=0),
+        },
+    },
+)
+
+for registered in REGISTRY.values():
+    celery_app.task(
+        name=registered.name,
+        base=JobTask,
+        autoretry_for=registered.retry_for,
+        max_retries=settings.jobs_max_retries if registered.max_retries is None else registered.max_retries,
+        retry_backoff=True,  # 1s, 2s, 4s, ... with full jitter
+        retry_backoff_max=settings.jobs_retry_backoff_max,
+        retry_jitter=True,
+    )(registered.fn)
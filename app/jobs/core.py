@@ -0,0 +1,57 @@
+"""Job registration, kept free of Celery imports."""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.jobs")
+
+QUEUE = "jobs"
+REGISTRY: Dict[str, "Job"] = {}
+
+
+def eager() -> bool:
+    return get_settings().jobs_eager
+
+
+@dataclass(frozen=True)
+class Job:
+    fn: Callable
+    name: str
+    max_retries: Optional[int] = None  # None means JOBS_MAX_RETRIES
+    retry_for: Tuple[Type[BaseException], ...] = (Exception,)
+
+    def __call__(self, *args, **kwargs):
+        """Run the job inline, without the queue."""
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue the job; with ``JOBS_EAGER`` it runs before this returns."""
+        from app.jobs.celery_app import celery_app
+
+        return celery_app.tasks[self.name].apply_async(args, kwargs, headers={"enqueued_at": time.time()})
+
+    def delay_after_commit(self, *args, **kwargs) -> bool:
+        """Queue follow-up work of a write that is already committed.
+
+        The write stands even if the broker is unreachable, so the error is
+        logged rather than raised (failing the request would invite a retry
+        that repeats the write). Only for jobs whose work a later job also
+        covers, such as the nightly streak reconciliation.
+        """
+        try:
+            self.delay(*args, **kwargs)
+            return True
+        except Exception:
+            logger.exception("Could not queue %s%r", self.name, args)
+            return False
+
+
+def job(max_retries: Optional[int] = None, retry_for: Tuple[Type[BaseException], ...] = (Exception,)):
+    def register(fn: Callable) -> Job:
+        registered = Job(fn, f"{fn.__module__}.{fn.__name__}", max_retries, retry_for)
+        REGISTRY[registered.name] = registered
+        return registered
+    return register
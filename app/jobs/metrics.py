@@ -0,0 +1,160 @@
+"""Job metrics and the dead-letter list.
+
+Workers and the API are separate processes, so both write to and read from
+Redis: a hash of outcome counts per job, capped lists of recent wait and run
+times per job, and the dead-letter list of jobs that failed after their last
+retry. In eager mode there is no worker and everything runs in this process,
+so the same data is kept in memory instead. Recording is best effort: a
+metrics failure is logged and never fails the job.
+"""
+import json
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.config import get_settings
+from app.jobs.core import QUEUE, REGISTRY, eager
+
+logger = logging.getLogger("app.jobs")
+
+DEAD_LETTER_KEY = "jobs:dead_letter"
+DEAD_LETTER_KEEP = 1000
+SAMPLES_KEEP = 1000
+OUTCOMES = ("succeeded", "retried", "failed")
+
+
+class MemoryStore:
+    def __init__(self):
+        self.lists: Dict[str, List[str]] = defaultdict(list)
+        self.hashes: Dict[str, Counter] = defaultdict(Counter)
+
+    def push(self, key: str, value: str, keep: int):
+        values = self.lists[key]
+        values.insert(0, value)
+        del values[keep:]
+
+    def items(self, key: str, count: int) -> List[str]:
+        return self.lists[key][:count]
+
+    def length(self, key: str) -> int:
+        return len(self.lists[key])
+
+    def incr(self, key: str, field: str, amount: int = 1):
+        self.hashes[key][field] += amount
+
+    def counts(self, key: str) -> Dict[str, int]:
+        return dict(self.hashes[key])
+
+    def queue_depth(self) -> int:
+        return 0
+
+    def clear(self):
+        self.lists.clear()
+        self.hashes.clear()
+
+
+class RedisStore:
+    def __init__(self, client, broker):
+        self.client = client
+        self.broker = broker
+
+    def push(self, key: str, value: str, keep: int):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lpush(key, value)
+        pipe.ltrim(key, 0, keep - 1)
+        pipe.execute()
+
+    def items(self, key: str, count: int) -> List[str]:
+        return [value.decode() for value in self.client.lrange(key, 0, count - 1)]
+
+    def length(self, key: str) -> int:
+        return self.client.llen(key)
+
+    def incr(self, key: str, field: str, amount: int = 1):
+        self.client.hincrby(key, field, amount)
+
+    def counts(self, key: str) -> Dict[str, int]:
+        return {field.decode(): int(value) for field, value in self.client.hgetall(key).items()}
+
+    def queue_depth(self) -> int:
+        # Celery's Redis transport keeps each queue as a list named after it
+        return self.broker.llen(QUEUE)
+
+
+@lru_cache
+def get_store():
+    if eager():
+        return MemoryStore()
+    import redis
+
+    from app.utils.redis_client import get_redis
+
+    settings = get_settings()
+    broker_url = settings.jobs_broker_url or settings.redis_url
+    broker = get_redis() if broker_url == settings.redis_url else redis.from_url(broker_url)
+    return RedisStore(get_redis(), broker)
+
+
+def _best_effort(action: str, fn, *args):
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.warning("Could not record %s: %s", action, e)
+
+
+def record_wait(name: str, seconds: float):
+    _best_effort("job wait time", get_store().push, f"jobs:wait_ms:{name}", f"{seconds * 1000:.3f}", SAMPLES_KEEP)
+
+
+def record_outcome(name: str, outcome: str, run_seconds: float):
+    store = get_store()
+    _best_effort("job outcome", store.incr, f"jobs:stats:{name}", outcome)
+    _best_effort("job run time", store.push, f"jobs:run_ms:{name}", f"{run_seconds * 1000:.3f}", SAMPLES_KEEP)
+
+
+def dead_letter(name: str, task_id: str, args: Sequence, kwargs: Dict[str, Any], exc: BaseException,
+                retries: int):
+    entry = json.dumps({
+        "job": name, "id": task_id, "args": list(args), "kwargs": kwargs,
+        "error": repr(exc), "retries": retries, "failed_at": time.time(),
+    }, default=str)
+    logger.error("Job %s failed after %s retries: %s", name, retries, entry)
+    _best_effort("dead letter", get_store().push, DEAD_LETTER_KEY, entry, DEAD_LETTER_KEEP)
+
+
+def dead_letters(count: int = 20) -> List[Dict[str, Any]]:
+    return [json.loads(entry) for entry in get_store().items(DEAD_LETTER_KEY, count)]
+
+
+def _percentile(samples: Sequence[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def snapshot(recent_dead_letters: int = 20) -> Dict[str, Any]:
+    """Queue depth, per-job outcomes and latency percentiles, and recent dead letters."""
+    import app.jobs.tasks  # noqa: F401  registers the jobs
+
+    store = get_store()
+    jobs = {}
+    for name in sorted(REGISTRY):
+        counts = store.counts(f"jobs:stats:{name}")
+        wait = [float(value) for value in store.items(f"jobs:wait_ms:{name}", SAMPLES_KEEP)]
+        run = [float(value) for value in store.items(f"jobs:run_ms:{name}", SAMPLES_KEEP)]
+        jobs[name] = {
+            **{outcome: counts.get(outcome, 0) for outcome in OUTCOMES},
+            "wait_p50_ms": _percentile(wait, 50), "wait_p95_ms": _percentile(wait, 95),
+            "run_p50_ms": _percentile(run, 50), "run_p95_ms": _percentile(run, 95),
+        }
+    return {
+        "queue": QUEUE,
+        "queue_depth": store.queue_depth(),
+        "dead_letter_count": store.length(DEAD_LETTER_KEY),
+        "recent_dead_letters": dead_letters(recent_dead_letters),
+        "jobs": jobs,
+    }
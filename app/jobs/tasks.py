@@ -0,0 +1,94 @@
+"""The jobs. Arguments must be JSON-serializable (ids and strings, not ORM objects)."""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.jobs.core import job
+from app.models import Habit, User
+from app.sharding import shard_router
+from app.utils import account_purge, ranking
+from app.utils.email import (
+    current_otp, current_password_reset_token, password_reset_link, send_otp_email, send_password_reset_email
+)
+from app.utils.local_dates import use_timezone
+from app.utils.streaks import reconcile_streaks, update_habit_streak
+
+logger = logging.getLogger("app.jobs")
+
+
+def _run_async(coro):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Eager jobs queued from an async route run inside its event loop
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+@contextmanager
+def _user_session(user_id: int) -> Iterator[Optional[Session]]:
+    """A session on ``user_id``'s shard, or ``None`` if the user is gone."""
+    with SessionLocal() as directory:
+        user = directory.get(User, user_id)
+        shard_id, timezone = (user.shard_id, user.timezone) if user is not None else (None, None)
+    if shard_id is None:
+        yield None
+        return
+    with Session(bind=shard_router.engine_for(shard_id)) as db:
+        use_timezone(db, timezone)
+        yield db
+
+
+@job()
+def deliver_otp_email(email: str):
+    # An OTP that expired (or was used) while the job waited or retried is not sent
+    otp = current_otp(email)
+    if otp is None:
+        logger.info("OTP for %s expired before its email was sent", email)
+        return
+    _run_async(send_otp_email(email, otp))
+
+
+@job()
+def deliver_password_reset_email(email: str):
+    token = current_password_reset_token(email)
+    if token is None:
+        logger.info("Password reset token for %s expired before its email was sent", email)
+        return
+    _run_async(send_password_reset_email(email, password_reset_link(token)))
+
+
+@job()
+def recompute_habit_streak(habit_id: int, owner_id: int):
+    with _user_session(owner_id) as db:
+        habit = db.get(Habit, habit_id) if db is not None else None
+        if habit is None:
+            return
+        update_habit_streak(db, habit)
+        db.commit()
+
+
+@job()
+def reconcile_habit_streaks():
+    # Queued nightly by celery beat (see celery_app.py), once for every shard;
+    # the owners' timezones are on the directory
+    with SessionLocal() as directory, shard_router.sessions(directory) as sessions:
+        for db in sessions:
+            reconcile_streaks(db, directory=directory)
+
+
+@job()
+def purge_user_account(user_id: int):
+    # Safe to retry: a purge that stopped halfway resumes where it was
+    account_purge.purge_user(user_id)
+
+
+@job()
+def rebalance_todo_ranks(user_id: int):
+    ranking.rebalance_user_todos(user_id)
@@ -1,20 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine,Base
+from fastapi.middleware.gzip import GZipMiddleware
+from app.database import engine, replica_engine
 from app.routers import auth_router, todos_router, habits_router, dashboard_router, admin_router, pomodoro_router
 from app.config import get_settings
+from app.utils.query_monitor import QueryMonitorMiddleware
+from app.utils.read_routing import ReadYourWritesMiddleware
+from app.utils.redis_client import close_redis
 
 settings=get_settings()
 
 
-Base.metadata.create_all(bind=engine)
+# Importing the app must stay cheap and side-effect free: the schema is managed
+# by Alembic (`alembic upgrade head`), and Redis, the mailer and Google's
+# transport are created on first use. Only shutdown needs managing here.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    close_redis()
+    engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
 
 
 app=FastAPI(
     title=settings.app_name,
     description="A habit tracker app",
-    version="0.0.1"
+    version="0.0.1",
+    lifespan=lifespan
 )
 
 # Add CORS middleware - this should be before including routers
@@ -26,6 +41,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Slow-query logging and per-request N+1 detection
+app.add_middleware(QueryMonitorMiddleware)
+
+# Keeps users who just wrote on the primary while the replica catches up
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Large list and dashboard payloads; level 6 costs much less CPU than 9 for nearly the same size
+app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size, compresslevel=6)
+
 app.include_router(auth_router)
 app.include_router(habits_router)
 app.include_router(todos_router)
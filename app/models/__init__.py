@@ -1,4 +1,7 @@
 from .user import User
-from .todo import Todo
-from .habit import Habit, HabitEntry
-from .pomodoro import PomodoroSession
\ No newline at end of file
+from .todo import Todo, TodoCategory, TodoOccurrence, TodoPriorityCount
+from .habit import Habit, HabitEntry, HabitEntryArchive, HabitYearCalendar
+from .pomodoro import PomodoroSession
+# Register the flush hooks that keep todo_categories, todo_priority_counts,
+# the subtask counts, the habit calendars and the local dates current
+from app.utils import habit_calendar, local_dates, subtasks, todo_counts  # noqa: E402,F401
@@ -1,11 +1,16 @@
-from sqlalchemy import Column,Integer,String,Boolean,DateTime,Text,ForeignKey
+from sqlalchemy import Column,Integer,String,Boolean,Date,DateTime,Text,ForeignKey,Index,LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Habit(Base):
     __tablename__='habits'
-
+    # One per sort key allowed on the lists (see app/utils/sorting.py)
+    __table_args__=(
+        Index('ix_habits_owner_id_created_at','owner_id','created_at','id'),
+        Index('ix_habits_owner_id_name','owner_id','name','id'),
+        Index('ix_habits_created_at','created_at','id'),
+    )
 
     id=Column(Integer,primary_key=True,index=True)
     name=Column(String,nullable=False)
@@ -21,10 +26,12 @@ class Habit(Base):
     updated_at=Column(DateTime(timezone=True),onupdate=func.now())
     
     
-    owner_id=Column(Integer,ForeignKey('users.id'),nullable=False)
+    owner_id=Column(Integer,ForeignKey('users.id',ondelete='CASCADE'),nullable=False)
     owner=relationship('User',back_populates='habits')
 
-    entries=relationship('HabitEntry',back_populates='habit',cascade='all,delete-orphan')
+    entries=relationship('HabitEntry',back_populates='habit',cascade='all,delete-orphan',passive_deletes=True)
+    archived_days=relationship('HabitEntryArchive',cascade='all,delete-orphan',passive_deletes=True)
+    calendars=relationship('HabitYearCalendar',cascade='all,delete-orphan',passive_deletes=True)
 
 
 
@@ -35,6 +42,34 @@ class HabitEntry(Base):
     completed_count=Column(Integer,default=1)
     notes=Column(Text,nullable=True)
     date=Column(DateTime(timezone=True),nullable=False,server_default=func.current_date())
-    habit_id=Column(Integer,ForeignKey('habits.id'),nullable=False)
+    habit_id=Column(Integer,ForeignKey('habits.id',ondelete='CASCADE'),nullable=False)
     habit=relationship('Habit',back_populates='entries')
+    # The entry's day in its owner's timezone, set on write (app/utils/local_dates.py)
+    local_date=Column(Date,nullable=True)
+
+    # Partitioned by month on Postgres (see app/partitions.py)
+    __table_args__=(
+        Index('ix_habit_entries_habit_id_date','habit_id','date'),
+        Index('ix_habit_entries_habit_id_local_date','habit_id','local_date'),
+    )
+
+
+class HabitEntryArchive(Base):
+    """Per-day totals of habit entries moved out to archive files (app/partitions.py)."""
+    __tablename__='habit_entry_archive'
+
+    habit_id=Column(Integer,ForeignKey('habits.id',ondelete='CASCADE'),primary_key=True)
+    day=Column(Date,primary_key=True)
+    entry_count=Column(Integer,nullable=False,default=0)
+    completed_entries=Column(Integer,nullable=False,default=0)
+    completed_total=Column(Integer,nullable=False,default=0)
+
+
+class HabitYearCalendar(Base):
+    """One bit per day of a year: set when the habit was completed that day (app/utils/habit_calendar.py)."""
+    __tablename__='habit_year_calendars'
 
+    habit_id=Column(Integer,ForeignKey('habits.id',ondelete='CASCADE'),primary_key=True)
+    year=Column(Integer,primary_key=True)
+    # 366 bits, day of year 1 in the lowest bit of the first byte
+    days=Column(LargeBinary(46),nullable=False)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class PomodoroSession(Base):
     __tablename__ = 'pomodoro_sessions'
+    # Backs the session list sorted by created_at (see app/utils/sorting.py)
+    __table_args__ = (
+        Index('ix_pomodoro_sessions_owner_id_created_at', 'owner_id', 'created_at', 'id'),
+        # Per-day analytics (see app/utils/local_dates.py)
+        Index('ix_pomodoro_sessions_owner_id_created_local_date', 'owner_id', 'created_local_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -16,6 +22,8 @@ class PomodoroSession(Base):
     completed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # The day of created_at in the owner's timezone, set on write
+    created_local_date = Column(Date, nullable=True)
     
-    owner_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    owner_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     owner = relationship('User', back_populates='pomodoro_sessions')
\ No newline at end of file
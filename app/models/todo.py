@@ -1,10 +1,22 @@
-from sqlalchemy import Column,Integer,String,Boolean,DateTime,Text,ForeignKey
+from sqlalchemy import Column,Integer,String,Boolean,Date,DateTime,Text,ForeignKey,Index,UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Todo(Base):
     __tablename__='todos'
+    __table_args__=(
+        Index('ix_todos_owner_id_rank','owner_id','rank','id'),
+        # One per sort key allowed on the lists (see app/utils/sorting.py)
+        Index('ix_todos_owner_id_created_at','owner_id','created_at','id'),
+        Index('ix_todos_owner_id_due_date','owner_id','due_date','id'),
+        Index('ix_todos_owner_id_title','owner_id','title','id'),
+        Index('ix_todos_created_at','created_at','id'),
+        Index('ix_todos_title','title','id'),
+        # Per-day analytics (see app/utils/local_dates.py)
+        Index('ix_todos_owner_id_created_local_date','owner_id','created_local_date'),
+        Index('ix_todos_owner_id_completed_local_date','owner_id','completed_local_date'),
+    )
 
     id=Column(Integer,primary_key=True,index=True)
     title=Column(String,nullable=False)
@@ -13,10 +25,67 @@ class Todo(Base):
     priority=Column(String,default='medium')
     category=Column(String,nullable=True)
     due_date=Column(DateTime(timezone=True),nullable=True)
+    # Fractional ordering key (app/utils/ranking.py), compared bytewise
+    rank=Column(String().with_variant(String(collation='C'),'postgresql'),nullable=True)
+
+    # Recurring series (app/utils/recurrence.py): daily, weekly or monthly,
+    # every recurrence_interval periods from due_date (or created_at)
+    recurrence=Column(String,nullable=True)
+    recurrence_interval=Column(Integer,nullable=False,default=1,server_default='1')
+    recurrence_until=Column(Date,nullable=True)
+
+    # Subtasks (app/utils/subtasks.py); the counts cover direct children only
+    parent_id=Column(Integer,ForeignKey('todos.id',ondelete='CASCADE'),nullable=True,index=True)
+    child_count=Column(Integer,nullable=False,default=0,server_default='0')
+    completed_child_count=Column(Integer,nullable=False,default=0,server_default='0')
 
     created_at=Column(DateTime(timezone=True),server_default=func.now())
     updated_at=Column(DateTime(timezone=True),onupdate=func.now())
     completed_at=Column(DateTime(timezone=True),nullable=True)
+    # Days of created_at and completed_at in the owner's timezone, set on write
+    created_local_date=Column(Date,nullable=True)
+    completed_local_date=Column(Date,nullable=True)
     
-    owner_id=Column(Integer,ForeignKey('users.id'),nullable=False)
-    owner=relationship('User',back_populates='todos')
\ No newline at end of file
+    owner_id=Column(Integer,ForeignKey('users.id',ondelete='CASCADE'),nullable=False)
+    owner=relationship('User',back_populates='todos')
+
+    occurrences=relationship('TodoOccurrence',back_populates='todo',cascade='all,delete-orphan',passive_deletes=True)
+
+
+class TodoOccurrence(Base):
+    """A completed or edited occurrence of a recurring todo; the others are never stored."""
+    __tablename__='todo_occurrences'
+
+    todo_id=Column(Integer,ForeignKey('todos.id',ondelete='CASCADE'),primary_key=True)
+    occurrence_date=Column(Date,primary_key=True)
+    is_completed=Column(Boolean,nullable=False,default=False)
+    completed_at=Column(DateTime(timezone=True),nullable=True)
+    completed_local_date=Column(Date,nullable=True)  # in the owner's timezone, set on write
+    # Overrides of the series' fields; NULL keeps the series value
+    title=Column(String,nullable=True)
+    description=Column(Text,nullable=True)
+    priority=Column(String,nullable=True)
+
+    updated_at=Column(DateTime(timezone=True),server_default=func.now(),onupdate=func.now())
+
+    todo=relationship('Todo',back_populates='occurrences')
+
+
+class TodoCategory(Base):
+    """A user's todo categories with how many todos use each (app/utils/todo_counts.py)."""
+    __tablename__='todo_categories'
+    __table_args__=(UniqueConstraint('owner_id','name',name='uq_todo_categories_owner_id_name'),)
+
+    id=Column(Integer,primary_key=True,index=True)
+    owner_id=Column(Integer,ForeignKey('users.id',ondelete='CASCADE'),nullable=False)
+    name=Column(String,nullable=False)
+    todo_count=Column(Integer,nullable=False,default=0)
+
+
+class TodoPriorityCount(Base):
+    """How many of a user's todos have each priority (app/utils/todo_counts.py)."""
+    __tablename__='todo_priority_counts'
+
+    owner_id=Column(Integer,ForeignKey('users.id',ondelete='CASCADE'),primary_key=True)
+    priority=Column(String,primary_key=True)
+    todo_count=Column(Integer,nullable=False,default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column,Integer,String,Boolean,DateTime,Text
+from sqlalchemy import Column,Integer,String,Boolean,DateTime,Text,Index,text
 from sqlalchemy.sql import func 
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -20,10 +20,28 @@ class User(Base):
     last_otp_verified=Column(DateTime(timezone=True),nullable=True)
     is_2fa_enabled=Column(Boolean,default=False)
     otp_secret=Column(String,nullable=True)
+    shard_id=Column(Integer,nullable=False,default=0,server_default='0',index=True)
+    # IANA name; days in analytics are counted in it (see app/utils/local_dates.py)
+    timezone=Column(String,nullable=False,default='UTC',server_default='UTC')
 
     created_at=Column(DateTime(timezone=True),server_default=func.now())
     updated_at=Column(DateTime(timezone=True),onupdate=func.now())
 
-    todos=relationship('Todo',back_populates='owner',cascade='all,delete-orphan')
-    habits=relationship('Habit',back_populates='owner',cascade='all,delete-orphan')
-    pomodoro_sessions=relationship('PomodoroSession',back_populates='owner',cascade='all,delete-orphan')
\ No newline at end of file
+    # Child rows are removed by ON DELETE CASCADE in the database, not loaded and
+    # deleted one by one; large accounts go through app/utils/account_purge.py
+    todos=relationship('Todo',back_populates='owner',cascade='all,delete-orphan',passive_deletes=True)
+    habits=relationship('Habit',back_populates='owner',cascade='all,delete-orphan',passive_deletes=True)
+    pomodoro_sessions=relationship('PomodoroSession',back_populates='owner',cascade='all,delete-orphan',passive_deletes=True)
+
+    # Admin search indexes (see app/utils/user_search.py); Postgres only
+    __table_args__=tuple(
+        index.ddl_if(dialect='postgresql')
+        for column in ('email','username','full_name')
+        for index in (
+            Index(f'ix_users_{column}_trgm',column,postgresql_using='gin',postgresql_ops={column:'gin_trgm_ops'}),
+            Index(f'ix_users_{column}_prefix',text(f'lower({column}) text_pattern_ops')),
+        )
+    )+(
+        # Admin list sorted by signup date (see app/utils/sorting.py)
+        Index('ix_users_created_at','created_at','id'),
+    )
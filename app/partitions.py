@@ -0,0 +1,224 @@
+"""Monthly partition maintenance and archival for ``habit_entries``.
+
+On Postgres ``habit_entries`` is range-partitioned by ``date`` into one table
+per month (``habit_entries_y2025m01``) plus a default partition for rows
+outside them. ``ensure`` creates the upcoming months ahead of time and should
+run from cron, e.g. daily::
+
+    python -m app.partitions ensure --months-ahead 3
+
+``archive`` writes every month before ``--before`` to a gzipped JSON-lines
+file, folds its per-habit, per-day totals into ``habit_entry_archive`` and
+then drops the partition (or deletes the rows on other databases)::
+
+    python -m app.partitions archive --before 2025-01 --archive-dir /var/archive/habit_entries
+
+Analytics read those totals through ``app.utils.habit_entries``, so their
+numbers stay the same; the raw entries of an archived month are no longer
+listed by ``GET /habits/{id}/entries`` until ``restore`` loads the file back.
+With sharding, run the commands once per shard with ``--database-url``.
+"""
+import argparse
+import gzip
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, create_engine, delete, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection
+
+from app.config import get_settings
+from app.models.habit import HabitEntry, HabitEntryArchive
+from app.utils.local_dates import stored_day
+
+settings = get_settings()
+
+TABLE = HabitEntry.__tablename__
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = CAST(:table AS regclass)"),
+        {"table": TABLE},
+    ).first() is not None
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = 3, today: date = None) -> List[str]:
+    """Create missing monthly partitions from this month through ``months_ahead``."""
+    if not is_partitioned(conn):
+        return []
+    existing = set(inspect(conn).get_table_names())
+    created = []
+    current = month_start(today or date.today())
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+def _month_range(month: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(month, datetime.min.time()), datetime.combine(add_months(month, 1), datetime.min.time())
+
+
+def months_before(conn: Connection, before: date) -> List[date]:
+    oldest = conn.execute(select(func.min(HabitEntry.date))).scalar()
+    if oldest is None:
+        return []
+    if isinstance(oldest, str):
+        oldest = datetime.fromisoformat(oldest)
+    months = []
+    month = month_start(oldest.date())
+    while month < before:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _rollup(conn: Connection, start: datetime, end: datetime) -> Dict[Tuple[int, date], Tuple[int, int, int]]:
+    # Totals are kept by the owner's day (a day split across two monthly
+    # partitions adds up), or the stored date's for rows not backfilled yet
+    day = stored_day(HabitEntry.local_date)
+    rows = conn.execute(
+        select(
+            HabitEntry.habit_id, day,
+            func.count(HabitEntry.id),
+            func.coalesce(func.sum(case((HabitEntry.completed_count > 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(HabitEntry.completed_count), 0),
+        )
+        .where(HabitEntry.date >= start, HabitEntry.date < end)
+        .group_by(HabitEntry.habit_id, day)
+    )
+    return {
+        (habit_id, date.fromisoformat(d) if isinstance(d, str) else d): tuple(values)
+        for habit_id, d, *values in rows
+    }
+
+
+def _apply_rollup(conn: Connection, totals: Dict[Tuple[int, date], Tuple[int, int, int]], sign: int):
+    archive = HabitEntryArchive.__table__
+    for (habit_id, day), (entries, completed, total) in totals.items():
+        key = (archive.c.habit_id == habit_id) & (archive.c.day == day)
+        changed = conn.execute(update(archive).where(key).values(
+            entry_count=archive.c.entry_count + sign * entries,
+            completed_entries=archive.c.completed_entries + sign * completed,
+            completed_total=archive.c.completed_total + sign * total,
+        )).rowcount
+        if not changed and sign > 0:
+            conn.execute(insert(archive).values(
+                habit_id=habit_id, day=day, entry_count=entries,
+                completed_entries=completed, completed_total=total,
+            ))
+    if sign < 0:
+        conn.execute(delete(archive).where(archive.c.entry_count <= 0))
+
+
+def archive_month(conn: Connection, month: date, archive_dir: Path) -> Tuple[Optional[Path], int]:
+    """Move one month of entries to ``archive_dir`` and keep its daily totals."""
+    start, end = _month_range(month)
+    rows = conn.execute(
+        select(HabitEntry.__table__).where(HabitEntry.date >= start, HabitEntry.date < end)
+        .order_by(HabitEntry.id)
+    ).mappings().all()
+
+    path = None
+    if rows:
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_dir / f"{TABLE}-{month:%Y-%m}.jsonl.gz"
+        # Written before anything is removed; a failed run just rewrites the file
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=str) + "\n")
+        _apply_rollup(conn, _rollup(conn, start, end), sign=1)
+
+    name = partition_name(month)
+    if is_partitioned(conn) and name in inspect(conn).get_table_names():
+        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    # Rows that landed in the default partition (or any table on other databases)
+    conn.execute(delete(HabitEntry.__table__).where(HabitEntry.date >= start, HabitEntry.date < end))
+    return path, len(rows)
+
+
+def restore_file(conn: Connection, path: Path) -> int:
+    """Load an archive file back into ``habit_entries`` and drop its totals."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        return 0
+    for row in rows:
+        row["date"] = datetime.fromisoformat(row["date"])
+        # Files from before local dates were rolled up by the stored date's day
+        row["local_date"] = date.fromisoformat(row["local_date"]) if row.get("local_date") else row["date"].date()
+
+    totals: Dict[Tuple[int, date], Tuple[int, int, int]] = {}
+    for row in rows:
+        key = (row["habit_id"], row["local_date"])
+        entries, completed, total = totals.get(key, (0, 0, 0))
+        count = row["completed_count"] or 0
+        totals[key] = (entries + 1, completed + (count > 0), total + count)
+
+    ensure_partitions(conn, months_ahead=0, today=rows[0]["date"].date())
+    conn.execute(insert(HabitEntry.__table__), rows)
+    _apply_rollup(conn, totals, sign=-1)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain habit_entries partitions and archives")
+    parser.add_argument("--database-url", default=settings.database_url)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="Create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+    archive = commands.add_parser("archive", help="Archive whole months older than --before")
+    archive.add_argument("--before", required=True, help="First month to keep, as YYYY-MM")
+    archive.add_argument("--archive-dir", default="archive/habit_entries")
+    restore = commands.add_parser("restore", help="Load an archived month back")
+    restore.add_argument("path")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.command == "ensure":
+        with engine.begin() as conn:
+            created = ensure_partitions(conn, args.months_ahead)
+        print(f"created: {', '.join(created) or 'nothing'}")
+    elif args.command == "archive":
+        before = datetime.strptime(args.before, "%Y-%m").date()
+        if before > month_start(date.today()):
+            parser.error("--before cannot be later than the current month")
+        with engine.connect() as conn:
+            months = months_before(conn, before)
+        for month in months:
+            with engine.begin() as conn:
+                path, count = archive_month(conn, month, Path(args.archive_dir))
+            print(f"{month:%Y-%m}: {count} entries -> {path or 'nothing to write'}")
+    else:
+        with engine.begin() as conn:
+            count = restore_file(conn, Path(args.path))
+        print(f"restored {count} entries from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime, date
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.todo import Todo
 from app.models.habit import Habit
 from app.schemas.user import User as UserSchema
+from app.schemas.todo import Todo as TodoSchema
+from app.schemas.habit import HabitSummary
 from app.auth.dependencies import get_current_user
+from app.utils.serialization import ListSerializer
+from app.sharding import scatter_page, shard_router
+from app.jobs import metrics as job_metrics
+from app.jobs.tasks import purge_user_account
+from app.utils import user_search
+from app.utils.sorting import ListQuery, contains_any, equals
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+user_list_serializer = ListSerializer(User, UserSchema)
+todo_list_serializer = ListSerializer(Todo, TodoSchema)
+habit_list_serializer = ListSerializer(Habit, HabitSummary)
+
+# Relevance ordering and the search filter stay with app/utils/user_search.py
+user_lists = ListQuery(User, {
+    "is_active": equals(User.is_active),
+    "is_admin": equals(User.is_admin),
+    "is_verified": equals(User.is_verified),
+}, sorts=("created_at", "email", "username"))
+# Across users only created_at and title are indexed; user_id unlocks the per-owner sorts
+todo_lists = ListQuery(Todo, {
+    "user_id": equals(Todo.owner_id),
+    "is_completed": equals(Todo.is_completed),
+    "priority": equals(Todo.priority),
+    "category": equals(Todo.category),
+    "search": contains_any(Todo.title, Todo.description),
+}, sorts=("created_at", "due_date", "rank", "title"))
+habit_lists = ListQuery(Habit, {
+    "user_id": equals(Habit.owner_id),
+    "is_active": equals(Habit.is_active),
+    "frequency": equals(Habit.frequency),
+    "search": contains_any(Habit.name, Habit.description),
+}, sorts=("created_at", "name"))
+
 class UserStats(BaseModel):
     total_users: int
     active_users: int
@@ -32,6 +65,22 @@ class AdminDashboardStats(BaseModel):
     todo_stats: TodoStats
     habit_stats: HabitStats
 
+class JobStats(BaseModel):
+    succeeded: int
+    retried: int
+    failed: int
+    wait_p50_ms: Optional[float] = None
+    wait_p95_ms: Optional[float] = None
+    run_p50_ms: Optional[float] = None
+    run_p95_ms: Optional[float] = None
+
+class JobMetrics(BaseModel):
+    queue: str
+    queue_depth: int
+    dead_letter_count: int
+    recent_dead_letters: List[Dict[str, Any]]
+    jobs: Dict[str, JobStats]
+
 class AdminUserUpdate(BaseModel):
     is_active: Optional[bool] = None
     is_admin: Optional[bool] = None
@@ -48,7 +97,7 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
 
 @router.get("/dashboard", response_model=AdminDashboardStats)
 async def get_admin_dashboard(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
     # User stats
@@ -62,9 +111,14 @@ async def get_admin_dashboard(
         admin_users=admin_users
     )
     
-    # Todo stats
-    total_todos = db.query(Todo).count()
-    completed_todos = db.query(Todo).filter(Todo.is_completed == True).count()
+    # Todo and habit stats are summed over the shards
+    total_todos = completed_todos = total_habits = active_habits = 0
+    with shard_router.sessions(db) as sessions:
+        for session in sessions:
+            total_todos += session.query(Todo).count()
+            completed_todos += session.query(Todo).filter(Todo.is_completed == True).count()
+            total_habits += session.query(Habit).count()
+            active_habits += session.query(Habit).filter(Habit.is_active == True).count()
     pending_todos = total_todos - completed_todos
     
     todo_stats = TodoStats(
@@ -73,10 +127,6 @@ async def get_admin_dashboard(
         pending_todos=pending_todos
     )
     
-    # Habit stats
-    total_habits = db.query(Habit).count()
-    active_habits = db.query(Habit).filter(Habit.is_active == True).count()
-    
     habit_stats = HabitStats(
         total_habits=total_habits,
         active_habits=active_habits
@@ -96,39 +146,33 @@ async def get_users(
     is_admin: Optional[bool] = None,
     is_verified: Optional[bool] = None,
     search: Optional[str] = None,
-    sort_by: Optional[str] = "created_at",
+    sort_by: Optional[str] = Query(None, description="Sort by field, or relevance (default when searching, else created_at)"),
     sort_order: Optional[str] = "desc",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
     query = db.query(User)
-    
-    # Apply filters
-    if is_active is not None:
-        query = query.filter(User.is_active == is_active)
-    
-    if is_admin is not None:
-        query = query.filter(User.is_admin == is_admin)
-    
-    if is_verified is not None:
-        query = query.filter(User.is_verified == is_verified)
+    dialect = db.get_bind().dialect.name
+    filters = {"is_active": is_active, "is_admin": is_admin, "is_verified": is_verified}
     
     if search:
-        search_filter = or_(
-            User.email.contains(search),
-            User.full_name.contains(search),
-            User.username.contains(search)
-        )
-        query = query.filter(search_filter)
+        query = query.filter(user_search.search_filter(search, dialect))
     
     # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(User, sort_by).desc())
+    sort_by = sort_by or ("relevance" if search else "created_at")
+    if sort_by == "relevance":
+        if not search:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="sort_by=relevance requires a search term"
+            )
+        query = user_lists.filter(query, filters) \
+            .order_by(user_search.relevance(search, dialect).desc(), User.id.asc())
     else:
-        query = query.order_by(getattr(User, sort_by).asc())
+        query = user_lists.apply(query, filters, sort_by, sort_order)
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    rows = user_list_serializer.fetch(query.offset(skip).limit(limit))
+    return user_list_serializer.render(rows)
 
 @router.get("/users/{user_id}", response_model=UserSchema)
 async def get_user(
@@ -167,7 +211,7 @@ async def update_user(
     db.refresh(user)
     return user
 
-@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/users/{user_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
@@ -187,11 +231,13 @@ async def delete_user(
             detail="Cannot delete yourself"
         )
     
-    db.delete(user)
+    # Lock the account now; their data is deleted in batches after the response
+    user.is_active = False
     db.commit()
-    return
+    purge_user_account.delay(user.id)
+    return {"message": "User deactivated and scheduled for deletion"}
 
-@router.get("/todos")
+@router.get("/todos", response_model=List[TodoSchema])
 async def get_all_todos(
     skip: int = 0,
     limit: int = 100,
@@ -202,41 +248,24 @@ async def get_all_todos(
     search: Optional[str] = None,
     sort_by: Optional[str] = "created_at",
     sort_order: Optional[str] = "desc",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    query = db.query(Todo)
-    
-    # Apply filters
-    if is_completed is not None:
-        query = query.filter(Todo.is_completed == is_completed)
-    
-    if priority:
-        query = query.filter(Todo.priority == priority)
-    
-    if category:
-        query = query.filter(Todo.category == category)
-    
-    if user_id:
-        query = query.filter(Todo.owner_id == user_id)
-    
-    if search:
-        search_filter = or_(
-            Todo.title.contains(search),
-            Todo.description.contains(search)
-        )
-        query = query.filter(search_filter)
-    
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(Todo, sort_by).desc())
-    else:
-        query = query.order_by(getattr(Todo, sort_by).asc())
-    
-    todos = query.offset(skip).limit(limit).all()
-    return todos
+    def build_query(session):
+        return todo_lists.apply(session.query(Todo), {
+            "user_id": user_id or None,
+            "is_completed": is_completed,
+            "priority": priority or None,
+            "category": category or None,
+            "search": search or None,
+        }, sort_by, sort_order, explicit_nulls=True)
+
+    with shard_router.sessions(db) as sessions:
+        rows = scatter_page(sessions, build_query, todo_list_serializer, sort_by,
+                            sort_order == "desc", skip, limit)
+    return todo_list_serializer.render(rows)
 
-@router.get("/habits")
+@router.get("/habits", response_model=List[HabitSummary])
 async def get_all_habits(
     skip: int = 0,
     limit: int = 100,
@@ -246,33 +275,25 @@ async def get_all_habits(
     search: Optional[str] = None,
     sort_by: Optional[str] = "created_at",
     sort_order: Optional[str] = "desc",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    query = db.query(Habit)
-    
-    # Apply filters
-    if is_active is not None:
-        query = query.filter(Habit.is_active == is_active)
-    
-    if frequency:
-        query = query.filter(Habit.frequency == frequency)
-    
-    if user_id:
-        query = query.filter(Habit.owner_id == user_id)
-    
-    if search:
-        search_filter = or_(
-            Habit.name.contains(search),
-            Habit.description.contains(search)
-        )
-        query = query.filter(search_filter)
-    
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(Habit, sort_by).desc())
-    else:
-        query = query.order_by(getattr(Habit, sort_by).asc())
-    
-    habits = query.offset(skip).limit(limit).all()
-    return habits
\ No newline at end of file
+    def build_query(session):
+        return habit_lists.apply(session.query(Habit), {
+            "user_id": user_id or None,
+            "is_active": is_active,
+            "frequency": frequency or None,
+            "search": search or None,
+        }, sort_by, sort_order, explicit_nulls=True)
+
+    with shard_router.sessions(db) as sessions:
+        rows = scatter_page(sessions, build_query, habit_list_serializer, sort_by,
+                            sort_order == "desc", skip, limit)
+    return habit_list_serializer.render(rows)
+
+@router.get("/jobs/metrics", response_model=JobMetrics)
+async def get_job_metrics(
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Background job queue depth, per-job outcomes and latencies, and recent dead letters."""
+    return job_metrics.snapshot()
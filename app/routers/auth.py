@@ -2,11 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-import secrets
-import redis
 from app.database import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, User as UserSchema, Token, LoginRequest, OTPRequest, OTPVerify
+from app.schemas.user import (
+    UserCreate, User as UserSchema, UserSettingsUpdate, Token, LoginRequest, OTPRequest, OTPVerify
+)
 from pydantic import BaseModel
 
 class GoogleLoginRequest(BaseModel):
@@ -15,19 +15,15 @@ from app.schemas.forgot_password import ForgotPasswordRequest, ResetPasswordRequ
 from app.utils.security import (
     verify_password, get_password_hash, create_access_token
 )
-from app.utils.email import send_otp_email, verify_otp
+from app.utils.email import request_otp_email, verify_otp
 from app.auth.google_oauth import google_oauth
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
 from app.auth.dependencies import get_current_user
 from app.config import get_settings
+from app.utils.redis_client import get_redis
 
 settings = get_settings()
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-# Redis client for password reset tokens
-redis_client = redis.from_url(settings.redis_url)
-
 # Traditional email/password registration
 @router.post("/register", response_model=UserSchema)
 async def register_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -53,8 +49,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     
     # Send OTP for email verification
-    from app.utils.email import send_otp_email
-    await send_otp_email(user.email)
+    request_otp_email(user.email)
     
     return db_user
 
@@ -72,7 +67,7 @@ async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     # Check if user is verified
     if not user.is_verified:
         # If not verified, send OTP and inform the user
-        await send_otp_email(user.email)
+        request_otp_email(user.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Please verify your email. OTP sent."
@@ -145,7 +140,7 @@ async def google_callback(code: str, db: Session = Depends(get_db)):
 # Send OTP via email
 @router.post("/send-otp")
 async def send_otp(request: OTPRequest):
-    success = await send_otp_email(request.email)
+    success = request_otp_email(request.email)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -157,7 +152,7 @@ async def send_otp(request: OTPRequest):
 @router.post("/resend-otp")
 async def resend_otp(request: OTPRequest):
     # Check if user exists
-    success = await send_otp_email(request.email)
+    success = request_otp_email(request.email)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -233,19 +228,9 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
             detail="User not found"
         )
     
-    # Generate reset token
-    reset_token = secrets.token_urlsafe(32)
-    token_key = f"password_reset:{reset_token}"
-    
-    # Store token in Redis with 1-hour expiration
-    redis_client.setex(token_key, 3600, request.email)
-    
-    # Send reset email
-    reset_link = f"{settings.app_url}/reset-password?token={reset_token}"
-    
-    # Send email
-    from app.utils.email import send_password_reset_email
-    success = await send_password_reset_email(request.email, reset_link)
+    # Issue a reset token (valid for an hour) and send its link
+    from app.utils.email import request_password_reset_email
+    success = request_password_reset_email(request.email)
     
     if not success:
         raise HTTPException(
@@ -261,6 +246,7 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
     token_key = f"password_reset:{request.token}"
     
     # Check if token exists
+    redis_client = get_redis()
     email = redis_client.get(token_key)
     if not email:
         raise HTTPException(
@@ -291,7 +277,7 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
     db.commit()
     
     # Delete token
-    redis_client.delete(token_key)
+    redis_client.delete(token_key, f"password_reset_email:{email}")
     
     return {"message": "Password reset successfully"}
 
@@ -300,9 +286,28 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
+# Update the current user's name and timezone; days in analytics are counted in the timezone
+@router.put("/me", response_model=UserSchema)
+async def update_current_user(
+    user_update: UserSettingsUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    for field, value in user_update.dict(exclude_unset=True).items():
+        if field == "timezone" and value is None:
+            continue
+        setattr(current_user, field, value)
+    db.commit()
+    db.refresh(current_user)
+    return current_user
+
 # Google ID token login
 @router.post("/google", response_model=Token)
 async def google_id_token_login(request: GoogleLoginRequest, db: Session = Depends(get_db)):
+    # google-auth's transport pulls in requests/urllib3, so load it on first use
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
     try:
         # Specify the CLIENT_ID of the app that accesses the backend:
         idinfo = id_token.verify_oauth2_token(request.id_token, google_requests.Request(), settings.google_client_id)
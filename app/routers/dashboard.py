@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, extract
 from datetime import datetime, date, timedelta
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User
-from app.models.todo import Todo
+from app.models.todo import Todo, TodoCategory, TodoOccurrence, TodoPriorityCount
 from app.models.habit import Habit, HabitEntry
 from app.auth.dependencies import get_current_active_user
+from app.utils import local_dates, negotiation, recurrence
+from app.utils.habit_entries import DayTotals, daily_entry_totals, sum_totals
 from pydantic import BaseModel
 from typing import Dict, Any
 
@@ -50,30 +52,44 @@ class DashboardFilters(BaseModel):
 
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
+    response: Response,
     filters: DashboardFilters = Depends(),
-    db: Session = Depends(get_db),
+    media_type: str = Depends(negotiation.response_format),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Calculate date range
-    end_date = filters.end_date or date.today()
+    # Calculate date range, in the user's days
+    end_date = filters.end_date or local_dates.today(current_user.timezone)
     start_date = filters.start_date or (end_date - timedelta(days=30))
+    # Recurring todos are expanded day by day over the range
+    recurrence.validate_window(start_date, end_date)
     
     # Todo stats
+    series_query = db.query(Todo).filter(
+        Todo.owner_id == current_user.id,
+        Todo.recurrence.isnot(None)
+    )
     todo_query = db.query(Todo).filter(
         Todo.owner_id == current_user.id,
-        func.date(Todo.created_at) >= start_date,
-        func.date(Todo.created_at) <= end_date
+        Todo.recurrence.is_(None),
+        local_dates.day_where(Todo.created_local_date, lambda day: day.between(start_date, end_date))
     )
     
     # Apply filters
     if filters.category:
         todo_query = todo_query.filter(Todo.category == filters.category)
+        series_query = series_query.filter(Todo.category == filters.category)
     
     if filters.priority:
         todo_query = todo_query.filter(Todo.priority == filters.priority)
+        series_query = series_query.filter(Todo.priority == filters.priority)
     
-    total_todos = todo_query.count()
-    completed_todos = todo_query.filter(Todo.is_completed == True).count()
+    # Recurring todos count once per occurrence due in the range
+    occurrences = recurrence.expand(db, series_query.all(), start_date, end_date, ("id",))
+    total_todos = todo_query.count() + len(occurrences)
+    completed_todos = todo_query.filter(Todo.is_completed == True).count() + sum(
+        1 for item in occurrences if item["is_completed"]
+    )
     pending_todos = total_todos - completed_todos
     completion_rate = (completed_todos / total_todos * 100) if total_todos > 0 else 0
     
@@ -92,15 +108,16 @@ async def get_dashboard_stats(
     total_habits = habit_query.count()
     active_habits = habit_query.filter(Habit.is_active == True).count()
     
-    # Calculate habit completion rate
-    habit_completion_query = db.query(HabitEntry).join(Habit).filter(
-        Habit.owner_id == current_user.id,
-        func.date(HabitEntry.date) >= start_date,
-        func.date(HabitEntry.date) <= end_date
+    # Per-day habit entry totals (live and archived) covering the range, trend and heatmap
+    heatmap_start_date = end_date - timedelta(days=29)
+    daily_habits = daily_entry_totals(
+        db, min(start_date, heatmap_start_date), end_date, owner_id=current_user.id
     )
     
-    total_entries = habit_completion_query.count()
-    completed_habits = habit_completion_query.filter(HabitEntry.completed_count > 0).count()
+    # Calculate habit completion rate
+    habit_totals = sum_totals({day: t for day, t in daily_habits.items() if day >= start_date})
+    total_entries = habit_totals.entry_count
+    completed_habits = habit_totals.completed_entries
     habit_completion_rate = (completed_habits / total_entries * 100) if total_entries > 0 else 0
     
     # Calculate average streak
@@ -116,23 +133,29 @@ async def get_dashboard_stats(
     )
     
     # Productivity trend (last 7 days)
+    trend_start = end_date - timedelta(days=6)
+    in_trend = lambda day: day.between(trend_start, end_date)
+    completed_day = local_dates.stored_day(TodoOccurrence.completed_local_date)
+    occurrences_completed = dict(db.query(completed_day, func.count()).join(Todo).filter(
+        Todo.owner_id == current_user.id,
+        TodoOccurrence.is_completed == True,
+        local_dates.day_where(TodoOccurrence.completed_local_date, in_trend)
+    ).group_by(completed_day).all())
+    completed_day = local_dates.stored_day(Todo.completed_local_date)
+    todos_completed_by_day = dict(db.query(completed_day, func.count()).filter(
+        Todo.owner_id == current_user.id,
+        Todo.is_completed == True,
+        local_dates.day_where(Todo.completed_local_date, in_trend)
+    ).group_by(completed_day).all())
     productivity_trend = []
     for i in range(7):
         trend_date = end_date - timedelta(days=6-i)
         
         # Todos completed on this date
-        todos_completed = db.query(Todo).filter(
-            Todo.owner_id == current_user.id,
-            Todo.is_completed == True,
-            func.date(Todo.completed_at) == trend_date
-        ).count()
+        todos_completed = todos_completed_by_day.get(trend_date, 0) + occurrences_completed.get(trend_date, 0)
         
         # Habits completed on this date
-        habits_completed = db.query(HabitEntry).join(Habit).filter(
-            Habit.owner_id == current_user.id,
-            HabitEntry.completed_count > 0,
-            func.date(HabitEntry.date) == trend_date
-        ).count()
+        habits_completed = daily_habits.get(trend_date, DayTotals()).completed_entries
         
         productivity_trend.append(ProductivityStats(
             date=trend_date,
@@ -140,46 +163,31 @@ async def get_dashboard_stats(
             habits_completed=habits_completed
         ))
     
-    # Habit heatmap data (last 30 days)
-    heatmap_start_date = end_date - timedelta(days=29)
-    habit_heatmap_data = db.query(
-        HabitEntry.date,
-        HabitEntry.completed_count
-    ).join(Habit).filter(
-        Habit.owner_id == current_user.id,
-        func.date(HabitEntry.date) >= heatmap_start_date,
-        func.date(HabitEntry.date) <= end_date
-    ).all()
-
+    # Habit heatmap data (last 30 days), one row per day with entries
     habit_heatmap = [
-        HabitHeatmapData(date=row.date, completed_count=row.completed_count)
-        for row in habit_heatmap_data
+        HabitHeatmapData(date=day, completed_count=totals.completed_total)
+        for day, totals in sorted(daily_habits.items())
+        if day >= heatmap_start_date
     ]
 
-    # Category distribution
-    category_distribution = {}
-    category_results = db.query(Todo.category, func.count(Todo.id)).filter(
-        Todo.owner_id == current_user.id,
-        Todo.category.isnot(None)
-    ).group_by(Todo.category).all()
+    # Category and priority distribution, from the maintained counts
+    category_distribution = dict(db.query(TodoCategory.name, TodoCategory.todo_count).filter(
+        TodoCategory.owner_id == current_user.id
+    ).all())
     
-    for category, count in category_results:
-        category_distribution[category] = count
+    priority_distribution = dict(db.query(TodoPriorityCount.priority, TodoPriorityCount.todo_count).filter(
+        TodoPriorityCount.owner_id == current_user.id
+    ).all())
     
-    # Priority distribution
-    priority_distribution = {}
-    priority_results = db.query(Todo.priority, func.count(Todo.id)).filter(
-        Todo.owner_id == current_user.id
-    ).group_by(Todo.priority).all()
-    
-    for priority, count in priority_results:
-        priority_distribution[priority] = count
-    
-    return DashboardStats(
+    stats = DashboardStats(
         todo_stats=todo_stats,
         habit_stats=habit_stats,
         productivity_trend=productivity_trend,
         category_distribution=category_distribution,
         priority_distribution=priority_distribution,
         habit_heatmap=habit_heatmap
-    )
\ No newline at end of file
+    )
+    if media_type == negotiation.MSGPACK:
+        return negotiation.msgpack_response(negotiation.packb(stats.model_dump(mode="json")))
+    response.headers["Vary"] = "Accept"
+    return stats
\ No newline at end of file
@@ -1,21 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import datetime, date
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.habit import Habit, HabitEntry
 from app.schemas.habit import (
-    HabitCreate, HabitUpdate, Habit as HabitSchema,
-    HabitEntryCreate, HabitEntry as HabitEntrySchema
+    HabitCreate, HabitUpdate, Habit as HabitSchema, HabitSummary,
+    HabitEntryCreate, HabitEntry as HabitEntrySchema, DayProgress, HabitProgress, TodayProgress
+)
+from app.schemas.analytics import (
+    AggregateHabitAnalytics, AggregateHabitStats, HabitFrequencyDistribution, HabitCompletionTrend,
+    HabitCalendar, HabitSeries as HabitSeriesSchema
 )
-from app.schemas.analytics import AggregateHabitAnalytics, AggregateHabitStats, HabitFrequencyDistribution, HabitCompletionTrend
 from app.auth.dependencies import get_current_active_user
+from app.jobs.tasks import recompute_habit_streak
+from app.utils import etags, habit_calendar, local_dates, negotiation
+from app.utils.serialization import ListSerializer
+from app.utils.habit_entries import (
+    PERIODS, DayTotals, as_date, daily_entry_totals, period_bounds, period_progress_query, sum_totals
+)
+from app.utils.sorting import ListQuery, contains_any, equals, on_or_after, on_or_before
+from app.utils.streaks import habit_streaks, streaks_by_habit
 
 router = APIRouter(prefix="/habits", tags=["habits"])
 
+# Used when the client picks fields; entries are only returned on the full list
+habit_list_serializer = ListSerializer(Habit, HabitSummary)
+entry_list_serializer = ListSerializer(HabitEntry, HabitEntrySchema)
+habit_lists = ListQuery(Habit, {
+    "owner_id": equals(Habit.owner_id),
+    "is_active": equals(Habit.is_active),
+    "frequency": equals(Habit.frequency),
+    "search": contains_any(Habit.name, Habit.description),
+    "created_from": on_or_after(Habit.created_at),
+    "created_to": on_or_before(Habit.created_at),
+}, sorts=("created_at", "name"))
+entry_lists = ListQuery(HabitEntry, {
+    "habit_id": equals(HabitEntry.habit_id),
+    "date_from": local_dates.on_or_after(HabitEntry.local_date),
+    "date_to": local_dates.on_or_before(HabitEntry.local_date),
+}, sorts=("date",))
+
 @router.post("/", response_model=HabitSchema)
 async def create_habit(
     habit: HabitCreate,
@@ -37,42 +65,69 @@ async def get_habits(
     search: Optional[str] = Query(None, description="Search in name or description"),
     created_from: Optional[date] = None,
     created_to: Optional[date] = None,
-    sort_by: Optional[str] = Query("created_at", description="Sort by field"),
+    sort_by: Optional[str] = Query("created_at", description="Sort by created_at or name"),
     sort_order: Optional[str] = Query("desc", description="Sort order (asc or desc)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Habit).filter(Habit.owner_id == current_user.id)
-    
-    # Apply filters
-    if active_only:
-        query = query.filter(Habit.is_active == True)
-    
-    if frequency:
-        query = query.filter(Habit.frequency == frequency)
-    
-    if search:
-        search_filter = or_(
-            Habit.name.contains(search),
-            Habit.description.contains(search)
-        )
-        query = query.filter(search_filter)
-    
-    if created_from:
-        query = query.filter(func.date(Habit.created_at) >= created_from)
-    
-    if created_to:
-        query = query.filter(func.date(Habit.created_at) <= created_to)
-    
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(Habit, sort_by).desc())
-    else:
-        query = query.order_by(getattr(Habit, sort_by).asc())
-    
+    selected = habit_list_serializer.parse_fields(fields)
+    query = habit_lists.apply(db.query(Habit), {
+        "owner_id": current_user.id,
+        "is_active": True if active_only else None,
+        "frequency": frequency or None,
+        "search": search or None,
+        "created_from": created_from,
+        "created_to": created_to,
+    }, sort_by, sort_order)
+    
+    if fields:
+        rows = habit_list_serializer.fetch(query.offset(skip).limit(limit), selected)
+        return habit_list_serializer.render(rows, selected)
+
     habits = query.offset(skip).limit(limit).all()
     return habits
 
+@router.get("/today", response_model=TodayProgress)
+async def get_today_progress(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Each active habit's progress against its target in the current period.
+
+    Daily habits are judged on today, weekly habits on this ISO week (with a
+    total per day) and monthly habits on this month, by the sum of
+    ``completed_count`` over the period's entries. Periods are the user's, in
+    their timezone.
+    """
+    today = local_dates.today(current_user.timezone)
+    habits = {}
+    for habit_id, name, frequency, target_count, day, progress, entries in db.execute(
+        period_progress_query(current_user.id, today)
+    ):
+        if habit_id not in habits:
+            start, end = period_bounds(frequency, today)
+            period = PERIODS.get(frequency, "day")
+            habits[habit_id] = HabitProgress(
+                habit_id=habit_id, name=name, frequency=frequency or "daily", target_count=target_count or 1,
+                period=period, period_start=start, period_end=end - timedelta(days=1),
+                progress=0, entries=0, completed=False, remaining=0,
+                days=[DayProgress(day=start + timedelta(days=n), progress=0) for n in range(7)]
+                if period == "week" else None,
+            )
+        habit = habits[habit_id]
+        habit.progress += progress
+        habit.entries += entries
+        if habit.days is not None and day is not None:
+            habit.days[(as_date(day) - habit.period_start).days].progress += progress
+
+    for habit in habits.values():
+        habit.completed = habit.progress >= habit.target_count
+        habit.remaining = max(0, habit.target_count - habit.progress)
+    # The ETag is a hash of this body, so it only changes with the period's entries (or the habits)
+    return etags.conditional_json(request, TodayProgress(date=today, habits=list(habits.values())))
+
 @router.get("/{habit_id}", response_model=HabitSchema)
 async def get_habit(
     habit_id: int,
@@ -158,7 +213,7 @@ async def get_habit_analytics(
     habit_id: int,
     days: int = 30,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     # Verify habit belongs to user
     habit = db.query(Habit).filter(
@@ -172,34 +227,95 @@ async def get_habit_analytics(
             detail="Habit not found"
         )
     
-    # Calculate date range
-    end_date = dt_date.today()
+    # Calculate date range, in the user's days
+    end_date = local_dates.today(current_user.timezone)
     start_date = end_date - timedelta(days=days-1)
     
-    # Get entries in date range
-    entries = db.query(HabitEntry).filter(
-        HabitEntry.habit_id == habit_id,
-        func.date(HabitEntry.date) >= start_date,
-        func.date(HabitEntry.date) <= end_date
-    ).all()
+    # Totals in date range, including archived months
+    totals = sum_totals(daily_entry_totals(db, start_date, end_date, habit_id=habit_id))
     
-    total_entries = len(entries)
-    completed_entries = len([e for e in entries if e.completed_count > 0])
+    total_entries = totals.entry_count
+    completed_entries = totals.completed_entries
     completion_rate = (completed_entries / total_entries * 100) if total_entries > 0 else 0
     
     # Calculate average completion
-    total_completion = sum(e.completed_count for e in entries)
+    total_completion = totals.completed_total
     average_completion = (total_completion / total_entries) if total_entries > 0 else 0
     
+    # Over the full history, not just the range; the stored counts may lag the job
+    current_streak, best_streak = habit_streaks(db, habit_id, end_date)
+    
     return HabitAnalytics(
         total_entries=total_entries,
         completed_entries=completed_entries,
         completion_rate=completion_rate,
-        current_streak=habit.streak_count,
-        best_streak=habit.best_streak,
+        current_streak=current_streak,
+        best_streak=best_streak,
         average_completion=average_completion
     )
 
+@router.get("/{habit_id}/analytics/series", response_model=HabitSeriesSchema)
+async def get_habit_series(
+    habit_id: int,
+    response: Response,
+    years: int = Query(1, ge=1, le=5, description="Length of the range, ending today"),
+    media_type: str = Depends(negotiation.response_format),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Day-level series, rolling completion rates, moving averages and weekday and monthly profiles"""
+    # NumPy is only loaded by this endpoint
+    from app.utils.habit_series import load_series, summarize_series
+
+    habit = db.query(Habit).filter(
+        Habit.id == habit_id,
+        Habit.owner_id == current_user.id
+    ).first()
+    
+    if not habit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
+        )
+    
+    end_date = local_dates.today(current_user.timezone)
+    series = load_series(db, [habit], end_date - timedelta(days=365 * years - 1), end_date)
+    result = HabitSeriesSchema(**summarize_series(series)[0])
+    if media_type == negotiation.MSGPACK:
+        return negotiation.msgpack_response(negotiation.packb(result.model_dump(mode="json")))
+    response.headers["Vary"] = "Accept"
+    return result
+
+@router.get("/{habit_id}/calendar", response_model=HabitCalendar)
+async def get_habit_calendar(
+    habit_id: int,
+    year: Optional[int] = Query(None, ge=1970, le=9999, description="Defaults to the current year"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Yearly heatmap and completion counts from the habit's completion bitmaps, with its streaks"""
+    habit = db.query(Habit).filter(
+        Habit.id == habit_id,
+        Habit.owner_id == current_user.id
+    ).first()
+    
+    if not habit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
+        )
+    
+    today = local_dates.today(current_user.timezone)
+    years = habit_calendar.load_calendars(db, habit_id)
+    # The same streaks as the analytics: in the habit's periods, counting any entry
+    current_streak, best_streak = habit_streaks(db, habit_id, today)
+    return HabitCalendar(
+        habit_id=habit_id,
+        **habit_calendar.year_summary(years, year or today.year),
+        current_streak=current_streak,
+        best_streak=best_streak
+    )
+
 @router.post("/{habit_id}/entries", response_model=HabitEntrySchema)
 async def create_habit_entry(
     habit_id: int,
@@ -219,8 +335,8 @@ async def create_habit_entry(
             detail="Habit not found"
         )
     
-    # Pick date (use provided or fallback to today)
-    entry_date = entry.date or dt_date.today()
+    # Pick date (use provided or fallback to the user's today)
+    entry_date = entry.date or local_dates.today(current_user.timezone)
 
     # Create entry (allow unlimited entries per day)
     db_entry = HabitEntry(
@@ -230,12 +346,12 @@ async def create_habit_entry(
         habit_id=habit_id
     )
     db.add(db_entry)
-    
-    # Update habit streak
-    update_habit_streak(db, habit)
-    
     db.commit()
     db.refresh(db_entry)
+    
+    # The streak is recomputed off the request path; if the job cannot be
+    # queued, the nightly reconciliation brings it up to date
+    recompute_habit_streak.delay_after_commit(habit.id, current_user.id)
     return db_entry
 
 @router.get("/{habit_id}/entries", response_model=List[HabitEntrySchema])
@@ -245,10 +361,11 @@ async def get_habit_entries(
     limit: int = 100,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
-    sort_by: Optional[str] = Query("date", description="Sort by field"),
+    sort_by: Optional[str] = Query("date", description="Sort by date"),
     sort_order: Optional[str] = Query("desc", description="Sort order (asc or desc)"),
+    media_type: str = Depends(negotiation.response_format),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     # Verify habit belongs to user
     habit = db.query(Habit).filter(
@@ -262,64 +379,24 @@ async def get_habit_entries(
             detail="Habit not found"
         )
     
-    query = db.query(HabitEntry).filter(
-        HabitEntry.habit_id == habit_id
-    )
-    
-    # Apply date filters
-    if date_from:
-        query = query.filter(func.date(HabitEntry.date) >= date_from)
-    
-    if date_to:
-        query = query.filter(func.date(HabitEntry.date) <= date_to)
+    query = entry_lists.apply(db.query(HabitEntry), {
+        "habit_id": habit_id,
+        "date_from": date_from,
+        "date_to": date_to,
+    }, sort_by, sort_order)
     
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(HabitEntry, sort_by).desc())
-    else:
-        query = query.order_by(getattr(HabitEntry, sort_by).asc())
-    
-    entries = query.offset(skip).limit(limit).all()
-    
-    return entries
-
-def update_habit_streak(db: Session, habit: Habit):
-    """Update habit streak count based on recent entries"""
-    entries = db.query(HabitEntry).filter(
-        HabitEntry.habit_id == habit.id
-    ).order_by(HabitEntry.date.desc()).limit(30).all()  # Last 30 entries
-    
-    if not entries:
-        habit.streak_count = 0
-        return
-    
-    # Calculate current streak
-    current_streak = 0
-    today = date.today()
-    
-    for entry in entries:
-        entry_date = entry.date.date()
-        expected_date = today - timedelta(days=current_streak)
-        
-        if entry_date == expected_date:
-            current_streak += 1
-        else:
-            break
-    
-    habit.streak_count = current_streak
-    if current_streak > habit.best_streak:
-        habit.best_streak = current_streak
-
+    rows = entry_list_serializer.fetch(query.offset(skip).limit(limit))
+    return entry_list_serializer.render(rows, media_type=media_type)
 
 @router.get("/analytics/aggregate", response_model=AggregateHabitAnalytics)
 async def get_aggregate_habit_analytics(
     days: int = 30,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get analytics for all habits combined"""
-    # Calculate date range
-    end_date = date.today()
+    # Calculate date range, in the user's days
+    end_date = local_dates.today(current_user.timezone)
     start_date = end_date - timedelta(days=days-1)
     
     # Get all habits for the user
@@ -330,30 +407,25 @@ async def get_aggregate_habit_analytics(
     total_habits = len(habits)
     active_habits = len([h for h in habits if h.is_active])
     
-    # Get entries in date range
-    entries = db.query(HabitEntry).join(Habit).filter(
-        Habit.owner_id == current_user.id,
-        func.date(HabitEntry.date) >= start_date,
-        func.date(HabitEntry.date) <= end_date
-    ).all()
+    # Per-day totals (live and archived) for the range and the 7-day trend
+    trend_start = end_date - timedelta(days=6)
+    daily = daily_entry_totals(db, min(start_date, trend_start), end_date, owner_id=current_user.id)
     
     # Calculate stats
-    total_entries = len(entries)
-    completed_entries = len([e for e in entries if e.completed_count > 0])
+    totals = sum_totals({day: t for day, t in daily.items() if day >= start_date})
+    total_entries = totals.entry_count
+    completed_entries = totals.completed_entries
     completion_rate = (completed_entries / total_entries * 100) if total_entries > 0 else 0
     
     # Habits completed today
-    today = date.today()
-    completed_today = db.query(HabitEntry).join(Habit).filter(
-        Habit.owner_id == current_user.id,
-        func.date(HabitEntry.date) == today,
-        HabitEntry.completed_count > 0
-    ).count()
-    
-    # Average streak and best streak
+    today = end_date
+    completed_today = daily.get(today, DayTotals()).completed_entries
+    
+    # Average streak and best streak, for every habit in one query
     if habits:
-        average_streak = sum(h.streak_count for h in habits) / len(habits)
-        best_streak = max(h.best_streak for h in habits)
+        streaks = streaks_by_habit(db, Habit.owner_id == current_user.id, today=today)
+        average_streak = sum(current for current, _ in streaks.values()) / len(habits)
+        best_streak = max((best for _, best in streaks.values()), default=0)
     else:
         average_streak = 0
         best_streak = 0
@@ -382,15 +454,9 @@ async def get_aggregate_habit_analytics(
     completion_trend = []
     for i in range(7):
         trend_date = end_date - timedelta(days=6-i)
-        completed_count = db.query(HabitEntry).join(Habit).filter(
-            Habit.owner_id == current_user.id,
-            func.date(HabitEntry.date) == trend_date,
-            HabitEntry.completed_count > 0
-        ).count()
-        
         completion_trend.append(HabitCompletionTrend(
             date=trend_date,
-            completed=completed_count
+            completed=daily.get(trend_date, DayTotals()).completed_entries
         ))
     
     # Category completion (by frequency)
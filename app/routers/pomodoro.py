@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime, date, timedelta
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.pomodoro import PomodoroSession
 from app.schemas.pomodoro import (
@@ -11,9 +11,24 @@ from app.schemas.pomodoro import (
     PomodoroAnalytics
 )
 from app.auth.dependencies import get_current_active_user
+from app.utils import local_dates
+from app.utils.serialization import ListSerializer
+from app.utils.sorting import Filter, ListQuery, equals
 
 router = APIRouter(prefix="/pomodoro", tags=["pomodoro"])
 
+pomodoro_list_serializer = ListSerializer(PomodoroSession, Pomodoro)
+pomodoro_lists = ListQuery(PomodoroSession, {
+    "owner_id": equals(PomodoroSession.owner_id),
+    "is_active": equals(PomodoroSession.is_active),
+    "search": Filter(
+        lambda value: func.concat(PomodoroSession.title, ' ', PomodoroSession.description).ilike(value),
+        prepare=lambda value: f"%{value}%"
+    ),
+    "created_from": local_dates.on_or_after(PomodoroSession.created_local_date),
+    "created_to": local_dates.on_or_before(PomodoroSession.created_local_date),
+}, sorts=("created_at",))
+
 @router.post("/", response_model=Pomodoro)
 async def create_pomodoro_session(
     pomodoro: PomodoroCreate,
@@ -30,22 +45,21 @@ async def create_pomodoro_session(
 async def get_pomodoro_analytics(
     days: int = 30,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get analytics for Pomodoro sessions"""
     # Validate days parameter
     if days <= 0 or days > 365:
         days = 30  # Default to 30 days if invalid
     
-    # Calculate date range
-    end_date = date.today()
+    # Calculate date range, in the user's days
+    end_date = local_dates.today(current_user.timezone)
     start_date = end_date - timedelta(days=days-1)
     
     # Get sessions in date range
     sessions = db.query(PomodoroSession).filter(
         PomodoroSession.owner_id == current_user.id,
-        func.date(PomodoroSession.created_at) >= start_date,
-        func.date(PomodoroSession.created_at) <= end_date
+        local_dates.day_where(PomodoroSession.created_local_date, lambda day: day.between(start_date, end_date))
     ).all()
     
     total_sessions = len(sessions)
@@ -78,35 +92,23 @@ async def get_pomodoro_sessions(
     search: Optional[str] = Query(None, description="Search in title or description"),
     created_from: Optional[date] = None,
     created_to: Optional[date] = None,
-    sort_by: Optional[str] = Query("created_at", description="Sort by field"),
+    sort_by: Optional[str] = Query("created_at", description="Sort by created_at"),
     sort_order: Optional[str] = Query("desc", description="Sort order (asc or desc)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(PomodoroSession).filter(PomodoroSession.owner_id == current_user.id)
-    
-    # Apply filters
-    if active_only:
-        query = query.filter(PomodoroSession.is_active == True)
-    
-    if search:
-        search_filter = func.concat(PomodoroSession.title, ' ', PomodoroSession.description).ilike(f"%{search}%")
-        query = query.filter(search_filter)
-    
-    if created_from:
-        query = query.filter(func.date(PomodoroSession.created_at) >= created_from)
-    
-    if created_to:
-        query = query.filter(func.date(PomodoroSession.created_at) <= created_to)
-    
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(PomodoroSession, sort_by).desc())
-    else:
-        query = query.order_by(getattr(PomodoroSession, sort_by).asc())
-    
-    pomodoros = query.offset(skip).limit(limit).all()
-    return pomodoros
+    selected = pomodoro_list_serializer.parse_fields(fields)
+    query = pomodoro_lists.apply(db.query(PomodoroSession), {
+        "owner_id": current_user.id,
+        "is_active": True if active_only else None,
+        "search": search or None,
+        "created_from": created_from,
+        "created_to": created_to,
+    }, sort_by, sort_order)
+    
+    rows = pomodoro_list_serializer.fetch(query.offset(skip).limit(limit), selected)
+    return pomodoro_list_serializer.render(rows, selected)
 
 @router.get("/{pomodoro_id}", response_model=Pomodoro)
 async def get_pomodoro_session(
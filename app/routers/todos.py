@@ -1,13 +1,19 @@
-from fastapi import APIRouter,Depends,HTTPException,status, Query
+from fastapi import APIRouter,Depends,HTTPException,Response,status, Query
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
-from typing import List, Optional
-from datetime import datetime, date
-from app.database import get_db 
+from typing import Any, Dict, List, Optional
+from datetime import datetime, date, time, timedelta, timezone
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.models.todo import Todo
-from app.schemas.todo import TodoCreate,TodoUpdate, Todo as TodoSchema
+from app.models.todo import Todo, TodoCategory, TodoOccurrence
+from app.schemas.todo import TodoCreate,TodoUpdate,TodoMove,TodoOccurrenceUpdate, Todo as TodoSchema, TodoCategory as TodoCategorySchema, TodoOccurrence as TodoOccurrenceSchema, TodoTree
 from app.auth.dependencies import get_current_active_user
+from app.jobs.tasks import rebalance_todo_ranks
+from app.utils import local_dates, negotiation, ranking, recurrence, subtasks
+from app.utils.todo_counts import rebuild_counts
+from app.utils.serialization import ListSerializer
+from app.utils.sorting import Filter, ListQuery, contains_any, equals
 from typing import Optional
 
 
@@ -16,17 +22,79 @@ router=APIRouter(
     tags=["todos"]
 )
 
+todo_list_serializer = ListSerializer(Todo, TodoSchema)
+occurrence_list_adapter = TypeAdapter(List[Dict[str, Any]])
+todo_lists = ListQuery(Todo, {
+    "owner_id": equals(Todo.owner_id),
+    "parent_id": equals(Todo.parent_id),
+    "priority": equals(Todo.priority),
+    "category": equals(Todo.category),
+    "completed": equals(Todo.is_completed),
+    "search": contains_any(Todo.title, Todo.description),
+    "created_from": local_dates.on_or_after(Todo.created_local_date),
+    "created_to": local_dates.on_or_before(Todo.created_local_date),
+    "due_date_from": Filter(lambda value: Todo.due_date >= value),
+    "due_date_to": Filter(lambda value: Todo.due_date <= value),
+}, sorts=("created_at", "due_date", "rank", "title"))
+
+
+def _rebalance_if_long(rank: str, owner_id: int):
+    # Queued again by the next long key if the broker is down now
+    if len(rank) > ranking.MAX_KEY_LENGTH:
+        rebalance_todo_ranks.delay_after_commit(owner_id)
+
 
 @router.post("/",response_model=TodoSchema)
 async def create_todo(todo:TodoCreate,db:Session=Depends(get_db),current_user:User=Depends(get_current_active_user)):
-    new_todo=Todo(**todo.dict(),owner_id=current_user.id)
+    recurrence.validate_rule(todo.recurrence,todo.recurrence_interval)
+    subtasks.check_parent(db,None,todo.parent_id,current_user.id)
+    # New todos go to the top of the manual order
+    rank=ranking.key_between(None,ranking.first_rank(db,current_user.id))
+    new_todo=Todo(**todo.dict(),owner_id=current_user.id,rank=rank)
     db.add(new_todo)
     db.commit()
     db.refresh(new_todo)
+    _rebalance_if_long(rank,current_user.id)
     return new_todo
 
 
-@router.get("/",response_model=List[TodoSchema])
+def _window_page(db: Session, filters: Dict[str, Any], start: date, end: date, completed: Optional[bool],
+                 sort_by: str, sort_order: str, skip: int, limit: int, selected, media_type: str):
+    """One page of one-off todos due in ``[start, end]`` merged with the occurrences due then."""
+    recurrence.validate_window(start, end)
+    one_off = todo_lists.apply(db.query(Todo), dict(filters, completed=completed), sort_by, sort_order).filter(
+        Todo.recurrence.is_(None),
+        Todo.due_date >= datetime.combine(start, time.min),
+        Todo.due_date < datetime.combine(end + timedelta(days=1), time.min),
+    )
+    # The first skip + limit one-off rows are all the merge below can use
+    items = [
+        dict(row._asdict(), occurrence_date=None)
+        for row in todo_list_serializer.fetch(one_off.limit(skip + limit))
+    ]
+
+    series = todo_lists.filter(db.query(Todo), filters).filter(
+        Todo.recurrence.isnot(None),
+        or_(Todo.due_date.is_(None), Todo.due_date < datetime.combine(end + timedelta(days=1), time.min)),
+        or_(Todo.recurrence_until.is_(None), Todo.recurrence_until >= start),
+    ).all()
+    occurrences = recurrence.expand(db, series, start, end, todo_list_serializer.fields)
+    if completed is not None:
+        occurrences = [item for item in occurrences if item["is_completed"] == completed]
+
+    descending = sort_order == "desc"
+    page = sorted(items + occurrences, key=recurrence.sort_key(sort_by, descending), reverse=descending)
+    keep = set(selected) | {"occurrence_date"}
+    page = [{name: value for name, value in item.items() if name in keep} for item in page[skip:skip + limit]]
+    if media_type == negotiation.MSGPACK:
+        return negotiation.msgpack_response(
+            negotiation.packb(occurrence_list_adapter.dump_python(page, mode="json"))
+        )
+    return Response(content=occurrence_list_adapter.dump_json(page), media_type=negotiation.JSON,
+                    headers={"Vary": "Accept"})
+
+
+@router.get("/",response_model=List[TodoOccurrenceSchema])
 async def get_todos(
     skip: int = 0,
     limit: int = 50,
@@ -38,50 +106,41 @@ async def get_todos(
     due_date_to: Optional[date] = None,
     created_from: Optional[date] = None,
     created_to: Optional[date] = None,
-    sort_by: Optional[str] = Query("created_at", description="Sort by field"),
+    sort_by: Optional[str] = Query("created_at", description="Sort by created_at, due_date, rank or title"),
     sort_order: Optional[str] = Query("desc", description="Sort order (asc or desc)"),
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    parent_id: Optional[int] = Query(None, description="Only the direct subtasks of this todo"),
+    media_type: str = Depends(negotiation.response_format),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Todo).filter(Todo.owner_id == current_user.id)
-    
-    # Apply filters
-    if completed is not None:
-        query = query.filter(Todo.is_completed == completed)
-    
-    if priority:
-        query = query.filter(Todo.priority == priority)
-    
-    if category:
-        query = query.filter(Todo.category == category)
-    
-    if search:
-        search_filter = or_(
-            Todo.title.contains(search),
-            Todo.description.contains(search)
-        )
-        query = query.filter(search_filter)
-    
-    if due_date_from:
-        query = query.filter(Todo.due_date >= due_date_from)
-    
-    if due_date_to:
-        query = query.filter(Todo.due_date <= due_date_to)
-    
-    if created_from:
-        query = query.filter(func.date(Todo.created_at) >= created_from)
-    
-    if created_to:
-        query = query.filter(func.date(Todo.created_at) <= created_to)
-    
-    # Apply sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(Todo, sort_by).desc())
-    else:
-        query = query.order_by(getattr(Todo, sort_by).asc())
+    selected = todo_list_serializer.parse_fields(fields)
+    filters = {
+        "owner_id": current_user.id,
+        "parent_id": parent_id,
+        "priority": priority or None,
+        "category": category or None,
+        "search": search or None,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+
+    if due_date_from and due_date_to:
+        # A due date window expands recurring todos into their occurrences
+        return _window_page(db, filters, due_date_from, due_date_to, completed,
+                            sort_by, sort_order, skip, limit, selected, media_type)
+
+    filters.update(completed=completed, due_date_from=due_date_from, due_date_to=due_date_to)
+    query = todo_lists.apply(db.query(Todo), filters, sort_by, sort_order)
     
-    todos = query.offset(skip).limit(limit).all()
-    return [TodoSchema.from_orm(todo) for todo in todos]
+    rows = todo_list_serializer.fetch(query.offset(skip).limit(limit), selected)
+    return todo_list_serializer.render(rows, selected, media_type)
+
+@router.get("/categories",response_model=List[TodoCategorySchema])
+async def get_categories(db:Session=Depends(get_read_db),current_user:User=Depends(get_current_active_user)):
+    """The user's categories with how many todos use each."""
+    return db.query(TodoCategory).filter(TodoCategory.owner_id==current_user.id).order_by(TodoCategory.name).all()
+
 
 @router.get("/{todo_id}",response_model=TodoSchema)
 async def get_todo(todo_id:int,db:Session=Depends(get_db),current_user:User=Depends(get_current_active_user)):
@@ -91,6 +150,147 @@ async def get_todo(todo_id:int,db:Session=Depends(get_db),current_user:User=Depe
     return todo
 
 
+def _progress(todo: Todo) -> Optional[float]:
+    return todo.completed_child_count / todo.child_count * 100 if todo.child_count else None
+
+
+@router.get("/{todo_id}/tree", response_model=TodoTree)
+async def get_todo_tree(
+    todo_id: int,
+    max_depth: int = Query(5, ge=0, le=subtasks.MAX_TREE_DEPTH, description="Levels of subtasks to include"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """A todo with its nested subtasks, read in one recursive query."""
+    rows = subtasks.fetch_tree(db, todo_id, current_user.id, max_depth)
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+
+    nodes = {}
+    for todo, depth in rows:
+        node = TodoTree.model_validate({
+            **TodoSchema.model_validate(todo).model_dump(), "depth": depth, "progress": _progress(todo)
+        })
+        nodes[todo.id] = node
+        # Rows come ordered by depth, so parents are seen before their children
+        if depth:
+            nodes[todo.parent_id].children.append(node)
+    return nodes[todo_id]
+
+
+def _neighbour_ranks(db: Session, todo: Todo, move: TodoMove):
+    ids = [todo_id for todo_id in (move.after_id, move.before_id) if todo_id is not None]
+    ranks = dict(db.query(Todo.id, Todo.rank).filter(Todo.owner_id == todo.owner_id, Todo.id.in_(ids)).all())
+    if len(ranks) != len(ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Neighbouring todo not found")
+    if todo.rank is None or None in ranks.values():
+        return None
+    previous, following = ranks.get(move.after_id), ranks.get(move.before_id)
+    if move.before_id is None:
+        following = ranking.rank_after(db, todo.owner_id, previous, todo.id)
+    elif move.after_id is None:
+        previous = ranking.rank_before(db, todo.owner_id, following, todo.id)
+    return previous, following
+
+
+@router.post("/{todo_id}/move", response_model=TodoSchema)
+async def move_todo(
+    todo_id: int,
+    move: TodoMove,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Place a todo after ``after_id`` and/or before ``before_id``; only its rank changes."""
+    if move.after_id is None and move.before_id is None:
+        raise HTTPException(status_code=400, detail="Give after_id or before_id")
+    if todo_id in (move.after_id, move.before_id):
+        raise HTTPException(status_code=400, detail="A todo cannot be moved next to itself")
+
+    todo = db.query(Todo).filter(
+        Todo.id == todo_id,
+        Todo.owner_id == current_user.id
+    ).first()
+    
+    if not todo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo not found"
+        )
+
+    neighbours = _neighbour_ranks(db, todo, move)
+    if neighbours is None or (None not in neighbours and neighbours[0] == neighbours[1]):
+        # Unranked rows, or equal keys left by two concurrent moves: respace them
+        # in the background, outside this request's transaction
+        rebalance_todo_ranks.delay(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The todos are being reordered; retry the move"
+        )
+    previous, following = neighbours
+    if previous is not None and following is not None and previous >= following:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="after_id must come before before_id; reload the list"
+        )
+
+    todo.rank = ranking.key_between(previous, following)
+    db.commit()
+    db.refresh(todo)
+    _rebalance_if_long(todo.rank, current_user.id)
+    return todo
+
+
+@router.put("/{todo_id}/occurrences/{occurrence_date}", response_model=TodoOccurrenceSchema)
+async def update_occurrence(
+    todo_id: int,
+    occurrence_date: date,
+    occurrence_update: TodoOccurrenceUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Complete or edit one occurrence of a recurring todo."""
+    todo = db.query(Todo).filter(
+        Todo.id == todo_id,
+        Todo.owner_id == current_user.id
+    ).first()
+
+    if not todo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo not found"
+        )
+    if todo.recurrence is None:
+        raise HTTPException(status_code=400, detail="Todo is not recurring")
+    if not recurrence.is_occurrence(todo, occurrence_date):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo does not occur on that date"
+        )
+
+    occurrence = db.get(TodoOccurrence, (todo.id, occurrence_date))
+    if occurrence is None:
+        occurrence = TodoOccurrence(todo_id=todo.id, occurrence_date=occurrence_date, is_completed=False)
+        db.add(occurrence)
+
+    update_data = occurrence_update.dict(exclude_unset=True)
+    if "is_completed" in update_data:
+        if update_data["is_completed"] and not occurrence.is_completed:
+            occurrence.completed_at = datetime.now(timezone.utc)
+        elif not update_data["is_completed"]:
+            occurrence.completed_at = None
+    for field, value in update_data.items():
+        setattr(occurrence, field, value)
+
+    # Back to plain: nothing left worth storing
+    if not occurrence.is_completed and all(getattr(occurrence, name) is None for name in recurrence.OVERRIDE_FIELDS):
+        if occurrence in db.new:
+            db.expunge(occurrence)
+        else:
+            db.delete(occurrence)
+    db.commit()
+    return recurrence.expand(db, [todo], occurrence_date, occurrence_date, todo_list_serializer.fields)[0]
+
+
 @router.put("/{todo_id}", response_model=TodoSchema)
 async def update_todo(
     todo_id: int,
@@ -111,14 +311,21 @@ async def update_todo(
     
     # Update fields
     update_data = todo_update.dict(exclude_unset=True)
+    if "parent_id" in update_data:
+        subtasks.check_parent(db, todo.id, update_data["parent_id"], current_user.id)
+    recurrence.validate_rule(
+        update_data.get("recurrence", todo.recurrence),
+        update_data.get("recurrence_interval", todo.recurrence_interval)
+    )
+    was_completed = todo.is_completed
     for field, value in update_data.items():
         setattr(todo, field, value)
     
     # Set completion timestamp
     if todo_update.is_completed is not None:
-        if todo_update.is_completed and not todo.is_completed:
-            todo.completed_at = datetime.now()
-        elif not todo_update.is_completed and todo.is_completed:
+        if todo_update.is_completed and not was_completed:
+            todo.completed_at = datetime.now(timezone.utc)
+        elif not todo_update.is_completed and was_completed:
             todo.completed_at = None
     
     db.commit()
@@ -143,5 +350,11 @@ async def delete_todo(
             detail="Todo not found"
         )
     
+    has_subtasks = bool(todo.child_count)
     db.delete(todo)
+    db.flush()
+    if has_subtasks:
+        # The database cascade removed the subtasks without going through the
+        # flush hook, so recount the owner's categories and priorities
+        rebuild_counts(db.connection(bind_arguments={"mapper": Todo}), current_user.id)
     db.commit()
\ No newline at end of file
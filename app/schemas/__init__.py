@@ -1,4 +1,4 @@
-from .habit import HabitBase, HabitCreate, HabitUpdate, HabitEntryBase, HabitEntryCreate, HabitEntry, Habit
+from .habit import HabitBase, HabitCreate, HabitUpdate, HabitEntryBase, HabitEntryCreate, HabitEntry, HabitSummary, Habit
 from .todo import TodoBase, TodoCreate, TodoUpdate, Todo
 from .user import UserBase, UserCreate, UserUpdate, User, Token, TokenData
 from .analytics import AggregateHabitStats, HabitFrequencyDistribution, HabitCompletionTrend, AggregateHabitAnalytics
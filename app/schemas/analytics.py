@@ -23,4 +23,32 @@ class AggregateHabitAnalytics(BaseModel):
     stats: AggregateHabitStats
     frequency_distribution: HabitFrequencyDistribution
     completion_trend: List[HabitCompletionTrend]
-    category_completion: Dict[str, int]
\ No newline at end of file
+    category_completion: Dict[str, int]
+
+class HabitSeries(BaseModel):
+    habit_id: int
+    start: date
+    end: date
+    completion_rate: float
+    # One value per day from start to end
+    progress: List[int]
+    completed: List[int]
+    # Keyed by window length in days
+    rolling_completion_rate: Dict[str, List[float]]
+    moving_average: Dict[str, List[float]]
+    weekday_completion_rate: List[float]  # Monday first
+    months: List[str]
+    monthly_completion_rate: List[float]
+
+
+class HabitCalendar(BaseModel):
+    habit_id: int
+    year: int
+    days: int
+    completed_days: int
+    monthly_completed_days: List[int]
+    longest_streak: int  # within the year
+    completed: List[int]  # one value per day of the year
+    # Over the full history, as in HabitAnalytics
+    current_streak: int
+    best_streak: int
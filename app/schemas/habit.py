@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 
 class HabitBase(BaseModel):
@@ -34,7 +34,7 @@ class HabitEntry(HabitEntryBase):
     class Config:
         from_attributes = True
 
-class Habit(HabitBase):
+class HabitSummary(HabitBase):
     id: int
     is_active: bool
     streak_count: int
@@ -42,7 +42,32 @@ class Habit(HabitBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     owner_id: int
-    entries: List[HabitEntry] = []
     
     class Config:
         from_attributes = True
+
+class Habit(HabitSummary):
+    entries: List[HabitEntry] = []
+
+
+class DayProgress(BaseModel):
+    day: date
+    progress: int
+
+class HabitProgress(BaseModel):
+    habit_id: int
+    name: str
+    frequency: str
+    target_count: int
+    period: str  # day, week or month
+    period_start: date
+    period_end: date
+    progress: int  # sum of completed_count in the period
+    entries: int
+    completed: bool
+    remaining: int
+    days: Optional[List[DayProgress]] = None  # weekly habits: every day of the week
+
+class TodayProgress(BaseModel):
+    date: date
+    habits: List[HabitProgress]
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
-from datetime import datetime 
-from typing import Optional
+from pydantic import BaseModel,field_validator
+from datetime import date, datetime 
+from typing import List, Literal, Optional
+
+Recurrence=Literal['daily','weekly','monthly']
 
 class TodoBase(BaseModel):
     title:str
@@ -8,6 +10,10 @@ class TodoBase(BaseModel):
     priority:Optional[str]='medium'
     category:Optional[str]=None
     due_date:Optional[datetime]=None
+    recurrence:Optional[Recurrence]=None
+    recurrence_interval:int=1
+    recurrence_until:Optional[date]=None
+    parent_id:Optional[int]=None
 
 class TodoCreate(TodoBase):
     pass
@@ -19,6 +25,31 @@ class TodoUpdate(BaseModel):
     priority:Optional[str]=None
     category:Optional[str]=None
     due_date:Optional[datetime]=None
+    recurrence:Optional[Recurrence]=None
+    recurrence_interval:Optional[int]=None
+    recurrence_until:Optional[date]=None
+    parent_id:Optional[int]=None
+
+    @field_validator('recurrence_interval')
+    @classmethod
+    def interval_not_null(cls,value):
+        # Leave the field out to keep the interval; the column cannot be null
+        if value is None:
+            raise ValueError('recurrence_interval cannot be null')
+        return value
+
+
+class TodoMove(BaseModel):
+    # Neighbours in the new position; give either or both
+    after_id:Optional[int]=None
+    before_id:Optional[int]=None
+
+
+class TodoOccurrenceUpdate(BaseModel):
+    title:Optional[str]=None
+    description:Optional[str]=None
+    priority:Optional[str]=None
+    is_completed:Optional[bool]=None
 
 
 class Todo(TodoBase):
@@ -28,6 +59,28 @@ class Todo(TodoBase):
     updated_at:Optional[datetime]=None
     completed_at:Optional[datetime]=None
     owner_id:int
+    rank:Optional[str]=None
+    child_count:int=0
+    completed_child_count:int=0
+
+    class Config:
+        from_attributes=True
+
+
+class TodoOccurrence(Todo):
+    # Set on occurrences of recurring todos; id is then the series' id
+    occurrence_date:Optional[date]=None
+
+
+class TodoTree(Todo):
+    depth:int
+    progress:Optional[float]=None  # percent of direct subtasks completed
+    children:List['TodoTree']=[]
+
+
+class TodoCategory(BaseModel):
+    name:str
+    todo_count:int
 
     class Config:
         from_attributes=True
@@ -1,6 +1,7 @@
-from pydantic import BaseModel,EmailStr
+from pydantic import BaseModel,EmailStr,field_validator
 from datetime import datetime
 from typing import Optional
+from app.utils.local_dates import is_valid as is_valid_timezone
 
 class UserBase(BaseModel):
     email:EmailStr
@@ -17,12 +18,25 @@ class UserUpdate(UserBase):
     username:Optional[str]=None
 
 
+class UserSettingsUpdate(BaseModel):
+    full_name:Optional[str]=None
+    timezone:Optional[str]=None  # IANA name, e.g. Europe/Berlin
+
+    @field_validator('timezone')
+    @classmethod
+    def known_timezone(cls,value):
+        if value is not None and not is_valid_timezone(value):
+            raise ValueError(f'Unknown timezone {value!r}')
+        return value
+
+
 class User(UserBase):
     id:int
     is_active:bool
     is_verified:bool
     is_admin:bool
     profile_picture:Optional[str]=None
+    timezone:str='UTC'
     created_at:datetime
 
     class Config:
@@ -0,0 +1,274 @@
+"""Horizontal sharding of per-user data.
+
+The primary database (``DATABASE_URL``) stays the directory: it holds every
+``users`` row, including the ``shard_id`` that says where that user's todos,
+habits, habit entries and pomodoro sessions live. ``SHARD_URLS`` lists the
+shard databases by index (a JSON list in the environment; an entry equal to
+``DATABASE_URL`` reuses the primary engine). With no shards configured every
+user is on shard 0 and everything behaves like a single database.
+
+Requests are routed in ``get_current_user``: once the user is loaded, the
+request's session gets per-mapper binds for the sharded models, so routers keep
+using ``db.query(Todo)`` unchanged. Each shard needs the full schema
+(``DATABASE_URL=<shard url> alembic upgrade head``); users are mirrored onto
+their shard as bare ``id``/``email`` rows so the ``owner_id`` foreign keys hold.
+
+Admin listings scatter the same query to every shard and merge the sorted
+pages (``scatter_page``). Users are moved between shards with::
+
+    python -m app.sharding move --user-id 42 --to 3
+    python -m app.sharding counts
+"""
+import argparse
+import heapq
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import create_engine, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.models import (
+    Habit, HabitEntry, HabitEntryArchive, HabitYearCalendar, PomodoroSession, Todo, TodoCategory, TodoOccurrence,
+    TodoPriorityCount, User
+)
+
+settings = get_settings()
+
+SHARDED_MODELS = (
+    Todo, TodoOccurrence, TodoCategory, TodoPriorityCount, Habit, HabitEntry, HabitEntryArchive, HabitYearCalendar,
+    PomodoroSession
+)
+
+
+class ShardRouter:
+    def __init__(self, urls: Sequence[str]):
+        self.urls = list(urls)
+        self.engines = [
+            engine if url == settings.database_url else create_engine(url)
+            for url in self.urls
+        ]
+        # (shard_id, user_id) pairs known to have their users row on the shard
+        self._mirrored: Set[Tuple[int, int]] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def shard_for_new_user(self, email: Optional[str]) -> int:
+        if not self.enabled:
+            return 0
+        return zlib.crc32((email or "").lower().encode()) % len(self.engines)
+
+    def engine_for(self, shard_id: int):
+        if not self.enabled:
+            return engine
+        if not 0 <= shard_id < len(self.engines):
+            raise ValueError(f"Unknown shard {shard_id}; {len(self.engines)} configured")
+        return self.engines[shard_id]
+
+    def bind_user(self, db: Session, user: User):
+        """Route the session's per-user tables to ``user``'s shard."""
+        if not self.enabled:
+            return
+        shard_engine = self.engine_for(user.shard_id)
+        self.ensure_mirrored(user.shard_id, user)
+        for model in SHARDED_MODELS:
+            db.bind_mapper(model, shard_engine)
+
+    def ensure_mirrored(self, shard_id: int, user: User):
+        key = (shard_id, user.id)
+        if key in self._mirrored:
+            return
+        with self.engine_for(shard_id).begin() as conn:
+            exists = conn.execute(select(User.id).where(User.id == user.id)).first()
+            if exists is None:
+                conn.execute(insert(User.__table__).values(
+                    id=user.id, email=user.email, shard_id=shard_id, is_active=True
+                ))
+        self._mirrored.add(key)
+
+    def forget(self, shard_id: int, user_id: int):
+        self._mirrored.discard((shard_id, user_id))
+
+    @contextmanager
+    def sessions(self, db: Session):
+        """One session per shard, or just ``db`` when sharding is off."""
+        if not self.enabled:
+            yield [db]
+            return
+        shard_sessions = [Session(bind=shard_engine) for shard_engine in self.engines]
+        try:
+            yield shard_sessions
+        finally:
+            for session in shard_sessions:
+                session.close()
+
+
+shard_router = ShardRouter(settings.shard_urls)
+
+
+@event.listens_for(User, "before_insert")
+def _assign_shard(mapper, connection, user):
+    if user.shard_id is None:
+        user.shard_id = shard_router.shard_for_new_user(user.email)
+
+
+def _merge_key(sort_by: str):
+    def key(row):
+        value = getattr(row, sort_by)
+        # Matches ORDER BY <sort_by> ASC NULLS LAST / DESC NULLS FIRST, id:
+        # NULLs sort as the largest value, as in a plain index
+        return (value is None, value if value is not None else 0, row.id)
+    return key
+
+
+def scatter_page(sessions: List[Session], build_query: Callable, serializer, sort_by: str,
+                 descending: bool, skip: int, limit: int):
+    """Fetch one page of rows ordered by ``sort_by`` across all shards.
+
+    ``build_query(session)`` must return the filtered query ordered by
+    ``sort_by`` with NULLs as the largest value (``ListQuery.apply`` with
+    ``explicit_nulls``) and then by ``id`` in the same direction. Each shard returns its first ``skip + limit``
+    rows and the sorted streams are merged, so deep pages cost more.
+    """
+    if len(sessions) == 1:
+        return serializer.fetch(build_query(sessions[0]).offset(skip).limit(limit))
+    if sort_by not in serializer.fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot sort by {sort_by}"
+        )
+    per_shard = [serializer.fetch(build_query(session).limit(skip + limit)) for session in sessions]
+    merged = heapq.merge(*per_shard, key=_merge_key(sort_by), reverse=descending)
+    return list(islice(merged, skip, skip + limit))
+
+
+def _rows(session: Session, model, *criteria) -> List[Dict]:
+    return [dict(row) for row in session.execute(select(model.__table__).where(*criteria)).mappings()]
+
+
+def _copy(dst: Session, model, rows: List[Dict]) -> int:
+    for row in rows:
+        row.pop("id", None)
+    if rows:
+        dst.execute(insert(model), rows)
+    return len(rows)
+
+
+def move_user(user_id: int, target: int) -> Dict[str, int]:
+    """Copy a user's rows to ``target``, repoint the directory and delete the originals.
+
+    Rows get new ids on the target shard (ids are per-shard sequences). The user
+    is marked inactive while the copy runs so no writes land on the old shard.
+    Only the rows that were copied are deleted from the source.
+    """
+    if not shard_router.enabled:
+        raise ValueError("Sharding is not enabled; there is nowhere to move users to")
+    with SessionLocal() as directory:
+        user = directory.get(User, user_id)
+        if user is None:
+            raise ValueError(f"User {user_id} not found")
+        source = user.shard_id
+        if source == target:
+            return {}
+        source_engine, target_engine = shard_router.engine_for(source), shard_router.engine_for(target)
+        # Copying a database onto itself and then deleting the originals would
+        # delete the copies too
+        if source_engine is target_engine or str(source_engine.url) == str(target_engine.url):
+            raise ValueError(f"Shards {source} and {target} are the same database")
+        was_active = user.is_active
+        user.is_active = False
+        directory.commit()
+
+        moved = {}
+        try:
+            with Session(bind=source_engine) as src, Session(bind=target_engine) as dst:
+                shard_router.ensure_mirrored(target, user)
+                habit_ids = {}
+                for habit in _rows(src, Habit, Habit.owner_id == user_id):
+                    old_id = habit.pop("id")
+                    habit_ids[old_id] = dst.execute(insert(Habit).values(**habit)).inserted_primary_key[0]
+                moved["habits"] = len(habit_ids)
+                for model in (HabitEntry, HabitEntryArchive, HabitYearCalendar):
+                    rows = _rows(src, model, model.habit_id.in_(habit_ids)) if habit_ids else []
+                    for row in rows:
+                        row["habit_id"] = habit_ids[row["habit_id"]]
+                    moved[model.__tablename__] = _copy(dst, model, rows)
+                todo_ids, parents = {}, {}
+                for todo in _rows(src, Todo, Todo.owner_id == user_id):
+                    old_id = todo.pop("id")
+                    parents[old_id] = todo.pop("parent_id")
+                    todo_ids[old_id] = dst.execute(insert(Todo).values(**todo)).inserted_primary_key[0]
+                # Subtasks are repointed once every todo has its new id
+                for old_id, parent_id in parents.items():
+                    if parent_id is not None:
+                        dst.execute(
+                            update(Todo).where(Todo.id == todo_ids[old_id]).values(parent_id=todo_ids[parent_id])
+                        )
+                moved["todos"] = len(todo_ids)
+                rows = _rows(src, TodoOccurrence, TodoOccurrence.todo_id.in_(todo_ids)) if todo_ids else []
+                for row in rows:
+                    row["todo_id"] = todo_ids[row["todo_id"]]
+                moved["todo_occurrences"] = _copy(dst, TodoOccurrence, rows)
+                copied_ids = {}
+                for model in (PomodoroSession, TodoCategory):
+                    rows = _rows(src, model, model.owner_id == user_id)
+                    copied_ids[model] = [row["id"] for row in rows]
+                    moved[model.__tablename__] = _copy(dst, model, rows)
+                rows = _rows(src, TodoPriorityCount, TodoPriorityCount.owner_id == user_id)
+                priorities = [row["priority"] for row in rows]
+                moved[TodoPriorityCount.__tablename__] = _copy(dst, TodoPriorityCount, rows)
+                dst.commit()
+
+                user.shard_id = target
+                directory.commit()
+
+                if habit_ids:
+                    for model in (HabitEntry, HabitEntryArchive, HabitYearCalendar):
+                        src.query(model).filter(model.habit_id.in_(habit_ids)).delete(synchronize_session=False)
+                if todo_ids:
+                    src.query(TodoOccurrence).filter(TodoOccurrence.todo_id.in_(todo_ids)).delete(synchronize_session=False)
+                copied_ids[Habit], copied_ids[Todo] = list(habit_ids), list(todo_ids)
+                for model, ids in copied_ids.items():
+                    if ids:
+                        src.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                if priorities:
+                    src.query(TodoPriorityCount).filter(
+                        TodoPriorityCount.owner_id == user_id, TodoPriorityCount.priority.in_(priorities)
+                    ).delete(synchronize_session=False)
+                src.commit()
+        finally:
+            user.is_active = was_active
+            directory.commit()
+    return moved
+
+
+def shard_counts() -> Dict[int, int]:
+    with SessionLocal() as directory:
+        return dict(directory.query(User.shard_id, func.count(User.id)).group_by(User.shard_id).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    move = commands.add_parser("move", help="Move one user's data to another shard")
+    move.add_argument("--user-id", type=int, required=True)
+    move.add_argument("--to", type=int, required=True, dest="target")
+    commands.add_parser("counts", help="Users per shard")
+    args = parser.parse_args()
+
+    if args.command == "move":
+        moved = move_user(args.user_id, args.target)
+        print(f"moved user {args.user_id} to shard {args.target}: {moved or 'already there'}")
+    else:
+        for shard_id, count in sorted(shard_counts().items()):
+            print(f"shard {shard_id}: {count} users")
+
+
+if __name__ == "__main__":
+    main()
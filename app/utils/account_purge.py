@@ -0,0 +1,78 @@
+"""Background deletion of user accounts.
+
+Deleting a user through the ORM used to load every todo, habit, entry and
+pomodoro session into memory and delete them row by row inside one request.
+``admin.delete_user`` now only marks the user inactive and queues the
+``purge_user_account`` job (app/jobs/tasks.py). The job runs ``purge_user``,
+which deletes their data in bounded batches, committing after each one so no
+transaction or lock is held for long, and finally removes the user row. Anything left at that point is removed by ``ON DELETE CASCADE``.
+
+A purge that dies halfway leaves an inactive user with part of their data;
+the job's retry (or deleting the user again) resumes it.
+"""
+import logging
+from typing import Dict
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Habit, HabitEntry, HabitEntryArchive, HabitYearCalendar, PomodoroSession, Todo, User
+from app.sharding import shard_router
+
+logger = logging.getLogger("app.account_purge")
+
+BATCH_SIZE = 1000
+
+
+def _delete_in_batches(db: Session, model, id_query, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        count = db.execute(
+            delete(model).where(model.id.in_(id_query.limit(batch_size).scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def purge_user_data(db: Session, user_id: int, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Delete everything owned by ``user_id`` from ``db``, a batch at a time."""
+    habit_ids = select(Habit.id).where(Habit.owner_id == user_id)
+    deleted = {
+        "habit_entries": _delete_in_batches(
+            db, HabitEntry, select(HabitEntry.id).where(HabitEntry.habit_id.in_(habit_ids)), batch_size
+        ),
+        "habit_entry_archive": 0,
+        "habit_year_calendars": 0,
+    }
+    # Archived totals and calendars have no id; they are at most one row per habit and day (or year)
+    for habit_id in db.execute(habit_ids).scalars().all():
+        for model in (HabitEntryArchive, HabitYearCalendar):
+            deleted[model.__tablename__] += db.execute(delete(model).where(model.habit_id == habit_id)).rowcount
+        db.commit()
+    for model in (Todo, PomodoroSession, Habit):
+        deleted[model.__tablename__] = _delete_in_batches(
+            db, model, select(model.id).where(model.owner_id == user_id), batch_size
+        )
+    return deleted
+
+
+def purge_user(user_id: int, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    with SessionLocal() as directory:
+        user = directory.get(User, user_id)
+        if user is None:
+            return {}
+        with Session(bind=shard_router.engine_for(user.shard_id)) as db:
+            deleted = purge_user_data(db, user_id, batch_size)
+            if shard_router.enabled:
+                # The shard's mirror of the users row
+                db.execute(delete(User).where(User.id == user_id))
+                db.commit()
+                shard_router.forget(user.shard_id, user_id)
+        directory.delete(user)
+        directory.commit()
+    logger.info("Purged user %s: %s", user_id, deleted)
+    return deleted
@@ -1,92 +1,155 @@
 import random
+import secrets
 import string
-import redis
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from functools import lru_cache
+from typing import Optional
 from app.config import get_settings
+from app.utils.redis_client import get_redis
 
 settings = get_settings()
 
-# Redis client for OTP storage
-redis_client = redis.from_url(settings.redis_url)
-
-# Email configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME=settings.mail_from_name,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
-
-fastmail = FastMail(conf)
+
+@lru_cache
+def get_fastmail():
+    # fastapi_mail is heavy to import, so the mailer is only built on first send
+    from fastapi_mail import FastMail, ConnectionConfig
+
+    conf = ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME=settings.mail_from_name,
+        MAIL_STARTTLS=True,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True
+    )
+    return FastMail(conf)
+
+OTP_TTL = 300  # seconds
+RESET_TOKEN_TTL = 3600
+
 
 def generate_otp() -> str:
     return ''.join(random.choices(string.digits, k=6))
 
-async def send_otp_email(email: str) -> bool:
+def issue_otp(email: str) -> str:
+    """Create an OTP for ``email`` and store it in Redis with a 5-minute expiration."""
+    otp = generate_otp()
+    get_redis().setex(f"otp:{email}", OTP_TTL, otp)
+    return otp
+
+
+def current_otp(email: str) -> Optional[str]:
+    otp = get_redis().get(f"otp:{email}")
+    return otp.decode() if otp else None
+
+
+def issue_password_reset_token(email: str) -> str:
+    """Create a reset token for ``email``, valid for an hour; the latest one is also kept by email."""
+    token = secrets.token_urlsafe(32)
+    pipe = get_redis().pipeline()
+    pipe.setex(f"password_reset:{token}", RESET_TOKEN_TTL, email)
+    pipe.setex(f"password_reset_email:{email}", RESET_TOKEN_TTL, token)
+    pipe.execute()
+    return token
+
+
+def current_password_reset_token(email: str) -> Optional[str]:
+    """The latest reset token issued for ``email``, if it has not expired or been used."""
+    redis_client = get_redis()
+    token = redis_client.get(f"password_reset_email:{email}")
+    if not token or not redis_client.exists(f"password_reset:{token.decode()}"):
+        return None
+    return token.decode()
+
+
+def password_reset_link(token: str) -> str:
+    return f"{settings.app_url}/reset-password?token={token}"
+
+
+# Jobs get only the email address: the worker reads the OTP or token back from
+# Redis, so secrets never sit in the broker, the dead-letter list or the logs
+
+def request_otp_email(email: str) -> bool:
+    """Issue an OTP now and queue the email that delivers it (see app/jobs/tasks.py)."""
+    from app.jobs.tasks import deliver_otp_email
+
     try:
-        otp = generate_otp()
-        
-        # Store OTP in Redis with 5-minute expiration
-        redis_client.setex(f"otp:{email}", 300, otp)
-        
-        html_content = f"""
-        <html>
-            <body>
-                <h2>Your OTP Code</h2>
-                <p>Your one-time password is: <strong>{otp}</strong></p>
-                <p>This code will expire in 5 minutes.</p>
-                <p>If you didn't request this code, please ignore this email.</p>
-            </body>
-        </html>
-        """
-        
-        message = MessageSchema(
-            subject="Your OTP Code - Todo Habit Tracker",
-            recipients=[email],
-            body=html_content,
-            subtype="html"
-        )
-        
-        await fastmail.send_message(message)
+        issue_otp(email)
+        deliver_otp_email.delay(email)
         return True
     except Exception as e:
         print(f"Error sending OTP email: {e}")
         return False
 
-async def send_password_reset_email(email: str, reset_link: str) -> bool:
+
+def request_password_reset_email(email: str) -> bool:
+    """Issue a reset token now and queue the email with its link."""
+    from app.jobs.tasks import deliver_password_reset_email
+
     try:
-        html_content = f"""
-        <html>
-            <body>
-                <h2>Password Reset Request</h2>
-                <p>You have requested to reset your password. Click the link below to reset your password:</p>
-                <p><a href="{reset_link}">Reset Password</a></p>
-                <p>This link will expire in 1 hour.</p>
-                <p>If you didn't request this, please ignore this email.</p>
-            </body>
-        </html>
-        """
-        
-        message = MessageSchema(
-            subject="Password Reset - Todo Habit Tracker",
-            recipients=[email],
-            body=html_content,
-            subtype="html"
-        )
-        
-        await fastmail.send_message(message)
+        issue_password_reset_token(email)
+        deliver_password_reset_email.delay(email)
         return True
     except Exception as e:
         print(f"Error sending password reset email: {e}")
         return False
 
+
+# The senders below run in the job worker and raise on failure so the job is retried
+
+async def send_otp_email(email: str, otp: str):
+    html_content = f"""
+    <html>
+        <body>
+            <h2>Your OTP Code</h2>
+            <p>Your one-time password is: <strong>{otp}</strong></p>
+            <p>This code will expire in 5 minutes.</p>
+            <p>If you didn't request this code, please ignore this email.</p>
+        </body>
+    </html>
+    """
+    
+    from fastapi_mail import MessageSchema
+
+    message = MessageSchema(
+        subject="Your OTP Code - Todo Habit Tracker",
+        recipients=[email],
+        body=html_content,
+        subtype="html"
+    )
+    
+    await get_fastmail().send_message(message)
+
+async def send_password_reset_email(email: str, reset_link: str):
+    html_content = f"""
+    <html>
+        <body>
+            <h2>Password Reset Request</h2>
+            <p>You have requested to reset your password. Click the link below to reset your password:</p>
+            <p><a href="{reset_link}">Reset Password</a></p>
+            <p>This link will expire in 1 hour.</p>
+            <p>If you didn't request this, please ignore this email.</p>
+        </body>
+    </html>
+    """
+    
+    from fastapi_mail import MessageSchema
+
+    message = MessageSchema(
+        subject="Password Reset - Todo Habit Tracker",
+        recipients=[email],
+        body=html_content,
+        subtype="html"
+    )
+    
+    await get_fastmail().send_message(message)
+
 def verify_otp(email: str, otp_code: str) -> bool:
+    redis_client = get_redis()
     stored_otp = redis_client.get(f"otp:{email}")
     if stored_otp and stored_otp.decode() == otp_code:
         redis_client.delete(f"otp:{email}")  # Delete OTP after verification
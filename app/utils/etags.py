@@ -0,0 +1,34 @@
+"""Conditional GETs with ``ETag`` and ``If-None-Match``.
+
+The ETag is a hash of the JSON body, so it only changes when the body does;
+a client that sends it back gets an empty ``304 Not Modified`` instead. Tags
+are weak (``W/"..."``) because the gzip middleware may re-encode the bytes.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def conditional_json(request: Request, content: Any) -> Response:
+    """``content`` as JSON with an ETag, or a 304 if the client already has it."""
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    headers = {"ETag": etag(body), "Cache-Control": "private, no-cache"}
+    if matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
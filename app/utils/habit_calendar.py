@@ -0,0 +1,224 @@
+"""Per-habit, per-year completion bitmaps.
+
+``habit_year_calendars`` keeps one row per habit and year whose ``days`` hold
+366 bits, one per day of the year, set when the habit had an entry with a
+``completed_count`` above zero that day (its ``local_date``, in the owner's
+timezone). Yearly heatmaps, completion counts
+and the longest run of completed days in a year are answered from these rows
+with integer bit operations, without reading ``habit_entries``; archiving a
+month leaves its bits alone. Streaks are not: they count any entry and go by
+the habit's periods (see app/utils/streaks.py), which days of completed
+entries cannot tell.
+
+The bits are kept current by an ``after_flush`` hook, like the todo counts: a
+new completed entry sets its day's bit (``set_bit`` in an upsert on Postgres,
+a read-modify-write elsewhere), and an entry that is changed or deleted has
+its old and new days recomputed from the entries left. Bulk Core statements
+bypass the hook; the calendars are rebuilt from raw entries with::
+
+    python -m app.utils.habit_calendar rebuild [--habit-id 42] [--database-url ...]
+"""
+import argparse
+import calendar
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, delete, event, exists, func, insert, or_, select, union, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, attributes
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive, HabitYearCalendar
+from app.utils.habit_entries import as_date
+from app.utils.local_dates import day_where, stored_day
+
+YEAR_BITS = 366
+YEAR_BYTES = 46
+CHUNK_SIZE = 1000
+
+calendars = HabitYearCalendar.__table__
+
+
+def day_bit(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def to_int(days: Optional[bytes]) -> int:
+    return int.from_bytes(days, "little") if days else 0
+
+
+def to_bytes(bits: int) -> bytes:
+    return bits.to_bytes(YEAR_BYTES, "little")
+
+
+def _set_bit(conn: Connection, habit_id: int, day: date, completed: bool):
+    bit = day_bit(day)
+    key = (calendars.c.habit_id == habit_id) & (calendars.c.year == day.year)
+    if conn.dialect.name == "postgresql":
+        # Postgres numbers bytea bits the same way: bit n is bit n % 8 of byte n // 8
+        statement = postgresql.insert(calendars).values(
+            habit_id=habit_id, year=day.year, days=to_bytes(int(completed) << bit)
+        )
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=["habit_id", "year"],
+            set_={"days": func.set_bit(calendars.c.days, bit, int(completed))},
+        ))
+        return
+    current = conn.execute(select(calendars.c.days).where(key)).scalar()
+    if current is None:
+        if completed:
+            conn.execute(insert(calendars).values(habit_id=habit_id, year=day.year, days=to_bytes(1 << bit)))
+        return
+    bits = to_int(current) | (1 << bit) if completed else to_int(current) & ~(1 << bit)
+    conn.execute(update(calendars).where(key).values(days=to_bytes(bits)))
+
+
+def _completed_on(conn: Connection, habit_id: int, day: date) -> bool:
+    live = exists().where(
+        HabitEntry.habit_id == habit_id, HabitEntry.completed_count > 0,
+        day_where(HabitEntry.local_date, lambda entry_day: entry_day == day),
+    )
+    archived = exists().where(
+        HabitEntryArchive.habit_id == habit_id, HabitEntryArchive.day == day,
+        HabitEntryArchive.completed_entries > 0,
+    )
+    return conn.execute(select(or_(live, archived))).scalar()
+
+
+def flush_days(session: Session) -> Tuple[Set[Tuple[int, date]], Set[Tuple[int, date]]]:
+    """``(days to set, days to recompute)`` as ``(habit_id, day)`` for the entries being flushed."""
+    completed, recheck = set(), set()
+    for entry in session.new:
+        if isinstance(entry, HabitEntry) and (entry.completed_count or 0) > 0 and entry.local_date is not None:
+            completed.add((entry.habit_id, entry.local_date))
+    for entry in session.deleted:
+        if isinstance(entry, HabitEntry):
+            history = attributes.get_history(entry, "local_date")
+            for value in history.unchanged or history.deleted:
+                recheck.add((entry.habit_id, value))
+    for entry in session.dirty:
+        if not isinstance(entry, HabitEntry):
+            continue
+        changes = [attributes.get_history(entry, name) for name in ("local_date", "completed_count", "habit_id")]
+        if any(history.added or history.deleted for history in changes):
+            date_history, _, habit_history = changes
+            for habit_id in habit_history.sum():
+                for value in date_history.sum():
+                    recheck.add((habit_id, value))
+    return completed, {(habit_id, day) for habit_id, day in recheck - completed if day is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _update_calendars(session: Session, flush_context):
+    completed, recheck = flush_days(session)
+    if not completed and not recheck:
+        return
+    # The calendars live next to the entries, on the habit owner's shard when sharded
+    conn = session.connection(bind_arguments={"mapper": HabitEntry})
+    # Sorted so concurrent transactions lock calendar rows in the same order
+    for habit_id, day in sorted(completed | recheck):
+        _set_bit(conn, habit_id, day, (habit_id, day) in completed or _completed_on(conn, habit_id, day))
+
+
+def completed_days_query(first_habit_id: int, last_habit_id: int):
+    return union(
+        select(HabitEntry.habit_id, stored_day(HabitEntry.local_date).label("day"))
+        .where(HabitEntry.habit_id.between(first_habit_id, last_habit_id), HabitEntry.completed_count > 0),
+        select(HabitEntryArchive.habit_id, HabitEntryArchive.day)
+        .where(HabitEntryArchive.habit_id.between(first_habit_id, last_habit_id),
+               HabitEntryArchive.completed_entries > 0),
+    )
+
+
+def rebuild_calendars(conn: Connection, habit_id: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """Recompute the calendars from raw and archived entries, ``chunk_size`` habits at a time.
+
+    Entries still without a ``local_date`` count on their stored date's day;
+    backfill them first to place them in their owners' timezones.
+
+    Returns the number of calendar rows written.
+    """
+    written = 0
+    after = 0
+    while True:
+        ids = select(Habit.id).where(Habit.id > after).order_by(Habit.id).limit(chunk_size)
+        if habit_id is not None:
+            ids = ids.where(Habit.id == habit_id)
+        ids = conn.execute(ids).scalars().all()
+        if not ids:
+            return written
+        years: Dict[Tuple[int, int], int] = defaultdict(int)
+        for row_habit_id, day in conn.execute(completed_days_query(ids[0], ids[-1])):
+            day = as_date(day)
+            years[(row_habit_id, day.year)] |= 1 << day_bit(day)
+        conn.execute(delete(calendars).where(calendars.c.habit_id.between(ids[0], ids[-1])))
+        if years:
+            conn.execute(insert(calendars), [
+                {"habit_id": key[0], "year": key[1], "days": to_bytes(bits)} for key, bits in years.items()
+            ])
+        written += len(years)
+        after = ids[-1]
+
+
+def load_calendars(db: Session, habit_id: int) -> Dict[int, int]:
+    """``{year: bits}`` for one habit."""
+    rows = db.execute(select(calendars.c.year, calendars.c.days).where(calendars.c.habit_id == habit_id))
+    return {year: to_int(days) for year, days in rows}
+
+
+def year_length(year: int) -> int:
+    return 366 if calendar.isleap(year) else 365
+
+
+def longest_run(bits: int) -> int:
+    """Length of the longest run of set bits: each ``x & (x >> 1)`` shortens every run by one."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def month_masks(year: int) -> List[Tuple[int, int]]:
+    """``(first bit, day count)`` of each month of ``year``."""
+    masks, first = [], 0
+    for month in range(1, 13):
+        days = calendar.monthrange(year, month)[1]
+        masks.append((first, days))
+        first += days
+    return masks
+
+
+def year_summary(years: Dict[int, int], year: int) -> Dict:
+    bits = years.get(year, 0) & ((1 << year_length(year)) - 1)
+    return {
+        "year": year,
+        "days": year_length(year),
+        "completed_days": bits.bit_count(),
+        "monthly_completed_days": [((bits >> first) & ((1 << count) - 1)).bit_count()
+                                   for first, count in month_masks(year)],
+        "longest_streak": longest_run(bits),
+        "completed": [(bits >> n) & 1 for n in range(year_length(year))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-habit yearly completion calendars")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Recompute the calendars from habit entries")
+    rebuild.add_argument("--habit-id", type=int)
+    rebuild.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    rebuild.add_argument("--database-url", help="Defaults to DATABASE_URL; run once per shard")
+    args = parser.parse_args()
+
+    from app.config import get_settings
+
+    engine = create_engine(args.database_url or get_settings().database_url)
+    with engine.begin() as conn:
+        written = rebuild_calendars(conn, args.habit_id, args.chunk_size)
+    print(f"wrote {written} calendar rows")
+
+
+if __name__ == "__main__":
+    main()
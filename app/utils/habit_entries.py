@@ -0,0 +1,134 @@
+"""Per-day habit entry totals across live and archived entries.
+
+Old months of ``habit_entries`` are moved to compressed files by
+``app/partitions.py`` and only their per-day totals stay in
+``habit_entry_archive``. Analytics read both through ``daily_entry_totals`` so
+their numbers do not change when a month is archived. Days are the entries'
+``local_date``, the day in the owner's timezone, read through
+``local_dates.stored_day`` (see app/utils/local_dates.py).
+
+``period_progress_query`` sums the entries of each active habit's current
+period (today, this ISO week or this month, by frequency) for ``GET
+/habits/today``. Current periods are never archived, so it only reads live
+entries.
+"""
+from datetime import date, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive
+from app.utils.local_dates import day_where, stored_day
+
+
+class DayTotals(NamedTuple):
+    entry_count: int = 0
+    completed_entries: int = 0  # entries with completed_count > 0
+    completed_total: int = 0  # sum of completed_count
+
+    def __add__(self, other: "DayTotals") -> "DayTotals":
+        return DayTotals(*(a + b for a, b in zip(self, other)))
+
+
+def as_date(value) -> date:
+    # func.date() comes back as a string on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def live_day_totals_query(start: Optional[date] = None, end: Optional[date] = None,
+                          owner_id: Optional[int] = None, habit_id: Optional[int] = None):
+    day = stored_day(HabitEntry.local_date)
+    query = select(
+        day.label("day"),
+        func.count(HabitEntry.id),
+        func.coalesce(func.sum(case((HabitEntry.completed_count > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(HabitEntry.completed_count), 0),
+    ).group_by(day)
+    if owner_id is not None:
+        query = query.join(Habit, Habit.id == HabitEntry.habit_id).where(Habit.owner_id == owner_id)
+    if habit_id is not None:
+        query = query.where(HabitEntry.habit_id == habit_id)
+    if start is not None:
+        query = query.where(day_where(HabitEntry.local_date, lambda day: day >= start))
+    if end is not None:
+        query = query.where(day_where(HabitEntry.local_date, lambda day: day <= end))
+    return query
+
+
+def daily_entry_totals(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                       owner_id: Optional[int] = None, habit_id: Optional[int] = None) -> Dict[date, DayTotals]:
+    """Totals per day in ``[start, end]`` for one owner or one habit."""
+    totals: Dict[date, DayTotals] = {}
+    for day, *values in db.execute(live_day_totals_query(start, end, owner_id, habit_id)):
+        totals[as_date(day)] = DayTotals(*values)
+
+    archived = select(
+        HabitEntryArchive.day,
+        HabitEntryArchive.entry_count,
+        HabitEntryArchive.completed_entries,
+        HabitEntryArchive.completed_total,
+    )
+    if owner_id is not None:
+        archived = archived.join(Habit, Habit.id == HabitEntryArchive.habit_id).where(Habit.owner_id == owner_id)
+    if habit_id is not None:
+        archived = archived.where(HabitEntryArchive.habit_id == habit_id)
+    if start is not None:
+        archived = archived.where(HabitEntryArchive.day >= start)
+    if end is not None:
+        archived = archived.where(HabitEntryArchive.day <= end)
+    for day, *values in db.execute(archived):
+        day = as_date(day)
+        totals[day] = totals.get(day, DayTotals()) + DayTotals(*values)
+    return totals
+
+
+def sum_totals(totals: Dict[date, DayTotals]) -> DayTotals:
+    return sum(totals.values(), DayTotals())
+
+
+PERIODS = {"daily": "day", "weekly": "week", "monthly": "month"}
+
+
+def period_bounds(frequency: Optional[str], day: date) -> Tuple[date, date]:
+    """``[start, end)`` of the period of a habit with ``frequency`` that contains ``day``."""
+    period = PERIODS.get(frequency, "day")
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == "month":
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    return day, day + timedelta(days=1)
+
+
+def period_progress_query(owner_id: int, today: date):
+    """Per active habit and day of its current period: summed ``completed_count`` and entry count.
+
+    ``today`` is the owner's. Habits with nothing logged in the period get one
+    row with a ``NULL`` day.
+    """
+    def bound(index: int):
+        return case(
+            *((Habit.frequency == frequency, period_bounds(frequency, today)[index])
+              for frequency in ("weekly", "monthly")),
+            else_=period_bounds("daily", today)[index],
+        )
+
+    day = stored_day(HabitEntry.local_date)
+    return (
+        select(
+            Habit.id, Habit.name, Habit.frequency, Habit.target_count,
+            day.label("day"),
+            func.coalesce(func.sum(HabitEntry.completed_count), 0),
+            func.count(HabitEntry.id),
+        )
+        .select_from(Habit)
+        .outerjoin(HabitEntry, and_(
+            HabitEntry.habit_id == Habit.id,
+            day_where(HabitEntry.local_date, lambda entry_day: and_(entry_day >= bound(0), entry_day < bound(1))),
+        ))
+        .where(Habit.owner_id == owner_id, Habit.is_active.is_(True))
+        .group_by(Habit.id, Habit.name, Habit.frequency, Habit.target_count, Habit.created_at, day)
+        .order_by(Habit.created_at, Habit.id, day)
+    )
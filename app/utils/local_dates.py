@@ -0,0 +1,299 @@
+"""Calendar days in each user's timezone.
+
+``users.timezone`` holds an IANA name (``Europe/Berlin``), UTC by default, set
+with ``PUT /auth/me``. Every row the analytics count by day carries the day it
+fell on for its owner, in an indexed column filled in when the row is written:
+
+- ``habit_entries.local_date``, from ``date``
+- ``todos.created_local_date`` and ``completed_local_date``
+- ``todo_occurrences.completed_local_date``
+- ``pomodoro_sessions.created_local_date``
+
+Analytics filter and group on these columns instead of ``date(created_at)``,
+which counted days in the database server's timezone and could not use an
+index, and take "today" in the user's timezone. A stored day is the one the
+user saw when the row was written: changing the timezone later does not move
+past rows.
+
+Timestamps the server records are UTC, and naive ones are read as UTC. An
+entry's ``date`` comes from the client: a naive one is the user's own clock
+time and keeps its calendar day, an aware one is converted.
+
+The columns are set by a ``before_flush`` hook, in the timezone put on the
+session with ``use_timezone`` (``get_current_user`` does this for the
+request's user) or else the owners' ``users.timezone``. Core inserts bypass
+it. Rows without a local date, such as those written before the columns
+existed, still count: queries read days through ``stored_day`` and
+``day_where``, which fall back to the database's day of the source column
+(the day analytics used before) while the local date is NULL. The fallback
+costs an extra index probe for the NULLs and ignores the user's timezone, so
+the missing dates are filled in by an online backfill that commits every
+chunk::
+
+    python -m app.utils.local_dates backfill [--chunk-size 5000] [--pause 0.1] [--database-url ...]
+
+With sharding, run it once per shard; timezones are read from the directory
+(``DATABASE_URL``), since shards only hold bare copies of the users.
+"""
+import argparse
+import time as clock
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Column, Date, and_, bindparam, create_engine, event, func, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, attributes
+
+from app.models.habit import Habit, HabitEntry
+from app.models.pomodoro import PomodoroSession
+from app.models.todo import Todo, TodoOccurrence
+from app.models.user import User
+from app.utils.sorting import Filter
+
+DEFAULT_TIMEZONE = "UTC"
+SESSION_KEY = "timezone"
+CHUNK_SIZE = 5000
+
+
+def is_valid(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def zone(name: Optional[str]) -> ZoneInfo:
+    """The timezone called ``name``; UTC if it is unset or unknown."""
+    return ZoneInfo(name) if name and is_valid(name) else ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def today(name: Optional[str]) -> date:
+    """Today in the timezone called ``name``."""
+    return datetime.now(zone(name)).date()
+
+
+def moment_day(value: Optional[datetime], name: Optional[str]) -> Optional[date]:
+    """The day of a server timestamp in timezone ``name``; naive timestamps are UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(zone(name)).date()
+
+
+def entry_day(value, name: Optional[str]) -> Optional[date]:
+    """The day of a habit entry's ``date``; naive values keep their calendar day."""
+    if value is None or not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        return value.date()
+    return value.astimezone(zone(name)).date()
+
+
+# Model -> {local date attribute: (the attribute it is the day of, how)}
+LOCAL_DATES: Dict[type, Dict[str, Tuple[str, Callable]]] = {
+    HabitEntry: {"local_date": ("date", entry_day)},
+    Todo: {"created_local_date": ("created_at", moment_day), "completed_local_date": ("completed_at", moment_day)},
+    TodoOccurrence: {"completed_local_date": ("completed_at", moment_day)},
+    PomodoroSession: {"created_local_date": ("created_at", moment_day)},
+}
+
+_MODELS = {model.__tablename__: model for model in LOCAL_DATES}
+
+
+def _source(local):
+    """The column ``local`` is the day of, for an ORM attribute or a table column."""
+    if isinstance(local, Column):
+        return local.table.c[LOCAL_DATES[_MODELS[local.table.name]][local.name][0]]
+    return getattr(local.class_, LOCAL_DATES[local.class_][local.key][0])
+
+
+def stored_day(local):
+    """SQL for the day of ``local``'s row: ``local``, or while it is NULL the database's day of its source."""
+    return func.coalesce(local, func.date(_source(local)), type_=Date)
+
+
+def day_where(local, condition: Callable):
+    """``condition(day)`` on the rows' days, as ``stored_day`` reads them.
+
+    Unlike ``condition(stored_day(local))``, this can use an index on ``local``:
+    the rows with a local date are found by it, and the NULLs by ``IS NULL``.
+    """
+    return or_(condition(local), and_(local.is_(None), condition(func.date(_source(local)))))
+
+
+def on_or_after(local) -> Filter:
+    return Filter(lambda value: day_where(local, lambda day: day >= value), type_=Date())
+
+
+def on_or_before(local) -> Filter:
+    return Filter(lambda value: day_where(local, lambda day: day <= value), type_=Date())
+
+
+# Models owned through another row: model -> (its key to that row, the row's model)
+PARENTS = {HabitEntry: ("habit_id", Habit), TodoOccurrence: ("todo_id", Todo)}
+
+
+def use_timezone(session: Session, name: Optional[str]):
+    """Count the days of rows written through ``session`` in the timezone called ``name``."""
+    session.info[SESSION_KEY] = name or DEFAULT_TIMEZONE
+
+
+def owner_timezones(db, owner_ids: Iterable[int]) -> Dict[int, str]:
+    """``{user id: timezone}``; ``db`` is a session or connection on the directory."""
+    owner_ids = set(owner_ids) - {None}
+    if not owner_ids:
+        return {}
+    return dict(db.execute(select(User.id, User.timezone).where(User.id.in_(owner_ids))).all())
+
+
+def _flush_timezones(session: Session, objects: List[object]) -> Dict[int, str]:
+    """``{id(obj): timezone}`` for the objects whose local dates are being set."""
+    if session.info.get(SESSION_KEY):
+        return {id(obj): session.info[SESSION_KEY] for obj in objects}
+    wanted = defaultdict(set)
+    for obj in objects:
+        if type(obj) in PARENTS:
+            key, parent = PARENTS[type(obj)]
+            wanted[parent].add(getattr(obj, key))
+    parent_owners = {
+        parent: dict(session.execute(select(parent.id, parent.owner_id).where(parent.id.in_(ids))).all())
+        for parent, ids in wanted.items()
+    }
+    owners = {}
+    for obj in objects:
+        if type(obj) in PARENTS:
+            key, parent = PARENTS[type(obj)]
+            owners[id(obj)] = parent_owners[parent].get(getattr(obj, key))
+        else:
+            owners[id(obj)] = obj.owner_id
+    names = owner_timezones(session, owners.values())
+    return {key: names.get(owner, DEFAULT_TIMEZONE) for key, owner in owners.items()}
+
+
+def _changed(obj, name: str) -> bool:
+    history = attributes.get_history(obj, name)
+    return bool(history.added or history.deleted)
+
+
+@event.listens_for(Session, "before_flush")
+def _set_local_dates(session: Session, flush_context, instances):
+    pending = [obj for obj in session.new if type(obj) in LOCAL_DATES]
+    # Changed rows, and rows still without their days (which get them on any change)
+    pending += [
+        obj for obj in session.dirty
+        if type(obj) in LOCAL_DATES and any(
+            _changed(obj, source) or (getattr(obj, local) is None and getattr(obj, source) is not None)
+            for local, (source, _) in LOCAL_DATES[type(obj)].items()
+        )
+    ]
+    if not pending:
+        return
+    names = _flush_timezones(session, pending)
+    for obj in pending:
+        name = names[id(obj)]
+        # Fill the server defaults here, so the day is that of the stored value
+        if isinstance(obj, (Todo, PomodoroSession)) and obj.created_at is None:
+            obj.created_at = datetime.now(timezone.utc)
+        if isinstance(obj, HabitEntry) and obj.date is None:
+            obj.date = datetime.combine(today(name), time())
+        new = obj in session.new
+        for local, (source, day) in LOCAL_DATES[type(obj)].items():
+            if new or _changed(obj, source) or getattr(obj, local) is None:
+                setattr(obj, local, day(getattr(obj, source), name))
+
+
+def _backfill_chunk(conn: Connection, model, local: str, source: str, day: Callable, after, chunk_size: int,
+                    directory: Optional[Engine]) -> Tuple[Optional[object], int]:
+    """Fill ``local`` where missing for the next ``chunk_size`` keys after ``after``.
+
+    Returns the last key walked (``None`` past the end) and the rows filled.
+    """
+    table = model.__table__
+    primary_key = list(table.primary_key.columns)
+    walked = primary_key[0]
+    keys = conn.execute(
+        select(walked).where(walked > after).group_by(walked).order_by(walked).limit(chunk_size)
+    ).scalars().all()
+    if not keys:
+        return None, 0
+    if model in PARENTS:
+        key, parent = PARENTS[model]
+        rows = select(*primary_key, table.c[source], parent.__table__.c.owner_id).join(
+            parent.__table__, parent.__table__.c.id == table.c[key]
+        )
+    else:
+        rows = select(*primary_key, table.c[source], table.c.owner_id)
+    rows = conn.execute(rows.where(
+        walked.between(keys[0], keys[-1]), table.c[local].is_(None), table.c[source].isnot(None),
+    )).all()
+    if not rows:
+        return keys[-1], 0
+    owners = {row[-1] for row in rows}
+    if directory is None:
+        names = owner_timezones(conn, owners)
+    else:
+        with directory.connect() as directory_conn:
+            names = owner_timezones(directory_conn, owners)
+    conn.execute(
+        update(table)
+        .where(and_(*(column == bindparam(f"key_{column.name}") for column in primary_key)))
+        .values({local: bindparam("day")}),
+        [
+            {**{f"key_{column.name}": value for column, value in zip(primary_key, row)},
+             "day": day(row[-2], names.get(row[-1], DEFAULT_TIMEZONE))}
+            for row in rows
+        ],
+    )
+    return keys[-1], len(rows)
+
+
+def backfill_local_dates(engine: Engine, chunk_size: int = CHUNK_SIZE, pause: float = 0,
+                         directory: Optional[Engine] = None) -> Dict[str, int]:
+    """Set every missing local date, one committed transaction per ``chunk_size`` keys.
+
+    Safe to run while the app writes, and to stop and rerun: rows written since
+    the columns exist already have their days and filled rows are skipped.
+    Waiting ``pause`` seconds between chunks leaves room for other writers.
+    Timezones come from ``directory`` (defaults to ``engine``). Returns the
+    rows filled per ``table.column``.
+    """
+    filled = {}
+    for model, columns in LOCAL_DATES.items():
+        for local, (source, day) in columns.items():
+            # Keys (ids, or todo_id for occurrences) are positive
+            count, after = 0, 0
+            while after is not None:
+                with engine.begin() as conn:
+                    after, rows = _backfill_chunk(conn, model, local, source, day, after, chunk_size, directory)
+                count += rows
+                if after is not None and pause:
+                    clock.sleep(pause)
+            filled[f"{model.__tablename__}.{local}"] = count
+    return filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-user local date columns")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="Fill in missing local dates, chunk by chunk")
+    backfill.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    backfill.add_argument("--pause", type=float, default=0, help="Seconds to wait between chunks")
+    backfill.add_argument("--database-url", help="Defaults to DATABASE_URL; run once per shard")
+    args = parser.parse_args()
+
+    from app.config import get_settings
+
+    directory = create_engine(get_settings().database_url)
+    engine = create_engine(args.database_url) if args.database_url else directory
+    for column, count in backfill_local_dates(engine, args.chunk_size, args.pause, directory).items():
+        print(f"{column}: filled {count} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""MessagePack responses for clients that ask for them.
+
+Endpoints with large payloads (todo and habit entry lists, dashboard stats)
+also answer in MessagePack when the request's ``Accept`` header prefers
+``application/msgpack`` (or ``application/x-msgpack``) over JSON; otherwise
+they keep returning JSON. Both carry ``Vary: Accept``.
+
+The MessagePack body holds the same JSON-compatible values as the JSON one
+(datetimes stay ISO 8601 strings) with one change of layout: a list of two or
+more objects sharing the same keys, like a page of todos, is sent column by
+column instead of repeating every key in every row. Such a list is an ext value
+of type ``COLUMNAR_EXT`` whose payload is the MessagePack array
+``[keys, column_1, ..., column_n]``. ``unpackb`` shows how a client turns it
+back into rows.
+
+Compression of large responses, in either format, is left to the gzip
+middleware in ``app.main``.
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import msgpack
+from fastapi import Request, Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+COLUMNAR_EXT = 1
+MIN_COLUMNAR_ROWS = 2
+
+
+def accepted(header: Optional[str]) -> Dict[str, float]:
+    """``{media type: q}`` from an ``Accept`` header."""
+    types = {}
+    for part in (header or "").split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        types[media_type.lower()] = q
+    return types
+
+
+def response_format(request: Request) -> str:
+    """Dependency: ``MSGPACK`` when the client prefers it to JSON, else ``JSON``."""
+    types = accepted(request.headers.get("accept"))
+    msgpack_q = max((types.get(media_type, 0.0) for media_type in MSGPACK_TYPES), default=0.0)
+    json_q = max(types.get(JSON, 0.0), types.get("application/*", 0.0), types.get("*/*", 0.0))
+    return MSGPACK if msgpack_q > 0 and msgpack_q >= json_q else JSON
+
+
+def columnar(keys: Sequence[str], columns: Sequence[list]) -> msgpack.ExtType:
+    """Rows given as one list of values per key."""
+    return msgpack.ExtType(COLUMNAR_EXT, msgpack.packb([list(keys), *columns]))
+
+
+def _nested(values: list) -> bool:
+    return any(isinstance(value, (list, dict)) for value in values)
+
+
+def _layout(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _layout(item) for key, item in value.items()} if _nested(value.values()) else value
+    if not isinstance(value, list):
+        return value
+    if len(value) >= MIN_COLUMNAR_ROWS and all(type(item) is dict for item in value):
+        keys = value[0].keys()
+        if all(item.keys() == keys for item in value):
+            columns = [[item[key] for item in value] for key in keys]
+            return columnar(keys, [[_layout(v) for v in column] if _nested(column) else column
+                                   for column in columns])
+    return [_layout(item) for item in value] if _nested(value) else value
+
+
+def packb(content: Any) -> bytes:
+    """Encode JSON-compatible ``content`` (e.g. ``dump_python(mode="json")``) as MessagePack."""
+    return msgpack.packb(_layout(content))
+
+
+def _ext_hook(code: int, data: bytes):
+    if code != COLUMNAR_EXT:
+        return msgpack.ExtType(code, data)
+    keys, *columns = msgpack.unpackb(data, ext_hook=_ext_hook)
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_ext_hook)
+
+
+def msgpack_response(body: bytes) -> Response:
+    return Response(content=body, media_type=MSGPACK, headers={"Vary": "Accept"})
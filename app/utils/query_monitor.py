@@ -0,0 +1,171 @@
+"""SQL diagnostics: slow-query logging and per-request N+1 detection.
+
+Every statement executed through any SQLAlchemy engine is timed. Statements
+slower than ``slow_query_ms`` are logged together with their bound parameters
+and the route that issued them. While a request is being served, statements are
+also counted by their normalized SQL text; when one shape runs more than
+``n_plus_one_threshold`` times in a single request it is reported as a likely
+N+1 query. In strict mode (used by the test suite) that report is raised as
+``NPlusOneDetected`` instead of only being logged.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.queries")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PLACEHOLDER = re.compile(r"%\([^)]+\)s|%s|:\w+|\$\d+|\?")
+_WHITESPACE = re.compile(r"\s+")
+
+_MAX_PARAMS_REPR = 500
+
+
+class NPlusOneDetected(RuntimeError):
+    """Raised in strict mode when a request repeats the same query too often."""
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape so repeated executions compare equal."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """Statements executed while a request (or a ``track_queries`` block) ran."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+    @property
+    def route(self) -> Optional[str]:
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path")
+        return f"{self.scope.get('method', '')} {path}".strip()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[normalize_sql(statement)] += 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        return {sql: n for sql, n in self.statements.items() if n > threshold}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class QueryMonitor:
+    def __init__(self, slow_query_ms: float, repeat_threshold: int, strict: bool = False, enabled: bool = True):
+        self.slow_query_ms = slow_query_ms
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+        self.enabled = enabled
+        self.listeners: List[Callable[[QueryStats], None]] = []
+
+    def on_statement(self, statement: str, parameters, elapsed_ms: float):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed_ms)
+
+        if elapsed_ms >= self.slow_query_ms:
+            params = repr(parameters)
+            if len(params) > _MAX_PARAMS_REPR:
+                params = params[:_MAX_PARAMS_REPR] + "..."
+            logger.warning(
+                "Slow query (%.1f ms) on %s: %s | params=%s",
+                elapsed_ms,
+                stats.route if stats is not None else "<no request>",
+                _WHITESPACE.sub(" ", statement).strip(),
+                params,
+            )
+
+    def check(self, stats: QueryStats):
+        """Report statements repeated beyond the threshold within one request."""
+        for listener in self.listeners:
+            listener(stats)
+
+        repeated = stats.repeated(self.repeat_threshold)
+        if not repeated:
+            return
+
+        details = "; ".join(f"{n}x {sql}" for sql, n in sorted(repeated.items(), key=lambda item: -item[1]))
+        message = f"Possible N+1 queries on {stats.route or '<no request>'}: {details}"
+        if self.strict:
+            raise NPlusOneDetected(message)
+        logger.warning(message)
+
+
+settings = get_settings()
+
+query_monitor = QueryMonitor(
+    slow_query_ms=settings.slow_query_ms,
+    repeat_threshold=settings.n_plus_one_threshold,
+    strict=settings.query_strict_mode,
+    enabled=settings.query_diagnostics_enabled,
+)
+
+
+@contextmanager
+def track_queries(scope: Optional[dict] = None):
+    """Count every statement executed inside the block into a ``QueryStats``."""
+    stats = QueryStats(scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    if query_monitor.enabled:
+        query_monitor.on_statement(statement, parameters, (time.perf_counter() - started) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+class QueryMonitorMiddleware:
+    """ASGI middleware that scopes query statistics to a single HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not query_monitor.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope) as stats:
+            await self.app(scope, receive, send)
+        query_monitor.check(stats)
@@ -0,0 +1,154 @@
+"""Fractional rank keys for manual ordering.
+
+A rank is a base-36 string compared lexicographically, read as a fraction
+(``"i"`` is 18/36). Between any two keys there is always another one, so
+moving an item only rewrites that item's key. Keys never end in ``"0"``, which
+keeps that property at the edges. Repeated moves into the same gap make keys
+longer by one digit every few moves; once a key passes ``MAX_KEY_LENGTH`` the
+owner's keys are respaced by ``evenly_spaced_keys`` in one pass, by the
+``rebalance_todo_ranks`` job rather than the request.
+
+Keys at the ends of the list step by one unit instead of halving the gap to
+the edge, at 1, 2, 4, 8... digits, the first length that still has room. New
+todos go to the top: a thousand of them in a row need 4-digit keys, not the
+hundreds of digits halving would reach.
+
+``Todo.rank`` uses these keys; the ``(owner_id, rank)`` index serves both
+``GET /todos?sort_by=rank`` and the neighbour lookups of a move.
+"""
+import logging
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Todo, User
+from app.sharding import shard_router
+
+logger = logging.getLogger("app.ranking")
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(ALPHABET)
+MAX_KEY_LENGTH = 16
+
+_DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """A key strictly between ``a`` and ``b`` (``""`` is 0, ``None`` is 1)."""
+    if b is not None:
+        # Keep the common prefix, treating missing digits of a as "0"
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = _DIGITS[a[0]] if a else 0
+    digit_b = _DIGITS[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return ALPHABET[(digit_a + digit_b) // 2]
+    # Adjacent first digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return ALPHABET[digit_a] + _midpoint(a[1:], None)
+
+
+def _encode(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        digits.append(ALPHABET[digit])
+    return "".join(reversed(digits)).rstrip("0")
+
+
+def _step(key: str, direction: int) -> str:
+    """A short key one unit before (``direction`` -1) or after (+1) ``key``.
+
+    The width doubles each time it runs out, so keys lengthen with the log of
+    the number of steps taken in one direction.
+    """
+    width = 1
+    while True:
+        value = int(key[:width].ljust(width, "0"), BASE)
+        # A longer key's prefix already sorts before it
+        if direction > 0 or len(key) <= width:
+            value += direction
+        if 0 < value < BASE ** width:
+            return _encode(value, width)
+        width *= 2
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """A key that sorts after ``before`` and before ``after`` (either may be None)."""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"{before!r} must sort before {after!r}")
+    for key in (before, after):
+        if key is not None and (not key or key.endswith("0") or any(c not in _DIGITS for c in key)):
+            raise ValueError(f"Invalid rank key {key!r}")
+    if before is None and after is not None:
+        return _step(after, -1)
+    if after is None and before is not None:
+        return _step(before, 1)
+    return _midpoint(before or "", after)
+
+
+def evenly_spaced_keys(count: int) -> List[str]:
+    """``count`` short, increasing keys spread over the whole key space."""
+    width = 1
+    while BASE ** width < 2 * (count + 1):
+        width += 1
+    step = BASE ** width // (count + 1)
+    return [_encode(n * step, width) for n in range(1, count + 1)]
+
+
+def first_rank(db: Session, owner_id: int) -> Optional[str]:
+    return db.execute(
+        select(Todo.rank).where(Todo.owner_id == owner_id, Todo.rank.is_not(None))
+        .order_by(Todo.rank.asc()).limit(1)
+    ).scalar()
+
+
+def rank_after(db: Session, owner_id: int, rank: str, exclude_id: int) -> Optional[str]:
+    """The next rank following ``rank`` in the owner's list, skipping ``exclude_id``."""
+    return db.execute(
+        select(Todo.rank).where(Todo.owner_id == owner_id, Todo.rank > rank, Todo.id != exclude_id)
+        .order_by(Todo.rank.asc()).limit(1)
+    ).scalar()
+
+
+def rank_before(db: Session, owner_id: int, rank: str, exclude_id: int) -> Optional[str]:
+    """The rank preceding ``rank`` in the owner's list, skipping ``exclude_id``."""
+    return db.execute(
+        select(Todo.rank).where(Todo.owner_id == owner_id, Todo.rank < rank, Todo.id != exclude_id)
+        .order_by(Todo.rank.desc()).limit(1)
+    ).scalar()
+
+
+def rebalance_todos(db: Session, owner_id: int) -> int:
+    """Respace all of the owner's ranks, keeping their order; unranked todos go last.
+
+    The caller commits.
+    """
+    ids = db.execute(
+        select(Todo.id).where(Todo.owner_id == owner_id)
+        .order_by(Todo.rank.asc().nulls_last(), Todo.id.asc())
+    ).scalars().all()
+    if ids:
+        db.execute(update(Todo), [{"id": todo_id, "rank": key} for todo_id, key in zip(ids, evenly_spaced_keys(len(ids)))])
+    return len(ids)
+
+
+def rebalance_user_todos(user_id: int) -> int:
+    """Rebalance ``user_id``'s todos on their shard; run by the ``rebalance_todo_ranks`` job."""
+    with SessionLocal() as directory:
+        user = directory.get(User, user_id)
+        if user is None:
+            return 0
+        shard_id = user.shard_id
+    with Session(bind=shard_router.engine_for(shard_id)) as db:
+        count = rebalance_todos(db, user_id)
+        db.commit()
+    logger.info("Rebalanced %s todo ranks for user %s", count, user_id)
+    return count
@@ -0,0 +1,35 @@
+"""Compact read-only rows for column-projected list queries.
+
+Selecting columns instead of entities keeps rows out of the session's identity
+map and skips loading columns nobody asked for (like the ``description`` Text
+columns). Each distinct field set gets a generated ``__slots__`` class, so a
+row is a single small object without a per-instance ``__dict__`` and the
+serializers can read it like an ORM instance.
+"""
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Type
+
+
+class ReadRow:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def _asdict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+@lru_cache(maxsize=None)
+def row_class(name: str, fields: Tuple[str, ...]) -> Type[ReadRow]:
+    return type(name, (ReadRow,), {"__slots__": fields})
+
+
+def fetch_rows(query, columns: Iterable, row_cls: Type[ReadRow]) -> List[ReadRow]:
+    """Run ``query`` narrowed to ``columns`` and wrap each result tuple."""
+    return [row_cls(*row) for row in query.with_entities(*columns)]
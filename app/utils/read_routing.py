@@ -0,0 +1,76 @@
+"""Read-your-writes pinning for replica reads.
+
+Replicas lag the primary, so a user who has just created a todo could list
+their todos from the replica and not see it. After a successful write request
+``ReadYourWritesMiddleware`` pins the caller (the subject of their bearer
+token) to the primary for ``read_your_writes_seconds``; ``get_read_db`` in
+``app.database`` checks the pin before handing out a replica session.
+
+Pins live in process memory. With several workers a pinned user's next read
+can land on a worker that has not seen the write, so keep the window at least
+as long as the replica's usual lag plus the time a client takes to re-read.
+"""
+import time
+from typing import Dict, Optional
+
+from app.config import get_settings
+from app.utils.security import verify_token
+
+settings = get_settings()
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class PrimaryPins:
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._until: Dict[str, float] = {}
+
+    def pin(self, subject: str):
+        now = time.monotonic()
+        self._until[subject] = now + self.window_seconds
+        if len(self._until) > 10000:
+            self._until = {key: until for key, until in self._until.items() if until > now}
+
+    def is_pinned(self, subject: Optional[str]) -> bool:
+        if subject is None:
+            return False
+        return self._until.get(subject, 0.0) > time.monotonic()
+
+    def clear(self):
+        self._until.clear()
+
+
+primary_pins = PrimaryPins(settings.read_your_writes_seconds)
+
+
+def request_subject(headers) -> Optional[str]:
+    """Return the token subject of a request's ``Authorization: Bearer`` header."""
+    authorization = headers.get("authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return verify_token(token)
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware that pins the caller to the primary after a successful write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            # Pin before the client can see the response and issue its next read
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+                subject = request_subject(headers)
+                if subject is not None:
+                    primary_pins.pin(subject)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,124 @@
+"""Lazy expansion of recurring todos.
+
+A recurring todo is one ``todos`` row describing the series: ``recurrence``
+(daily, weekly or monthly) every ``recurrence_interval`` periods, starting at
+its ``due_date`` (or ``created_at``) and optionally ending at
+``recurrence_until``. Occurrences are computed for the requested window only:
+the first one in the window is found arithmetically, so the cost depends on
+the window's length and not on how long the series has been running. Only
+occurrences that were completed or edited are stored, as ``todo_occurrences``
+rows keyed by the occurrence date, and they are laid over the computed ones.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.models.todo import Todo, TodoOccurrence
+
+PERIOD_DAYS = {"daily": 1, "weekly": 7}
+MAX_WINDOW_DAYS = 366
+OVERRIDE_FIELDS = ("title", "description", "priority")
+
+
+def validate_rule(recurrence: Optional[str], interval: Optional[int]):
+    if recurrence is not None and interval is not None and interval < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="recurrence_interval must be at least 1"
+        )
+
+
+def validate_window(start: date, end: date):
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Window ends before it starts")
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Recurring todos can be expanded for at most {MAX_WINDOW_DAYS} days at a time"
+        )
+
+
+def anchor(todo: Todo) -> datetime:
+    return todo.due_date or todo.created_at
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    # The 31st falls back to the last day of shorter months
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(recurrence: str, interval: int, first: date, until: Optional[date],
+                     start: date, end: date) -> Iterator[date]:
+    """Occurrences of the rule within ``[start, end]``, in order."""
+    if until is not None:
+        end = min(end, until)
+    start = max(start, first)
+    if start > end:
+        return
+    if recurrence in PERIOD_DAYS:
+        step = PERIOD_DAYS[recurrence] * interval
+        skipped = -(-(start - first).days // step)
+        day = first + timedelta(days=skipped * step)
+        while day <= end:
+            yield day
+            day += timedelta(days=step)
+        return
+    if recurrence != "monthly":
+        raise ValueError(f"Unknown recurrence {recurrence!r}")
+    months = (start.year - first.year) * 12 + start.month - first.month
+    n = months // interval
+    while True:
+        day = _add_months(first, n * interval)
+        if day > end:
+            return
+        if day >= start:
+            yield day
+        n += 1
+
+
+def is_occurrence(todo: Todo, day: date) -> bool:
+    return any(occurrence_dates(todo.recurrence, todo.recurrence_interval, anchor(todo).date(),
+                                todo.recurrence_until, day, day))
+
+
+def expand(db: Session, series: Sequence[Todo], start: date, end: date, fields: Sequence[str]) -> List[Dict]:
+    """Occurrences of ``series`` within ``[start, end]`` as dicts of ``fields`` and ``occurrence_date``."""
+    overrides: Dict[Tuple[int, date], TodoOccurrence] = {}
+    if series:
+        stored = db.query(TodoOccurrence).filter(
+            TodoOccurrence.todo_id.in_([todo.id for todo in series]),
+            TodoOccurrence.occurrence_date >= start,
+            TodoOccurrence.occurrence_date <= end,
+        )
+        overrides = {(row.todo_id, row.occurrence_date): row for row in stored}
+
+    items = []
+    for todo in series:
+        base = {name: getattr(todo, name) for name in fields}
+        starts_at = anchor(todo)
+        for day in occurrence_dates(todo.recurrence, todo.recurrence_interval, starts_at.date(),
+                                    todo.recurrence_until, start, end):
+            item = dict(base, occurrence_date=day, is_completed=False, completed_at=None,
+                        due_date=datetime.combine(day, starts_at.timetz()))
+            override = overrides.get((todo.id, day))
+            if override is not None:
+                item.update(is_completed=override.is_completed, completed_at=override.completed_at)
+                item.update({name: getattr(override, name) for name in OVERRIDE_FIELDS
+                             if getattr(override, name) is not None})
+            items.append(item)
+    return items
+
+
+def sort_key(sort_by: str, descending: bool = False):
+    """Key for sorting row dicts like ``ORDER BY <sort_by> NULLS LAST, id``."""
+    def key(item):
+        value = item.get(sort_by)
+        missing = value is None if not descending else value is not None
+        return (missing, value if value is not None else 0, item["id"])
+    return key
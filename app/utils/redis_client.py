@@ -0,0 +1,16 @@
+from functools import lru_cache
+from app.config import get_settings
+
+
+@lru_cache
+def get_redis():
+    """Shared Redis client, created on first use instead of at import time."""
+    import redis
+
+    return redis.from_url(get_settings().redis_url)
+
+
+def close_redis():
+    if get_redis.cache_info().currsize:
+        get_redis().close()
+        get_redis.cache_clear()
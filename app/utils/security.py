@@ -2,10 +2,6 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-import pyotp
-import qrcode
-from io import BytesIO
-import base64
 from app.config import get_settings
 
 settings = get_settings()
@@ -0,0 +1,230 @@
+"""Declared filters and index-backed sorting for list endpoints.
+
+List endpoints used to ``order_by(getattr(Model, sort_by))`` with whatever the
+client sent, so any column (or a relationship name, which failed with a 500)
+could be sorted on, usually without an index. A ``ListQuery`` instead declares
+for one model:
+
+* the filters an endpoint accepts, each building its clause around a named
+  bind parameter, and
+* the sort keys it allows.
+
+A sort is accepted only if one of the table's indexes supports it given the
+filters in play: the index's leading columns must all be pinned by equality
+filters (e.g. ``owner_id``) and the next column must be the sort key, as with
+``ix_todos_owner_id_created_at`` for a user's todos by ``created_at``. Other
+combinations get a 400 naming the filter that would make them indexed. Every
+sort is followed by ``id`` in the same direction so pages are stable.
+
+An index also fixes where NULLs go. A plain Postgres btree keeps them after
+every value, so scanned forwards it serves ``ASC NULLS LAST`` and backwards
+``DESC NULLS FIRST``; ``DESC NULLS LAST`` needs an index declared that way and
+otherwise sorts the whole table. Queries that spell out their null ordering
+(``explicit_nulls``, for merging shards) ask for the one their index gives.
+
+The clauses for each shape (model, set of filters present, sort key and
+direction) are built once and reused, with the request's values passed as
+bound parameters, so every request of a shape issues the same SQL and hits
+SQLAlchemy's compiled statement cache.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Column, Date, Table, UniqueConstraint, bindparam, func, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+PARAM_PREFIX = "filter_"
+
+
+@dataclass(frozen=True)
+class Filter:
+    clause: Callable[[Any], Any]  # bind parameter -> WHERE clause
+    column: Optional[str] = None  # equality filters name their column, usable as an index prefix
+    type_: Any = None  # for bind parameters not compared directly with a column
+    prepare: Callable[[Any], Any] = lambda value: value
+
+
+def equals(column) -> Filter:
+    return Filter(lambda value: column == value, column.key)
+
+
+def contains_any(*columns) -> Filter:
+    return Filter(lambda value: or_(*(column.contains(value) for column in columns)))
+
+
+def _day(column):
+    # Date columns (the local dates) are compared as they are, which can use an index
+    return column if isinstance(column.type, Date) else func.date(column)
+
+
+def on_or_after(column) -> Filter:
+    return Filter(lambda value: _day(column) >= value, type_=Date())
+
+
+def on_or_before(column) -> Filter:
+    return Filter(lambda value: _day(column) <= value, type_=Date())
+
+
+# An index column: (name, descending, nulls first)
+IndexKey = Tuple[str, bool, bool]
+
+
+def _index_key(expression) -> Optional[IndexKey]:
+    descending, nulls_first = False, None
+    while isinstance(expression, UnaryExpression):
+        if expression.modifier is operators.desc_op:
+            descending = True
+        elif expression.modifier in (operators.nulls_first_op, operators.nulls_last_op):
+            nulls_first = expression.modifier is operators.nulls_first_op
+        elif expression.modifier is not operators.asc_op:
+            return None
+        expression = expression.element
+    if not isinstance(expression, Column):
+        return None
+    # Postgres' default: NULLs sort as if larger than every value
+    return expression.name, descending, descending if nulls_first is None else nulls_first
+
+
+def index_keys(table: Table) -> List[Tuple[str, Tuple[IndexKey, ...]]]:
+    """``(name, keys)`` for the table's ordered indexes and keys on plain columns."""
+    plain = lambda columns: tuple((c.name, False, False) for c in columns)
+    indexes = [(table.primary_key.name or f"{table.name}_pkey", plain(table.primary_key.columns))]
+    for index in table.indexes:
+        # GIN/GiST indexes (the trigram ones) cannot return rows in order
+        if (index.kwargs.get("postgresql_using") or "btree") != "btree":
+            continue
+        keys = tuple(_index_key(expression) for expression in index.expressions)
+        if None not in keys:
+            indexes.append((index.name, keys))
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            indexes.append((constraint.name or f"{table.name}_key", plain(constraint.columns)))
+    return indexes
+
+
+def index_columns(table: Table) -> List[Tuple[str, Tuple[str, ...]]]:
+    """``(name, column names)`` for the table's ordered indexes and keys on plain columns."""
+    return [(name, tuple(key[0] for key in keys)) for name, keys in index_keys(table)]
+
+
+def _scans(keys: Sequence[IndexKey], descending: bool, nulls_first: Optional[bool]) -> bool:
+    """Whether a forward or backward scan returns ``keys`` in the requested order.
+
+    ``nulls_first`` None leaves the null ordering to the database default,
+    which a plain index matches either way.
+    """
+    if nulls_first is None:
+        nulls_first = descending
+    for backward in (False, True):
+        if all((key_descending != backward) == descending and (key_nulls_first != backward) == nulls_first
+               for _, key_descending, key_nulls_first in keys):
+            return True
+    return False
+
+
+def supporting_index(table: Table, sort_column: str, equal_columns: FrozenSet[str], descending: bool = False,
+                     nulls_first: Optional[bool] = None) -> Optional[str]:
+    """An index that can return rows in ``sort_column`` order once ``equal_columns`` are fixed.
+
+    The order is ``sort_column`` and then ``id`` (if the index has it next), both
+    ``descending`` or not, with NULLs first or last as ``nulls_first`` says.
+    Prefers the index whose leading columns use the most of the equality filters.
+    """
+    best, best_prefix = None, -1
+    for name, keys in index_keys(table):
+        for prefix, key in enumerate(keys):
+            if key[0] == sort_column:
+                ordered = [key] + [next_key for next_key in keys[prefix + 1:prefix + 2] if next_key[0] == "id"]
+                if prefix > best_prefix and _scans(ordered, descending, nulls_first):
+                    best, best_prefix = name, prefix
+                break
+            if key[0] not in equal_columns:
+                break
+    return best
+
+
+class ListQuery:
+    def __init__(self, model, filters: Mapping[str, Filter], sorts: Sequence[str]):
+        self.model = model
+        self.table = model.__table__
+        self.filters = dict(filters)
+        self.sorts = tuple(sorts)
+        every_equality = frozenset(f.column for f in self.filters.values() if f.column)
+        unusable = [key for key in self.sorts if supporting_index(self.table, key, every_equality) is None]
+        if unusable:
+            raise ValueError(f"No index supports sorting {self.table.name} by {', '.join(unusable)}")
+
+    def _present(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        present = {name: value for name, value in values.items() if value is not None}
+        unknown = set(present) - set(self.filters)
+        if unknown:
+            raise ValueError(f"Undeclared filters for {self.table.name}: {sorted(unknown)}")
+        return present
+
+    @lru_cache(maxsize=256)
+    def _where(self, names: FrozenSet[str]) -> Tuple:
+        return tuple(
+            self.filters[name].clause(bindparam(PARAM_PREFIX + name, type_=self.filters[name].type_))
+            for name in sorted(names)
+        )
+
+    def _required_filters(self, sort_by: str) -> List[str]:
+        """Filters whose columns lead an index on ``sort_by``, for the error message."""
+        names = []
+        for _, columns in index_columns(self.table):
+            if sort_by in columns:
+                prefix = columns[:columns.index(sort_by)]
+                names += [name for name, f in self.filters.items() if f.column in prefix]
+        return sorted(set(names))
+
+    @lru_cache(maxsize=256)
+    def _order(self, names: FrozenSet[str], sort_by: str, descending: bool, explicit_nulls: bool) -> Tuple:
+        if sort_by not in self.sorts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot sort by {sort_by}. Allowed: {', '.join(self.sorts)}"
+            )
+        equal_columns = frozenset(self.filters[name].column for name in names if self.filters[name].column)
+        # The null ordering a plain index gives: NULLs after every value
+        nulls_first = descending if explicit_nulls else None
+        if supporting_index(self.table, sort_by, equal_columns, descending, nulls_first) is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Sorting by {sort_by} needs the {' or '.join(self._required_filters(sort_by))} filter"
+            )
+        order = []
+        for column in (getattr(self.model, sort_by), self.model.id):
+            column = column.desc() if descending else column.asc()
+            if explicit_nulls:
+                column = column.nulls_first() if nulls_first else column.nulls_last()
+            order.append(column)
+        return tuple(order)
+
+    def index_for(self, values: Mapping[str, Any], sort_by: str, descending: bool = False,
+                  nulls_first: Optional[bool] = None) -> Optional[str]:
+        """The index that serves ``sort_by`` with these filters, if any."""
+        present = self._present(values)
+        equal_columns = frozenset(self.filters[name].column for name in present if self.filters[name].column)
+        return supporting_index(self.table, sort_by, equal_columns, descending, nulls_first)
+
+    def filter(self, query: Query, values: Mapping[str, Any]) -> Query:
+        """Filter ``query`` by the non-None ``values``."""
+        present = self._present(values)
+        params = {PARAM_PREFIX + name: self.filters[name].prepare(value) for name, value in present.items()}
+        return query.filter(*self._where(frozenset(present))).params(params)
+
+    def apply(self, query: Query, values: Mapping[str, Any], sort_by: str, sort_order: Optional[str] = "desc",
+              explicit_nulls: bool = False) -> Query:
+        """Filter ``query`` by the non-None ``values`` and order it by ``sort_by``, then ``id``.
+
+        With ``explicit_nulls`` the order spells out the null ordering the index
+        gives (``ASC NULLS LAST`` or ``DESC NULLS FIRST``), so every database
+        puts NULLs in the same place.
+        """
+        names = frozenset(self._present(values))
+        order = self._order(names, sort_by, sort_order == "desc", explicit_nulls)
+        return self.filter(query, values).order_by(*order)
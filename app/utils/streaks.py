@@ -0,0 +1,211 @@
+"""Habit streaks.
+
+Streaks are computed in SQL over a habit's full history. They are stored on
+the habit after an entry is logged, by the ``recompute_habit_streak`` job (see
+app/jobs/tasks.py), and computed on read by ``GET /habits/{id}/analytics``.
+The job only runs when something is logged, so a habit nobody logs any more
+would keep its last streak; ``reconcile_streaks`` recomputes every habit
+nightly as the ``reconcile_habit_streaks`` job.
+
+Streaks are counted in the habit's periods: days for daily habits, ISO weeks
+(Monday to Sunday) for weekly habits and calendar months for monthly habits.
+A period counts when the habit has a live or archived entry in it, however
+many entries it has and in whatever order they were logged. Periods are
+numbered in SQL so that consecutive periods differ by one, and a streak is a
+run of consecutive periods ("gaps and islands": a period's number minus its
+row number is the same for every period of a run). It is current if its last
+period is this one or the one before, since this one may simply not be logged
+yet. ``streaks_by_habit`` does this for any number of habits in one query.
+
+Days are the entries' ``local_date`` (read with ``local_dates.stored_day``)
+and "this period" is the owner's, in their timezone (see
+app/utils/local_dates.py). The nightly reconciliation
+covers owners in every timezone at once: local dates only ever span two or
+three days, so it compares each habit against its owner's day.
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from sqlalchemy import Integer, case, func, select, union, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive
+from app.utils import local_dates
+
+logger = logging.getLogger("app.streaks")
+
+CHUNK_SIZE = 1000
+EPOCH = date(1970, 1, 1)
+
+
+class day_number(FunctionElement):
+    """Days since 1970-01-01, so consecutive days differ by one."""
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number(element, compiler, **kw):
+    return f"({compiler.process(element.clauses, **kw)} - DATE '1970-01-01')"
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return f"CAST(julianday({compiler.process(element.clauses, **kw)}) - julianday('1970-01-01') AS INTEGER)"
+
+
+class month_number(FunctionElement):
+    """``year * 12 + month - 1``, so consecutive months differ by one."""
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(month_number)
+def _month_number(element, compiler, **kw):
+    day = compiler.process(element.clauses, **kw)
+    return f"CAST(EXTRACT(YEAR FROM {day}) * 12 + EXTRACT(MONTH FROM {day}) - 1 AS INTEGER)"
+
+
+@compiles(month_number, "sqlite")
+def _month_number_sqlite(element, compiler, **kw):
+    day = compiler.process(element.clauses, **kw)
+    return f"(CAST(strftime('%Y', {day}) AS INTEGER) * 12 + CAST(strftime('%m', {day}) AS INTEGER) - 1)"
+
+
+def period_index(frequency: Optional[str], day: date) -> int:
+    """The number ``period_number`` gives ``day`` in SQL."""
+    if frequency == "weekly":
+        # 1970-01-01 was a Thursday; weeks start on Mondays
+        return ((day - EPOCH).days + 3) // 7
+    if frequency == "monthly":
+        return day.year * 12 + day.month - 1
+    return (day - EPOCH).days
+
+
+def period_number(day, frequency):
+    return case(
+        (frequency == "weekly", (day_number(day) + 3) // 7),
+        (frequency == "monthly", month_number(day)),
+        else_=day_number(day),
+    )
+
+
+def _previous_period(frequency, today: date):
+    return case(
+        *((frequency == name, period_index(name, today) - 1) for name in ("weekly", "monthly")),
+        else_=period_index("daily", today) - 1,
+    )
+
+
+def streak_stats_query(today: Union[date, Mapping[int, date]], *criteria):
+    """Current and best streak per habit matching ``criteria`` (on ``Habit``) that has entries.
+
+    ``today`` is a date, or ``{owner id: date}`` for owners in different timezones.
+    """
+    days = union(
+        select(HabitEntry.habit_id, Habit.owner_id, Habit.frequency,
+               local_dates.stored_day(HabitEntry.local_date).label("day"))
+        .join(Habit, Habit.id == HabitEntry.habit_id).where(*criteria),
+        select(HabitEntryArchive.habit_id, Habit.owner_id, Habit.frequency, HabitEntryArchive.day)
+        .join(Habit, Habit.id == HabitEntryArchive.habit_id)
+        .where(HabitEntryArchive.entry_count > 0, *criteria),
+    ).subquery("days")
+    periods = select(
+        days.c.habit_id, days.c.owner_id, days.c.frequency,
+        period_number(days.c.day, days.c.frequency).label("period"),
+    ).where(days.c.day.isnot(None)).distinct().subquery("periods")
+    islands = select(
+        periods.c.habit_id, periods.c.owner_id, periods.c.frequency, periods.c.period,
+        (periods.c.period
+         - func.row_number().over(partition_by=periods.c.habit_id, order_by=periods.c.period)).label("island"),
+    ).subquery("islands")
+    runs = select(
+        islands.c.habit_id, islands.c.owner_id, islands.c.frequency,
+        func.max(islands.c.period).label("last_period"),
+        func.count().label("length"),
+    ).group_by(islands.c.habit_id, islands.c.owner_id, islands.c.frequency, islands.c.island).subquery("runs")
+    if isinstance(today, date):
+        previous_period = _previous_period(runs.c.frequency, today)
+    else:
+        owners_by_day = defaultdict(list)
+        for owner_id, day in today.items():
+            owners_by_day[day].append(owner_id)
+        # The day most owners are on is the fallback, so the IN lists stay short
+        days_by_size = sorted(owners_by_day, key=lambda day: len(owners_by_day[day]))
+        previous_period = case(
+            *((runs.c.owner_id.in_(owners_by_day[day]), _previous_period(runs.c.frequency, day))
+              for day in days_by_size[:-1]),
+            else_=_previous_period(runs.c.frequency, days_by_size[-1]),
+        )
+    return select(
+        runs.c.habit_id,
+        func.max(case((runs.c.last_period >= previous_period, runs.c.length), else_=0)).label("current"),
+        func.max(runs.c.length).label("best"),
+    ).group_by(runs.c.habit_id)
+
+
+def streaks_by_habit(db: Session, *criteria, today: Optional[date] = None) -> Dict[int, Tuple[int, int]]:
+    """``{habit id: (current, best)}`` for habits matching ``criteria`` that have entries."""
+    rows = db.execute(streak_stats_query(today or date.today(), *criteria))
+    return {habit_id: (current, best) for habit_id, current, best in rows}
+
+
+def reconcile_streaks(db: Session, chunk_size: int = CHUNK_SIZE, today: Optional[date] = None,
+                      directory: Optional[Session] = None) -> Dict[str, int]:
+    """Recompute ``streak_count`` and ``best_streak`` of every habit in ``db``.
+
+    Habits are walked in id order, ``chunk_size`` at a time, committing after
+    each chunk. Only one row per habit comes back to Python, and only habits
+    whose numbers changed are written. Each habit is judged on its owner's
+    today, with timezones read from ``directory`` (defaults to ``db``), unless
+    ``today`` is given.
+    """
+    checked = updated = 0
+    after = 0
+    while True:
+        chunk = db.execute(
+            select(Habit.id, Habit.owner_id).where(Habit.id > after).order_by(Habit.id).limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+        ids = [habit_id for habit_id, _ in chunk]
+        if today is not None:
+            todays = today
+        else:
+            names = local_dates.owner_timezones(directory or db, {owner_id for _, owner_id in chunk})
+            todays = {owner_id: local_dates.today(names.get(owner_id)) for _, owner_id in chunk}
+        stats = streak_stats_query(todays, Habit.id.between(ids[0], ids[-1])).subquery("stats")
+        rows = db.execute(
+            select(Habit.id, Habit.streak_count, Habit.best_streak,
+                   func.coalesce(stats.c.current, 0), func.coalesce(stats.c.best, 0))
+            .outerjoin(stats, stats.c.habit_id == Habit.id)
+            .where(Habit.id.between(ids[0], ids[-1]))
+        ).all()
+        changes: List[Dict[str, int]] = [
+            {"id": habit_id, "streak_count": current, "best_streak": best}
+            for habit_id, old_current, old_best, current, best in rows
+            if (old_current, old_best) != (current, best)
+        ]
+        if changes:
+            db.execute(update(Habit), changes)
+        db.commit()
+        checked += len(rows)
+        updated += len(changes)
+        after = ids[-1]
+    logger.info("Reconciled streaks of %s habits, %s changed", checked, updated)
+    return {"habits": checked, "updated": updated}
+
+
+def habit_streaks(db: Session, habit_id: int, today: Optional[date] = None) -> Tuple[int, int]:
+    """``(current, best)`` streak of one habit over its full history."""
+    return streaks_by_habit(db, Habit.id == habit_id, today=today).get(habit_id, (0, 0))
+
+
+def update_habit_streak(db: Session, habit: Habit):
+    # In the timezone the session writes in (see local_dates.use_timezone)
+    today = local_dates.today(db.info.get(local_dates.SESSION_KEY))
+    habit.streak_count, habit.best_streak = habit_streaks(db, habit.id, today)
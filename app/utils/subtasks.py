@@ -0,0 +1,100 @@
+"""Subtask trees and their cached progress counts.
+
+A todo's subtasks point at it through ``parent_id``. Each todo caches how many
+direct subtasks it has (``child_count``) and how many of them are completed
+(``completed_child_count``), so list pages can show progress without recursive
+queries. An ``after_flush`` hook adjusts the parents' counts with relative
+``UPDATE``s in the same transaction as the subtask insert, update or delete.
+
+Whole trees are read with one recursive CTE bounded by depth
+(``fetch_tree``); ancestor checks use the same kind of query upwards.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, literal, select, update
+from sqlalchemy.orm import Session, attributes
+
+from app.models.todo import Todo
+
+MAX_TREE_DEPTH = 20
+
+
+def _before_and_after(todo: Todo, name: str) -> Tuple:
+    history = attributes.get_history(todo, name)
+    if not (history.added or history.deleted):
+        value = getattr(todo, name)
+        return value, value
+    return (history.deleted[0] if history.deleted else None), (history.added[0] if history.added else None)
+
+
+def parent_deltas(session: Session) -> Dict[int, List[int]]:
+    """``{parent_id: [child_count delta, completed_child_count delta]}`` for this flush."""
+    deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(parent_id: Optional[int], completed, sign: int):
+        if parent_id is not None:
+            deltas[parent_id][0] += sign
+            deltas[parent_id][1] += sign * bool(completed)
+
+    for todo in session.new:
+        if isinstance(todo, Todo):
+            add(todo.parent_id, todo.is_completed, 1)
+    for todo in session.deleted:
+        if isinstance(todo, Todo):
+            add(_before_and_after(todo, "parent_id")[0], _before_and_after(todo, "is_completed")[0], -1)
+    for todo in session.dirty:
+        if isinstance(todo, Todo):
+            old_parent, new_parent = _before_and_after(todo, "parent_id")
+            was_completed, is_completed = _before_and_after(todo, "is_completed")
+            if old_parent != new_parent or bool(was_completed) != bool(is_completed):
+                add(old_parent, was_completed, -1)
+                add(new_parent, is_completed, 1)
+    return {parent_id: delta for parent_id, delta in deltas.items() if any(delta)}
+
+
+@event.listens_for(Session, "after_flush")
+def _update_parent_counts(session: Session, flush_context):
+    deltas = parent_deltas(session)
+    if not deltas:
+        return
+    conn = session.connection(bind_arguments={"mapper": Todo})
+    for parent_id, (children, completed) in sorted(deltas.items()):
+        conn.execute(update(Todo.__table__).where(Todo.__table__.c.id == parent_id).values(
+            child_count=Todo.__table__.c.child_count + children,
+            completed_child_count=Todo.__table__.c.completed_child_count + completed,
+        ))
+
+
+def ancestor_ids(db: Session, todo_id: int) -> Set[int]:
+    """``todo_id`` and every todo above it."""
+    chain = select(Todo.id, Todo.parent_id).where(Todo.id == todo_id).cte("ancestors", recursive=True)
+    chain = chain.union_all(select(Todo.id, Todo.parent_id).join(chain, Todo.id == chain.c.parent_id))
+    return set(db.execute(select(chain.c.id)).scalars())
+
+
+def check_parent(db: Session, todo_id: Optional[int], parent_id: Optional[int], owner_id: int):
+    """Reject parents the user does not own and moves that would create a cycle."""
+    if parent_id is None:
+        return
+    parent = db.query(Todo.id).filter(Todo.id == parent_id, Todo.owner_id == owner_id).first()
+    if parent is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parent todo not found")
+    if todo_id is not None and todo_id in ancestor_ids(db, parent_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A todo cannot be nested under itself or its own subtasks"
+        )
+
+
+def fetch_tree(db: Session, root_id: int, owner_id: int, max_depth: int) -> List[Tuple[Todo, int]]:
+    """The root and its subtasks down to ``max_depth`` levels, as ``(todo, depth)`` pairs."""
+    tree = select(Todo.id, literal(0).label("depth")).where(
+        Todo.id == root_id, Todo.owner_id == owner_id
+    ).cte("tree", recursive=True)
+    tree = tree.union_all(
+        select(Todo.id, tree.c.depth + 1).join(tree, Todo.parent_id == tree.c.id).where(tree.c.depth < max_depth)
+    )
+    return db.query(Todo, tree.c.depth).join(tree, Todo.id == tree.c.id) \
+        .order_by(tree.c.depth, Todo.rank, Todo.id).all()
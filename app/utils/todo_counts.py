@@ -0,0 +1,106 @@
+"""Per-user todo counts by category and by priority.
+
+``todo_categories`` and ``todo_priority_counts`` hold how many of a user's
+todos use each category and priority, so ``GET /todos/categories`` and the
+dashboard distributions read a handful of rows instead of grouping all of the
+user's todos. The counts are adjusted in the same transaction as the todo
+change, by an ``after_flush`` hook on every session that turns the flushed
+todo inserts, updates and deletes into ``+n``/``-n`` upserts. A category's row
+is removed when its last todo goes.
+
+Bulk Core statements bypass the hook: the benchmark seeder calls
+``rebuild_counts`` afterwards, and the account purge leaves the rows to the
+``users`` foreign key cascade.
+"""
+from collections import Counter
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, attributes
+
+from app.models.todo import Todo, TodoCategory, TodoPriorityCount
+
+# Todo attribute -> (counts table, its key column)
+COUNTED = {
+    "category": (TodoCategory.__table__, "name"),
+    "priority": (TodoPriorityCount.__table__, "priority"),
+}
+
+_UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _committed(todo: Todo, name: str):
+    history = attributes.get_history(todo, name)
+    values = history.unchanged or history.deleted
+    return values[0] if values else None
+
+
+def flush_deltas(session: Session) -> Counter:
+    """``{(attribute, owner_id, value): delta}`` for the todos being flushed."""
+    deltas: Counter = Counter()
+    for todo in session.new:
+        if isinstance(todo, Todo):
+            for name in COUNTED:
+                deltas[(name, todo.owner_id, getattr(todo, name))] += 1
+    for todo in session.deleted:
+        if isinstance(todo, Todo):
+            for name in COUNTED:
+                deltas[(name, todo.owner_id, _committed(todo, name))] -= 1
+    for todo in session.dirty:
+        if isinstance(todo, Todo):
+            for name in COUNTED:
+                history = attributes.get_history(todo, name)
+                if history.added or history.deleted:
+                    deltas[(name, todo.owner_id, history.deleted[0] if history.deleted else None)] -= 1
+                    deltas[(name, todo.owner_id, history.added[0] if history.added else None)] += 1
+    return Counter({key: delta for key, delta in deltas.items() if delta and key[2] is not None})
+
+
+def _apply(conn: Connection, name: str, owner_id: int, value: str, delta: int):
+    table, key = COUNTED[name]
+    upsert = _UPSERTS.get(conn.dialect.name)
+    if upsert is not None:
+        statement = upsert(table).values({"owner_id": owner_id, key: value, "todo_count": delta})
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=["owner_id", key],
+            set_={"todo_count": table.c.todo_count + statement.excluded.todo_count},
+        ))
+    else:
+        match = and_(table.c.owner_id == owner_id, table.c[key] == value)
+        if not conn.execute(update(table).where(match).values(todo_count=table.c.todo_count + delta)).rowcount:
+            conn.execute(insert(table).values({"owner_id": owner_id, key: value, "todo_count": delta}))
+    if delta < 0:
+        conn.execute(delete(table).where(table.c.owner_id == owner_id, table.c[key] == value,
+                                         table.c.todo_count <= 0))
+
+
+@event.listens_for(Session, "after_flush")
+def _update_counts(session: Session, flush_context):
+    deltas = flush_deltas(session)
+    if not deltas:
+        return
+    # The counts live next to the todos, on the user's shard when sharded
+    conn = session.connection(bind_arguments={"mapper": Todo})
+    # Sorted so concurrent transactions lock count rows in the same order
+    for (name, owner_id, value), delta in sorted(deltas.items()):
+        _apply(conn, name, owner_id, value, delta)
+
+
+def rebuild_counts(conn: Connection, owner_id: Optional[int] = None) -> Tuple[int, int]:
+    """Recompute the counts from ``todos``, for one owner or everyone."""
+    written = []
+    for name, (table, key) in COUNTED.items():
+        column = getattr(Todo, name)
+        source = select(Todo.owner_id, column, func.count(Todo.id)).where(column.isnot(None)) \
+            .group_by(Todo.owner_id, column)
+        clear = delete(table)
+        if owner_id is not None:
+            source = source.where(Todo.owner_id == owner_id)
+            clear = clear.where(table.c.owner_id == owner_id)
+        conn.execute(clear)
+        written.append(conn.execute(
+            insert(table).from_select(["owner_id", key, "todo_count"], source)
+        ).rowcount)
+    return tuple(written)
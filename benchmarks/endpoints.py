@@ -0,0 +1,243 @@
+"""Per-endpoint latency and query-count benchmark.
+
+Seeds a database with synthetic data, then calls every router endpoint
+in-process through the ASGI app and records p50/p95/p99 latency and the
+number of SQL statements each request issued. Results are written as JSON so
+runs on different commits can be diffed.
+
+    python -m benchmarks.endpoints --users 10000 --habits-per-user 50 --years 3
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.models import User
+from app.utils.query_monitor import query_monitor
+from benchmarks.common import bearer_headers, bench_app, make_engine, run_metadata, summarize, write_results
+from benchmarks.seed import SeedConfig, add_seed_arguments, seed_config_from_args, seed_database, user_email
+
+# Endpoints that need an external service (SMTP, Redis, Google) to respond
+SKIPPED = {
+    ("POST", "/auth/register"): "writes the OTP to Redis and queues a verification email",
+    ("GET", "/auth/google/login"): "Google OAuth redirect",
+    ("GET", "/auth/google/callback"): "calls Google's token endpoint",
+    ("POST", "/auth/google"): "verifies a Google ID token",
+    ("POST", "/auth/send-otp"): "writes Redis and queues an email",
+    ("POST", "/auth/resend-otp"): "writes Redis and queues an email",
+    ("POST", "/auth/verify-otp"): "reads the OTP from Redis",
+    ("POST", "/auth/verify-otp-signup"): "reads the OTP from Redis",
+    ("POST", "/auth/forgot-password"): "writes Redis and queues an email",
+    ("POST", "/auth/reset-password"): "reads the reset token from Redis",
+}
+
+
+@dataclass
+class Endpoint:
+    method: str
+    route: str
+    url: str
+    body: Optional[Callable[[int], dict]] = None
+    # Creates a fresh resource before each call (not timed); returns url params
+    setup: Optional[Callable[[TestClient, dict, dict], dict]] = None
+    headers: str = "user"
+
+
+def _create(path: str, body: dict):
+    def setup(client, headers, params):
+        response = client.post(path, json=body, headers=headers)
+        return {"id": response.json()["id"]}
+    return setup
+
+
+def _create_user(engine):
+    counter = {"n": 0}
+
+    def setup(client, headers, params):
+        counter["n"] += 1
+        with engine.begin() as conn:
+            result = conn.execute(insert(User.__table__).values(
+                email=f"disposable{counter['n']}-{time.time_ns()}@example.com",
+                is_active=True, is_verified=True, is_admin=False,
+            ))
+        return {"id": result.inserted_primary_key[0]}
+    return setup
+
+
+def build_endpoints(engine, params: dict) -> List[Endpoint]:
+    todo = {"title": "Bench todo", "description": "created by the benchmark", "priority": "high"}
+    recurring = dict(todo, due_date="2025-01-06T09:00:00", recurrence="weekly")
+    habit = {"name": "Bench habit", "description": "created by the benchmark"}
+    pomodoro = {"title": "Bench session", "description": "created by the benchmark"}
+    p = params
+    return [
+        Endpoint("GET", "/", "/"),
+        Endpoint("GET", "/health", "/health"),
+        Endpoint("POST", "/auth/login", "/auth/login",
+                 body=lambda i: {"email": p["email"], "password": p["password"]}, headers="none"),
+        Endpoint("GET", "/auth/me", "/auth/me"),
+        Endpoint("PUT", "/auth/me", "/auth/me", body=lambda i: {"timezone": "UTC"}),
+
+        Endpoint("POST", "/todos/", "/todos/", body=lambda i: dict(todo, title=f"Bench todo {i}")),
+        Endpoint("GET", "/todos/", "/todos/"),
+        Endpoint("GET", "/todos/categories", "/todos/categories"),
+        Endpoint("GET", "/todos/{todo_id}", f"/todos/{p['todo_id']}"),
+        Endpoint("GET", "/todos/{todo_id}/tree", f"/todos/{p['todo_id']}/tree"),
+        Endpoint("PUT", "/todos/{todo_id}", f"/todos/{p['todo_id']}",
+                 body=lambda i: {"is_completed": bool(i % 2)}),
+        Endpoint("DELETE", "/todos/{todo_id}", "/todos/{id}", setup=_create("/todos/", todo)),
+        Endpoint("POST", "/todos/{todo_id}/move", "/todos/{id}/move", setup=_create("/todos/", todo),
+                 body=lambda i: {"after_id": p["todo_id"]}),
+        Endpoint("PUT", "/todos/{todo_id}/occurrences/{occurrence_date}", "/todos/{id}/occurrences/2025-01-13",
+                 setup=_create("/todos/", recurring), body=lambda i: {"is_completed": True}),
+
+        Endpoint("POST", "/habits/", "/habits/", body=lambda i: dict(habit, name=f"Bench habit {i}")),
+        Endpoint("GET", "/habits/", "/habits/"),
+        Endpoint("GET", "/habits/today", "/habits/today"),
+        Endpoint("GET", "/habits/{habit_id}", f"/habits/{p['habit_id']}"),
+        Endpoint("PUT", "/habits/{habit_id}", f"/habits/{p['habit_id']}",
+                 body=lambda i: {"target_count": 1 + i % 3}),
+        Endpoint("DELETE", "/habits/{habit_id}", "/habits/{id}", setup=_create("/habits/", habit)),
+        Endpoint("GET", "/habits/{habit_id}/analytics", f"/habits/{p['habit_id']}/analytics"),
+        Endpoint("GET", "/habits/{habit_id}/analytics/series",
+                 f"/habits/{p['habit_id']}/analytics/series?years=3"),
+        Endpoint("POST", "/habits/{habit_id}/entries", f"/habits/{p['habit_id']}/entries",
+                 body=lambda i: {"completed_count": 1}),
+        Endpoint("GET", "/habits/{habit_id}/entries", f"/habits/{p['habit_id']}/entries"),
+        Endpoint("GET", "/habits/{habit_id}/calendar", f"/habits/{p['habit_id']}/calendar"),
+        Endpoint("GET", "/habits/analytics/aggregate", "/habits/analytics/aggregate"),
+
+        Endpoint("POST", "/pomodoro/", "/pomodoro/", body=lambda i: dict(pomodoro, title=f"Bench session {i}")),
+        Endpoint("GET", "/pomodoro/analytics", "/pomodoro/analytics"),
+        Endpoint("GET", "/pomodoro/", "/pomodoro/"),
+        Endpoint("GET", "/pomodoro/{pomodoro_id}", f"/pomodoro/{p['pomodoro_id']}"),
+        Endpoint("PUT", "/pomodoro/{pomodoro_id}", f"/pomodoro/{p['pomodoro_id']}",
+                 body=lambda i: {"duration": 25 + i % 2}),
+        Endpoint("DELETE", "/pomodoro/{pomodoro_id}", "/pomodoro/{id}", setup=_create("/pomodoro/", pomodoro)),
+
+        Endpoint("GET", "/dashboard/stats", "/dashboard/stats"),
+
+        Endpoint("GET", "/admin/dashboard", "/admin/dashboard"),
+        Endpoint("GET", "/admin/users", "/admin/users"),
+        Endpoint("GET", "/admin/users/{user_id}", f"/admin/users/{p['other_user_id']}"),
+        Endpoint("PUT", "/admin/users/{user_id}", f"/admin/users/{p['other_user_id']}",
+                 body=lambda i: {"is_verified": True}),
+        Endpoint("DELETE", "/admin/users/{user_id}", "/admin/users/{id}", setup=_create_user(engine)),
+        Endpoint("GET", "/admin/todos", "/admin/todos"),
+        Endpoint("GET", "/admin/habits", "/admin/habits"),
+        Endpoint("GET", "/admin/jobs/metrics", "/admin/jobs/metrics"),
+    ]
+
+
+def uncovered_routes(app, endpoints: List[Endpoint]) -> List[Dict[str, str]]:
+    covered = {(e.method, e.route) for e in endpoints} | set(SKIPPED)
+    missing = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        for method in sorted(route.methods):
+            if (method, route.path) not in covered:
+                missing.append({"method": method, "path": route.path})
+    return missing
+
+
+def benchmark_endpoint(client, endpoint: Endpoint, headers: dict, iterations: int, warmup: int,
+                       query_counts: List[int]) -> Dict:
+    timings = []
+    queries = []
+    status_codes = set()
+    request_headers = headers if endpoint.headers == "user" else {}
+    for i in range(warmup + iterations):
+        url = endpoint.url
+        if endpoint.setup:
+            url = url.format(**endpoint.setup(client, headers, {}))
+        json_body = endpoint.body(i) if endpoint.body else None
+
+        query_counts.clear()
+        started = time.perf_counter()
+        response = client.request(endpoint.method, url, json=json_body, headers=request_headers)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if i < warmup:
+            continue
+        timings.append(elapsed_ms)
+        queries.append(query_counts[-1] if query_counts else 0)
+        status_codes.add(response.status_code)
+
+    result = {"method": endpoint.method, "path": endpoint.route, "status_codes": sorted(status_codes)}
+    result.update(summarize(timings))
+    result["queries_per_request"] = round(sum(queries) / len(queries), 2) if queries else 0
+    result["max_queries"] = max(queries) if queries else 0
+    return result
+
+
+def run_benchmarks(engine, seed_config: SeedConfig, iterations: int = 50, warmup: int = 5,
+                   only: Optional[str] = None, seed: bool = True) -> Dict:
+    summary = seed_database(engine, seed_config) if seed else None
+    params = {
+        "email": user_email(1),
+        "password": seed_config.password,
+        "todo_id": 1,
+        "habit_id": 1,
+        "pomodoro_id": 1,
+        "other_user_id": min(2, seed_config.users),
+    }
+    headers = bearer_headers(params["email"])
+
+    query_counts: List[int] = []
+    collector = lambda stats: query_counts.append(stats.count)
+    query_monitor.listeners.append(collector)
+    try:
+        with bench_app(engine) as app, TestClient(app) as client:
+            endpoints = build_endpoints(engine, params)
+            selected = [e for e in endpoints if not only or only in e.route]
+            results = [
+                benchmark_endpoint(client, endpoint, headers, iterations, warmup, query_counts)
+                for endpoint in selected
+            ]
+            missing = uncovered_routes(app, endpoints)
+    finally:
+        query_monitor.listeners.remove(collector)
+
+    return {
+        "meta": dict(run_metadata(engine), iterations=iterations, warmup=warmup),
+        "seed": {"config": summary.config, "rows": summary.rows} if summary else None,
+        "endpoints": results,
+        "skipped": [{"method": m, "path": path, "reason": reason} for (m, path), reason in SKIPPED.items()],
+        "uncovered": missing,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every router endpoint in-process")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Only run endpoints whose path contains this string")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/endpoints-<timestamp>.json)")
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    results = run_benchmarks(
+        engine, seed_config_from_args(args), iterations=args.iterations, warmup=args.warmup,
+        only=args.only, seed=not args.skip_seed,
+    )
+
+    print(f"{'endpoint':<42} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+    for row in results["endpoints"]:
+        name = f"{row['method']} {row['path']}"
+        print(f"{name:<42} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+              f"{row['queries_per_request']:>8}")
+    for route in results["uncovered"]:
+        print(f"warning: {route['method']} {route['path']} has no benchmark")
+    print(f"results written to {write_results(results, args.output, prefix='endpoints')}")
+
+
+if __name__ == "__main__":
+    main()
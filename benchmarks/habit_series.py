@@ -0,0 +1,115 @@
+"""Long-range habit analytics: per-row Python vs NumPy arrays.
+
+Seeds one user with ``--habits`` habits and ``--years`` of daily entries, then
+computes the ``/habits/{id}/analytics/series`` numbers (rolling completion
+rates, moving averages, weekday and monthly profiles) for all of them:
+
+- ``python``: entries loaded per habit as ORM rows and folded into per-day
+  dicts, with the windows and profiles computed in Python loops
+- ``numpy``: ``load_series`` for every habit in one query, then
+  ``summarize_series`` on the arrays (also reported without the query)
+
+    python -m benchmarks.habit_series --habits 50 --years 5 --iterations 10
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Habit, HabitEntry
+from app.utils.habit_series import ROLLING_WINDOWS, load_series, summarize_series
+from benchmarks.common import make_engine, run_metadata, summarize, write_results
+from benchmarks.seed import SeedConfig, seed_database
+
+
+def python_summary(db, habits: List[Habit], start: date, end: date) -> List[Dict]:
+    days = (end - start).days + 1
+    results = []
+    for habit in habits:
+        progress = defaultdict(int)
+        for entry in db.query(HabitEntry).filter(HabitEntry.habit_id == habit.id).all():
+            day = entry.date.date()
+            if start <= day <= end:
+                progress[day] += entry.completed_count
+        target = habit.target_count if habit.frequency == "daily" else 1
+        completed = [progress[start + timedelta(days=n)] >= target for n in range(days)]
+        values = [progress[start + timedelta(days=n)] for n in range(days)]
+        rolling = {}
+        for window in ROLLING_WINDOWS:
+            rates, averages = [], []
+            for n in range(days):
+                lo = max(0, n - window + 1)
+                rates.append(sum(completed[lo:n + 1]) / (n + 1 - lo) * 100)
+                averages.append(sum(values[lo:n + 1]) / (n + 1 - lo))
+            rolling[window] = (rates, averages)
+        weekday_done, weekday_days = [0] * 7, [0] * 7
+        monthly = defaultdict(lambda: [0, 0])
+        for n in range(days):
+            day = start + timedelta(days=n)
+            weekday_done[day.weekday()] += completed[n]
+            weekday_days[day.weekday()] += 1
+            monthly[(day.year, day.month)][0] += completed[n]
+            monthly[(day.year, day.month)][1] += 1
+        results.append({
+            "habit_id": habit.id,
+            "rolling": rolling,
+            "weekday": [d / max(c, 1) * 100 for d, c in zip(weekday_done, weekday_days)],
+            "monthly": [d / c * 100 for d, c in monthly.values()],
+        })
+    return results
+
+
+def measure(fn: Callable, iterations: int) -> List[float]:
+    fn()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(habits: int = 50, years: float = 5, iterations: int = 10, database_url: str = "sqlite://") -> dict:
+    engine = make_engine(database_url)
+    config = SeedConfig(users=1, habits_per_user=habits, todos_per_user=0, pomodoros_per_user=0, years=years)
+    summary = seed_database(engine, config)
+    end = config.end_date
+    start = end - timedelta(days=config.days - 1)
+
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        rows = db.query(Habit).filter(Habit.owner_id == 1).order_by(Habit.id).all()
+        series = load_series(db, rows, start, end)
+        results = {
+            "python": summarize(measure(lambda: python_summary(db, rows, start, end), iterations)),
+            "numpy": summarize(measure(
+                lambda: summarize_series(load_series(db, rows, start, end)), iterations
+            )),
+            "numpy_compute_only": summarize(measure(lambda: summarize_series(series), iterations)),
+        }
+    results["speedup_p50"] = round(results["python"]["p50_ms"] / results["numpy"]["p50_ms"], 1)
+    results["meta"] = dict(
+        run_metadata(engine), habits=habits, years=years, days=config.days,
+        habit_entries=summary.rows["habit_entries"], iterations=iterations,
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--database-url", default="sqlite://", help="Defaults to in-memory SQLite")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.habits, args.years, args.iterations, args.database_url)
+    for name in ("python", "numpy", "numpy_compute_only"):
+        row = results[name]
+        print(f"{name:<20} p50 {row['p50_ms']:.1f} ms  p95 {row['p95_ms']:.1f} ms")
+    print(f"{results['meta']['habit_entries']} entries; numpy is {results['speedup_p50']}x faster at p50")
+    print(f"results written to {write_results(results, args.output, prefix='habit-series')}")
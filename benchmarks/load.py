@@ -0,0 +1,264 @@
+"""Open-loop load generator.
+
+Drives the API with Poisson arrivals at the rates given in a scenario file and
+reports throughput, latency percentiles and error rates per time window. New
+requests are started on schedule whether or not earlier ones have finished,
+and latency is measured from the scheduled arrival time, so a saturated
+service shows up as growing latency instead of a silently lower request rate.
+
+By default requests go in-process through ``httpx.ASGITransport``; pass
+``--base-url`` to target a running uvicorn instead (it must use the same
+database as ``--database-url``).
+
+In-process, the handlers' blocking database calls run on the load generator's
+event loop. Once more requests are in flight than the connection pool holds, a
+checkout blocks the loop while the connections it waits for belong to
+suspended requests, so nothing progresses until ``pool_timeout`` expires. The
+in-process engine therefore uses a short ``--pool-timeout``, which turns that
+stall into ``TimeoutError`` failures in the report rather than a hung run.
+
+    python -m benchmarks.load benchmarks/scenarios/mixed.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import bearer_headers, bench_app, make_engine, run_metadata, summarize, write_results
+from benchmarks.seed import SeedConfig, seed_database, user_email
+
+
+@dataclass
+class RequestSpec:
+    name: str
+    method: str
+    path: str
+    rate: float  # arrivals per second
+    body: Optional[dict] = None
+    auth: bool = True
+
+
+@dataclass
+class Stage:
+    duration_seconds: float
+    rate_multiplier: float = 1.0
+
+
+@dataclass
+class Scenario:
+    name: str
+    requests: List[RequestSpec]
+    stages: List[Stage]
+    window_seconds: float = 1.0
+    seed: Dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return sum(stage.duration_seconds for stage in self.stages)
+
+    def multiplier_at(self, offset: float) -> float:
+        elapsed = 0.0
+        for stage in self.stages:
+            elapsed += stage.duration_seconds
+            if offset < elapsed:
+                return stage.rate_multiplier
+        return 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        stages = data.get("stages") or [{"duration_seconds": data.get("duration_seconds", 30)}]
+        return cls(
+            name=data.get("name", "scenario"),
+            requests=[RequestSpec(**spec) for spec in data["requests"]],
+            stages=[Stage(**stage) for stage in stages],
+            window_seconds=data.get("window_seconds", 1.0),
+            seed=data.get("seed", {}),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+@dataclass
+class Sample:
+    name: str
+    scheduled: float  # seconds since the run started
+    latency_ms: float
+    status: Optional[int]
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or self.status >= 400
+
+
+def _fill(template, values: dict):
+    if isinstance(template, str):
+        return template.format(**values)
+    if isinstance(template, dict):
+        return {key: _fill(value, values) for key, value in template.items()}
+    if isinstance(template, list):
+        return [_fill(value, values) for value in template]
+    return template
+
+
+class UserPool:
+    """Template values for randomly chosen seeded users."""
+
+    def __init__(self, config: SeedConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self.headers = {}
+
+    def pick(self) -> dict:
+        user_id = self.rng.randint(1, self.config.users)
+        first_habit = (user_id - 1) * self.config.habits_per_user + 1
+        first_todo = (user_id - 1) * self.config.todos_per_user + 1
+        first_pomodoro = (user_id - 1) * self.config.pomodoros_per_user + 1
+        return {
+            "user_id": user_id,
+            "email": user_email(user_id),
+            "password": self.config.password,
+            "habit_id": self.rng.randint(first_habit, first_habit + max(self.config.habits_per_user, 1) - 1),
+            "todo_id": self.rng.randint(first_todo, first_todo + max(self.config.todos_per_user, 1) - 1),
+            "pomodoro_id": self.rng.randint(first_pomodoro, first_pomodoro + max(self.config.pomodoros_per_user, 1) - 1),
+        }
+
+    def auth_headers(self, values: dict) -> dict:
+        email = values["email"]
+        if email not in self.headers:
+            self.headers[email] = bearer_headers(email)
+        return self.headers[email]
+
+
+async def _fire(client, spec: RequestSpec, values: dict, headers: dict, scheduled: float,
+                started_at: float, samples: List[Sample]):
+    try:
+        response = await client.request(
+            spec.method, _fill(spec.path, values), json=_fill(spec.body, values), headers=headers
+        )
+        status, error = response.status_code, None
+    except Exception as exc:  # recorded as a failed request, the run keeps going
+        status, error = None, f"{type(exc).__name__}: {exc}"
+    latency_ms = (time.perf_counter() - started_at - scheduled) * 1000
+    samples.append(Sample(spec.name, scheduled, latency_ms, status, error))
+
+
+async def _arrivals(client, spec: RequestSpec, scenario: Scenario, users: UserPool, rng: random.Random,
+                    started_at: float, samples: List[Sample], in_flight: set):
+    offset = 0.0
+    while offset < scenario.duration:
+        rate = spec.rate * scenario.multiplier_at(offset)
+        if rate <= 0:
+            offset += 0.05
+            continue
+        offset += rng.expovariate(rate)
+        if offset >= scenario.duration:
+            break
+        delay = started_at + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        values = users.pick()
+        headers = users.auth_headers(values) if spec.auth else {}
+        task = asyncio.create_task(_fire(client, spec, values, headers, offset, started_at, samples))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+
+async def run_scenario(client, scenario: Scenario, seed_config: SeedConfig, rng_seed: int = 0) -> List[Sample]:
+    rng = random.Random(rng_seed)
+    users = UserPool(seed_config, rng)
+    samples: List[Sample] = []
+    in_flight: set = set()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        _arrivals(client, spec, scenario, users, random.Random(rng.random()), started_at, samples, in_flight)
+        for spec in scenario.requests
+    ))
+    if in_flight:
+        await asyncio.gather(*list(in_flight))
+    return samples
+
+
+def _summarize_samples(samples: List[Sample], seconds: float) -> Dict:
+    result = summarize([s.latency_ms for s in samples])
+    failures = [s for s in samples if s.failed]
+    result["throughput_rps"] = round(len(samples) / seconds, 2) if seconds else 0.0
+    result["error_rate"] = round(len(failures) / len(samples), 4) if samples else 0.0
+    return result
+
+
+def build_report(scenario: Scenario, samples: List[Sample]) -> Dict:
+    windows = []
+    window = scenario.window_seconds
+    bucket_count = int(scenario.duration // window) + (1 if scenario.duration % window else 0)
+    for index in range(bucket_count):
+        start = index * window
+        bucket = [s for s in samples if start <= s.scheduled < start + window]
+        windows.append(dict(_summarize_samples(bucket, window), start_seconds=round(start, 3)))
+
+    by_request = {}
+    for spec in scenario.requests:
+        matching = [s for s in samples if s.name == spec.name]
+        by_request[spec.name] = _summarize_samples(matching, scenario.duration)
+        by_request[spec.name]["errors"] = sorted({s.error or str(s.status) for s in matching if s.failed})
+
+    return {
+        "scenario": scenario.name,
+        "duration_seconds": scenario.duration,
+        "overall": _summarize_samples(samples, scenario.duration),
+        "requests": by_request,
+        "windows": windows,
+    }
+
+
+async def run_load(scenario: Scenario, engine, seed_config: SeedConfig, base_url: Optional[str] = None,
+                   rng_seed: int = 0) -> Dict:
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            samples = await run_scenario(client, scenario, seed_config, rng_seed)
+    else:
+        with bench_app(engine) as app:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                samples = await run_scenario(client, scenario, seed_config, rng_seed)
+    return build_report(scenario, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test against the API")
+    parser.add_argument("scenario", help="Scenario JSON file")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--pool-timeout", type=float, default=2.0,
+                        help="Seconds to wait for a pooled connection in-process")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+
+    scenario = Scenario.load(args.scenario)
+    seed_config = SeedConfig(**scenario.seed)
+    engine = make_engine(args.database_url, pool_timeout=args.pool_timeout)
+    if not args.skip_seed:
+        seed_database(engine, seed_config)
+
+    report = asyncio.run(run_load(scenario, engine, seed_config, base_url=args.base_url))
+    report["meta"] = run_metadata(engine)
+
+    print(f"{'window':>8} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>8}")
+    for row in report["windows"]:
+        print(f"{row['start_seconds']:>8.1f} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>8.2%}")
+    print(f"results written to {write_results(report, args.output, prefix='load')}")
+
+
+if __name__ == "__main__":
+    main()
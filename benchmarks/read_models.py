@@ -0,0 +1,99 @@
+"""Memory and time per list page: ORM entities vs column-projected rows.
+
+Loads one large page of todos three ways and records the peak memory traced
+while loading and rendering it (``tracemalloc``) along with the wall time:
+
+- ``orm``: ``query.all()`` entities validated through the response schema, as
+  a handler returning ORM objects does
+- ``projected``: every schema column as read-only rows via ``ListSerializer``
+- ``fields``: the same, narrowed to the ``--fields`` a client asked for
+
+    python -m benchmarks.read_models --rows 5000 --fields id,title,is_completed
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Todo
+from app.schemas.todo import Todo as TodoSchema
+from app.utils.serialization import ListSerializer
+from benchmarks.common import make_engine, run_metadata, summarize, write_results
+from benchmarks.serialization import seed
+
+response_adapter = TypeAdapter(List[TodoSchema])
+serializer = ListSerializer(Todo, TodoSchema)
+
+
+def _page(db):
+    return db.query(Todo).filter(Todo.owner_id == 1).order_by(Todo.created_at.desc())
+
+
+def orm_page(db, limit: int, fields) -> bytes:
+    todos = _page(db).limit(limit).all()
+    body = response_adapter.dump_json(response_adapter.validate_python(todos, from_attributes=True))
+    db.expunge_all()
+    return body
+
+
+def projected_page(db, limit: int, fields) -> bytes:
+    return serializer.dump_json(serializer.fetch(_page(db).limit(limit)))
+
+
+def fields_page(db, limit: int, fields) -> bytes:
+    return serializer.dump_json(serializer.fetch(_page(db).limit(limit), fields), fields)
+
+
+def measure(fn: Callable, db, limit: int, fields, iterations: int) -> Dict:
+    fn(db, limit, fields)
+    gc.collect()
+    tracemalloc.start()
+    fn(db, limit, fields)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(db, limit, fields)
+        timings.append((time.perf_counter() - started) * 1000)
+    return dict(summarize(timings), peak_kib=round(peak / 1024, 1))
+
+
+def run(rows: int = 5000, iterations: int = 20, fields: str = "id,title,is_completed",
+        database_url: str = "sqlite://") -> dict:
+    engine = make_engine(database_url)
+    seed(engine, rows)
+    selected = serializer.parse_fields(fields)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        assert json.loads(orm_page(db, rows, selected)) == json.loads(projected_page(db, rows, selected))
+        results = {
+            name: measure(fn, db, rows, selected, iterations)
+            for name, fn in (("orm", orm_page), ("projected", projected_page), ("fields", fields_page))
+        }
+    return {
+        "meta": dict(run_metadata(engine), rows=rows, iterations=iterations, fields=list(selected)),
+        **results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="Page size (all rows are seeded for one user)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fields", default="id,title,is_completed")
+    parser.add_argument("--database-url", default="sqlite://", help="Defaults to in-memory SQLite")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.iterations, args.fields, args.database_url)
+    for name in ("orm", "projected", "fields"):
+        row = results[name]
+        print(f"{name:<10} peak {row['peak_kib']:>10.1f} KiB  p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms")
+    print(f"results written to {write_results(results, args.output, prefix='read-models')}")
@@ -0,0 +1,82 @@
+"""Compare JSON with columnar MessagePack for a todo list page.
+
+Both encoders start from the same projected rows (``ListSerializer.fetch``), so
+the query is left out. For each format it reports encode and decode time and
+the payload size, raw and gzipped at the level the middleware uses.
+
+    python -m benchmarks.response_formats --rows 500 --iterations 200
+"""
+import argparse
+import gzip
+import json
+import time
+from typing import Callable, List
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Todo
+from app.schemas.todo import Todo as TodoSchema
+from app.utils import negotiation
+from app.utils.serialization import ListSerializer
+from benchmarks.common import make_engine, run_metadata, summarize, write_results
+from benchmarks.serialization import seed
+
+serializer = ListSerializer(Todo, TodoSchema)
+GZIP_LEVEL = 6
+
+
+def measure(fn: Callable, iterations: int) -> List[float]:
+    for _ in range(min(iterations, 20)):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def compare(name: str, encode: Callable, decode: Callable, iterations: int) -> dict:
+    payload = encode()
+    return {
+        "format": name,
+        "encode": summarize(measure(encode, iterations)),
+        "decode": summarize(measure(lambda: decode(payload), iterations)),
+        "bytes": len(payload),
+        "gzip_bytes": len(gzip.compress(payload, compresslevel=GZIP_LEVEL)),
+    }
+
+
+def run(rows: int = 500, iterations: int = 200, database_url: str = "sqlite://") -> dict:
+    engine = make_engine(database_url)
+    seed(engine, rows)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        page = serializer.fetch(db.query(Todo).filter(Todo.owner_id == 1).order_by(Todo.id).limit(rows))
+    assert negotiation.unpackb(serializer.dump_msgpack(page)) == json.loads(serializer.dump_json(page))
+
+    results = {
+        "json": compare("json", lambda: serializer.dump_json(page), json.loads, iterations),
+        "msgpack": compare("msgpack", lambda: serializer.dump_msgpack(page), negotiation.unpackb, iterations),
+    }
+    results["size_ratio"] = round(results["msgpack"]["bytes"] / results["json"]["bytes"], 3)
+    results["gzip_size_ratio"] = round(results["msgpack"]["gzip_bytes"] / results["json"]["gzip_bytes"], 3)
+    results["meta"] = dict(run_metadata(engine), rows=rows, iterations=iterations)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--database-url", default="sqlite://", help="Defaults to in-memory SQLite")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.iterations, args.database_url)
+    for name in ("json", "msgpack"):
+        row = results[name]
+        print(f"{name:<8} encode p50 {row['encode']['p50_ms']:.3f} ms  decode p50 {row['decode']['p50_ms']:.3f} ms  "
+              f"{row['bytes']} bytes ({row['gzip_bytes']} gzipped)")
+    print(f"msgpack/json size: {results['size_ratio']} raw, {results['gzip_size_ratio']} gzipped")
+    print(f"results written to {write_results(results, args.output, prefix='response-formats')}")
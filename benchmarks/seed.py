@@ -0,0 +1,256 @@
+"""Synthetic data generator for benchmarks.
+
+Rows are produced as plain dicts and written with Core ``executemany`` inserts
+in fixed-size chunks, so large volumes stream into the database without ever
+building ORM objects or holding a whole table in memory. Primary keys are
+assigned here so child rows can reference their parents without round trips;
+the generator therefore expects an empty schema. Core inserts skip the ORM
+hooks, so derived columns are filled here too: every synthetic user is on UTC,
+so the local dates are the days of the (UTC) timestamps.
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import create_engine, insert, text
+
+from app.database import Base
+from app.models import Habit, HabitEntry, PomodoroSession, Todo, User
+from app.utils.habit_calendar import rebuild_calendars
+from app.utils.ranking import evenly_spaced_keys
+from app.utils.todo_counts import rebuild_counts
+from app.utils.security import get_password_hash
+
+PRIORITIES = ["low", "medium", "high"]
+CATEGORIES = ["work", "personal", "health", "errands", "learning", None]
+FREQUENCIES = ["daily", "daily", "daily", "weekly", "monthly"]
+
+
+@dataclass
+class SeedConfig:
+    users: int = 100
+    habits_per_user: int = 10
+    todos_per_user: int = 200
+    pomodoros_per_user: int = 100
+    years: float = 1
+    entry_density: float = 0.7  # chance a habit has an entry on any given day
+    chunk_size: int = 10_000
+    seed: int = 42
+    password: str = "benchmark-password"
+    end_date: date = field(default_factory=date.today)
+
+    @property
+    def days(self) -> int:
+        return max(1, int(self.years * 365))
+
+
+@dataclass
+class SeedSummary:
+    config: Dict
+    rows: Dict[str, int]
+
+
+def user_email(user_id: int) -> str:
+    return f"bench{user_id}@example.com"
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _insert(conn, table, rows: Iterable[dict], chunk_size: int) -> int:
+    total = 0
+    for chunk in _chunks(rows, chunk_size):
+        conn.execute(insert(table), chunk)
+        total += len(chunk)
+    return total
+
+
+def _at(day: date, rng: random.Random) -> datetime:
+    return datetime(day.year, day.month, day.day, rng.randrange(6, 23), rng.randrange(60))
+
+
+def generate_users(config: SeedConfig) -> Iterator[dict]:
+    # bcrypt is deliberately slow, so every synthetic user shares one hash
+    hashed_password = get_password_hash(config.password)
+    start = datetime.combine(config.end_date - timedelta(days=config.days), datetime.min.time())
+    for user_id in range(1, config.users + 1):
+        yield {
+            "id": user_id,
+            "email": user_email(user_id),
+            "username": f"bench{user_id}",
+            "full_name": f"Bench User {user_id}",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_verified": True,
+            "is_admin": user_id == 1,
+            "is_2fa_enabled": False,
+            "created_at": start,
+        }
+
+
+def generate_todos(config: SeedConfig, rng: random.Random) -> Iterator[dict]:
+    todo_id = 0
+    ranks = evenly_spaced_keys(config.todos_per_user)
+    for user_id in range(1, config.users + 1):
+        for n in range(config.todos_per_user):
+            todo_id += 1
+            created = _at(config.end_date - timedelta(days=rng.randrange(config.days)), rng)
+            completed = rng.random() < 0.6
+            todo = {
+                "id": todo_id,
+                "title": f"Todo {n}",
+                "description": f"Synthetic todo {n} for user {user_id}. " * 4,
+                "is_completed": completed,
+                "priority": rng.choice(PRIORITIES),
+                "category": rng.choice(CATEGORIES),
+                "due_date": created + timedelta(days=rng.randrange(1, 30)),
+                "created_at": created,
+                "completed_at": created + timedelta(hours=rng.randrange(1, 72)) if completed else None,
+                "created_local_date": created.date(),
+                "rank": ranks[n],
+                "owner_id": user_id,
+            }
+            todo["completed_local_date"] = todo["completed_at"].date() if completed else None
+            yield todo
+
+
+def generate_habits(config: SeedConfig, rng: random.Random) -> Iterator[dict]:
+    habit_id = 0
+    start = datetime.combine(config.end_date - timedelta(days=config.days), datetime.min.time())
+    for user_id in range(1, config.users + 1):
+        for n in range(config.habits_per_user):
+            habit_id += 1
+            yield {
+                "id": habit_id,
+                "name": f"Habit {n}",
+                "description": f"Synthetic habit {n} for user {user_id}",
+                "frequency": rng.choice(FREQUENCIES),
+                "target_count": rng.randrange(1, 4),
+                "is_active": rng.random() < 0.9,
+                "streak_count": 0,
+                "best_streak": 0,
+                "created_at": start,
+                "owner_id": user_id,
+            }
+
+
+def generate_habit_entries(config: SeedConfig, rng: random.Random) -> Iterator[dict]:
+    habit_count = config.users * config.habits_per_user
+    entry_id = 0
+    for habit_id in range(1, habit_count + 1):
+        for offset in range(config.days, -1, -1):
+            if rng.random() >= config.entry_density:
+                continue
+            day = config.end_date - timedelta(days=offset)
+            entry_id += 1
+            yield {
+                "id": entry_id,
+                "completed_count": rng.randrange(0, 4),
+                "notes": None,
+                "date": datetime(day.year, day.month, day.day),
+                "local_date": day,
+                "habit_id": habit_id,
+            }
+
+
+def generate_pomodoros(config: SeedConfig, rng: random.Random) -> Iterator[dict]:
+    session_id = 0
+    for user_id in range(1, config.users + 1):
+        for n in range(config.pomodoros_per_user):
+            session_id += 1
+            created = _at(config.end_date - timedelta(days=rng.randrange(config.days)), rng)
+            completed = rng.random() < 0.7
+            yield {
+                "id": session_id,
+                "title": f"Focus session {n}",
+                "description": f"Synthetic pomodoro {n}",
+                "duration": rng.choice([15, 25, 25, 50]),
+                "break_duration": 5,
+                "is_active": rng.random() < 0.9,
+                "completed_at": created + timedelta(minutes=25) if completed else None,
+                "created_at": created,
+                "created_local_date": created.date(),
+                "owner_id": user_id,
+            }
+
+
+def _reset_sequences(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        if "id" in table.c:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
+
+
+def seed_database(engine, config: SeedConfig) -> SeedSummary:
+    """Create the schema on ``engine`` and fill it with synthetic data."""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(config.seed)
+    rows = {}
+    with engine.begin() as conn:
+        rows["users"] = _insert(conn, User.__table__, generate_users(config), config.chunk_size)
+        rows["todos"] = _insert(conn, Todo.__table__, generate_todos(config, rng), config.chunk_size)
+        # Core inserts skip the ORM hook that maintains these
+        rows["todo_categories"], rows["todo_priority_counts"] = rebuild_counts(conn)
+        rows["habits"] = _insert(conn, Habit.__table__, generate_habits(config, rng), config.chunk_size)
+        rows["habit_entries"] = _insert(
+            conn, HabitEntry.__table__, generate_habit_entries(config, rng), config.chunk_size
+        )
+        rows["habit_year_calendars"] = rebuild_calendars(conn)
+        rows["pomodoro_sessions"] = _insert(
+            conn, PomodoroSession.__table__, generate_pomodoros(config, rng), config.chunk_size
+        )
+        _reset_sequences(conn)
+
+    summary_config = asdict(config)
+    summary_config["end_date"] = config.end_date.isoformat()
+    summary_config.pop("password")
+    return SeedSummary(config=summary_config, rows=rows)
+
+
+def add_seed_arguments(parser: argparse.ArgumentParser):
+    defaults = SeedConfig()
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--habits-per-user", type=int, default=defaults.habits_per_user)
+    parser.add_argument("--todos-per-user", type=int, default=defaults.todos_per_user)
+    parser.add_argument("--pomodoros-per-user", type=int, default=defaults.pomodoros_per_user)
+    parser.add_argument("--years", type=float, default=defaults.years)
+    parser.add_argument("--entry-density", type=float, default=defaults.entry_density)
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def seed_config_from_args(args) -> SeedConfig:
+    return SeedConfig(
+        users=args.users,
+        habits_per_user=args.habits_per_user,
+        todos_per_user=args.todos_per_user,
+        pomodoros_per_user=args.pomodoros_per_user,
+        years=args.years,
+        entry_density=args.entry_density,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic benchmark data")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    summary = seed_database(create_engine(args.database_url), seed_config_from_args(args))
+    for table, count in summary.rows.items():
+        print(f"{table}: {count} rows")
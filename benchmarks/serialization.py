@@ -0,0 +1,100 @@
+"""Compare the ORM + response_model serialization path with ListSerializer.
+
+The old path loads ORM objects, builds schema instances with ``from_orm`` and
+then does what FastAPI does for a ``response_model``: validate the list again,
+run it through ``jsonable_encoder`` and ``json.dumps`` it. The new path is the
+column-only query rendered by ``ListSerializer``. Both include the query.
+
+    python -m benchmarks.serialization --rows 100 --iterations 500
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Todo, User
+from app.schemas.todo import Todo as TodoSchema
+from app.utils.serialization import ListSerializer
+from benchmarks.common import make_engine, run_metadata, summarize, write_results
+
+response_adapter = TypeAdapter(List[TodoSchema])
+serializer = ListSerializer(Todo, TodoSchema)
+
+
+def old_path(db, limit: int) -> bytes:
+    todos = db.query(Todo).filter(Todo.owner_id == 1).order_by(Todo.created_at.desc()).limit(limit).all()
+    content = [TodoSchema.from_orm(todo) for todo in todos]
+    validated = response_adapter.validate_python(content, from_attributes=True)
+    encoded = jsonable_encoder(response_adapter.dump_python(validated, mode="json"))
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def new_path(db, limit: int) -> bytes:
+    query = db.query(Todo).filter(Todo.owner_id == 1).order_by(Todo.created_at.desc())
+    return serializer.dump_json(serializer.fetch(query.limit(limit)))
+
+
+def seed(engine, rows: int):
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="bench1@example.com"))
+        now = datetime.now()
+        db.add_all(
+            Todo(
+                title=f"Todo {n}", description="Synthetic description. " * 10, priority="medium",
+                category="work", due_date=now + timedelta(days=n), created_at=now - timedelta(minutes=n),
+                owner_id=1,
+            )
+            for n in range(rows)
+        )
+        db.commit()
+
+
+def measure(fn, db, limit: int, iterations: int) -> List[float]:
+    for _ in range(min(iterations, 20)):
+        fn(db, limit)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(db, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(rows: int = 100, iterations: int = 500, database_url: str = "sqlite://") -> dict:
+    engine = make_engine(database_url)
+    seed(engine, rows)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        assert json.loads(old_path(db, rows)) == json.loads(new_path(db, rows))
+        old = summarize(measure(old_path, db, rows, iterations))
+        new = summarize(measure(new_path, db, rows, iterations))
+    return {
+        "meta": dict(run_metadata(engine), rows=rows, iterations=iterations),
+        "old_path": old,
+        "new_path": new,
+        "speedup_p50": round(old["p50_ms"] / new["p50_ms"], 2) if new["p50_ms"] else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite://", help="Defaults to in-memory SQLite")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.iterations, args.database_url)
+    for name in ("old_path", "new_path"):
+        row = results[name]
+        print(f"{name:<9} p50 {row['p50_ms']:.3f} ms  p95 {row['p95_ms']:.3f} ms  p99 {row['p99_ms']:.3f} ms")
+    print(f"speedup (p50): {results['speedup_p50']}x")
+    print(f"results written to {write_results(results, args.output, prefix='serialization')}")
@@ -0,0 +1,127 @@
+"""Admin user search: three ``contains`` predicates vs the indexed search.
+
+Seeds ``--users`` users (1M by default) with realistic names and emails, then
+times one page of ``GET /admin/users?search=`` for each term with the old
+``OR`` of ``LIKE '%term%'`` predicates and with ``app.utils.user_search``.
+On Postgres the plan of each query is recorded as well, to show whether the
+trigram and prefix indexes were used; run it there for representative
+numbers, since SQLite only has the unindexed fallback.
+
+    python -m benchmarks.user_search --database-url postgresql://localhost/bench --users 1000000
+"""
+import argparse
+import random
+import time
+from typing import Dict, Iterator, List
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import User
+from app.utils import user_search
+from benchmarks.common import make_engine, run_metadata, summarize, write_results
+from benchmarks.seed import _insert
+
+FIRST_NAMES = ["anna", "ben", "carla", "dmitri", "elena", "farid", "grace", "hiro", "ines", "jamal",
+               "kofi", "lena", "mateo", "nadia", "omar", "priya", "quinn", "rosa", "sven", "tariq",
+               "uma", "victor", "wen", "ximena", "yusuf", "zoe"]
+LAST_NAMES = ["smith", "garcia", "nguyen", "kowalski", "okafor", "rossi", "tanaka", "muller", "silva",
+              "johansson", "haddad", "kim", "dubois", "novak", "patel", "lee", "brown", "costa"]
+DOMAINS = ["example.com", "mail.test", "corp.example", "uni.example.edu"]
+TERMS = ["ro", "smith", "nadia.okafor", "tanaka4", "example.edu", "qxzv"]
+
+
+def generate_users(count: int, rng: random.Random) -> Iterator[dict]:
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "id": user_id,
+            "email": f"{first}.{last}{user_id}@{rng.choice(DOMAINS)}",
+            "username": f"{first[:3]}{last}{user_id}",
+            "full_name": f"{first.title()} {last.title()}" if rng.random() < 0.9 else None,
+            "is_active": True,
+            "is_verified": True,
+            "is_admin": False,
+        }
+
+
+def seed(engine, users: int, chunk_size: int = 10_000, rng_seed: int = 42) -> int:
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        inserted = _insert(conn, User.__table__, generate_users(users, random.Random(rng_seed)), chunk_size)
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE users"))
+    return inserted
+
+
+def old_query(db, term: str, limit: int):
+    return db.query(User.id).filter(or_(
+        User.email.contains(term), User.full_name.contains(term), User.username.contains(term)
+    )).order_by(User.created_at.desc()).limit(limit)
+
+
+def new_query(db, term: str, limit: int):
+    dialect = db.get_bind().dialect.name
+    return db.query(User.id).filter(user_search.search_filter(term, dialect)).order_by(
+        user_search.relevance(term, dialect).desc(), User.id.asc()
+    ).limit(limit)
+
+
+def plan(db, query) -> List[str]:
+    statement = query.statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN {statement}")).scalars().all()
+    return [row.strip() for row in rows]
+
+
+def measure(db, build, term: str, limit: int, iterations: int) -> Dict:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        rows = build(db, term, limit).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return dict(summarize(timings), matches=len(rows))
+
+
+def run(users: int = 1_000_000, iterations: int = 20, limit: int = 100,
+        database_url: str = "sqlite:///./bench_users.db", seed_data: bool = True) -> Dict:
+    engine = make_engine(database_url)
+    seeded = seed(engine, users) if seed_data else None
+    Session = sessionmaker(bind=engine)
+    results = {}
+    with Session() as db:
+        postgres = engine.dialect.name == "postgresql"
+        for term in TERMS:
+            results[term] = {
+                "old": measure(db, old_query, term, limit, iterations),
+                "new": measure(db, new_query, term, limit, iterations),
+            }
+            if postgres:
+                results[term]["old"]["plan"] = plan(db, old_query(db, term, limit))
+                results[term]["new"]["plan"] = plan(db, new_query(db, term, limit))
+    return {
+        "meta": dict(run_metadata(engine), users=users, seeded=seeded, iterations=iterations, limit=limit),
+        "terms": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--database-url", default="sqlite:///./bench_users.db",
+                        help="Empty database to seed (Postgres for representative numbers)")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.users, args.iterations, args.limit, args.database_url, not args.skip_seed)
+    print(f"{'term':<14} {'old p50':>10} {'new p50':>10} {'old p95':>10} {'new p95':>10} {'matches':>8}")
+    for term, row in results["terms"].items():
+        print(f"{term:<14} {row['old']['p50_ms']:>10.2f} {row['new']['p50_ms']:>10.2f} "
+              f"{row['old']['p95_ms']:>10.2f} {row['new']['p95_ms']:>10.2f} {row['new']['matches']:>8}")
+    print(f"results written to {write_results(results, args.output, prefix='user-search')}")
@@ -9,6 +9,18 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
+  // Categories come with per-user counts from the server, not from the fetched page
+  const fetchCategories = useCallback(async () => {
+    if (!token) return;
+    
+    try {
+      const data = await todosAPI.getCategories(token);
+      setCategories(data.map((category: { name: string }) => category.name));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to fetch categories');
+    }
+  }, [token]);
+
   const fetchTodos = useCallback(async () => {
     if (!token) return;
     
@@ -36,10 +48,6 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
       const data = await todosAPI.getTodos(token, params);
       setTodos(data);
       
-      // Extract unique categories
-      const uniqueCategories = Array.from(new Set(data.map((todo: any) => todo.category).filter(Boolean))) as string[];
-      setCategories(uniqueCategories);
-      
       setError(null);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch todos');
@@ -55,9 +63,8 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
       const newTodo = await todosAPI.createTodo(token, todoData);
       setTodos(prev => [newTodo, ...prev]);
       
-      // Add category to categories list if it's new
       if (todoData.category && !categories.includes(todoData.category)) {
-        setCategories(prev => [...prev, todoData.category]);
+        fetchCategories();
       }
       
       return newTodo;
@@ -76,6 +83,9 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
       const updatedTodo = await todosAPI.updateTodo(token, id, todoData);
       console.log('Todo updated successfully:', updatedTodo);
       setTodos(prev => prev.map(todo => todo.id === id ? { ...todo, ...updatedTodo, id: id } : todo));
+      if ('category' in todoData) {
+        fetchCategories();
+      }
       return updatedTodo;
     } catch (err) {
       console.error('Error updating todo:', err);
@@ -95,12 +105,9 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
       await todosAPI.deleteTodo(token, id);
       setTodos(prev => prev.filter(todo => todo.id !== id));
       
-      // Remove category from categories list if no other todos use it
+      // The server drops a category once its last todo is gone
       if (todoToDelete?.category) {
-        const remainingTodosWithCategory = todos.filter(todo => todo.id !== id && todo.category === todoToDelete.category);
-        if (remainingTodosWithCategory.length === 0) {
-          setCategories(prev => prev.filter(cat => cat !== todoToDelete.category));
-        }
+        fetchCategories();
       }
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to delete todo');
@@ -113,6 +120,10 @@ export const useTodos = (token: string | null, filters?: { status?: string; prio
     fetchTodos();
   }, [token, fetchTodos]);
 
+  useEffect(() => {
+    fetchCategories();
+  }, [token, fetchCategories]);
+
   return { todos, categories, loading, error, fetchTodos, createTodo, updateTodo, deleteTodo };
 };
 
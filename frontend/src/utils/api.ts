@@ -127,6 +127,13 @@ export const todosAPI = {
     });
     return response.json();
   },
+
+  getCategories: async (token: string) => {
+    const response = await apiRequest('/todos/categories', {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return response.json();
+  },
   
   createTodo: async (token: string, data: any) => {
     const response = await apiRequest('/todos/', {
@@ -3,5 +3,8 @@
 # Start Redis server in the background
 redis-server &
 
+# Bring the schema up to date (the app no longer creates tables on import)
+alembic upgrade head
+
 # Start the FastAPI application
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
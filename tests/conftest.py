@@ -1,9 +1,17 @@
+import os
+
+# Jobs run in-process during tests; there is no worker or Redis
+os.environ["JOBS_EAGER"] = "true"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import get_db, Base
+from app.models.user import User
+from app.utils.query_monitor import query_monitor
+from app.utils.security import get_password_hash
 
 # Test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -19,9 +27,42 @@ def override_get_db():
 
 app.dependency_overrides[get_db] = override_get_db
 
+# Fail any test whose request repeats the same query shape past the threshold
+query_monitor.strict = True
+
 @pytest.fixture
 def client():
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
         yield c
     Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def test_user(db):
+    user = User(
+        email="test@example.com",
+        username="testuser",
+        hashed_password=get_password_hash("testpassword"),
+        is_verified=True  # User must be verified to login
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    response = client.post("/auth/login", json={
+        "email": "test@example.com",
+        "password": "testpassword"
+    })
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
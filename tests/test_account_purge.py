@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from app.models.habit import Habit, HabitEntry
+from app.models.pomodoro import PomodoroSession
+from app.models.todo import Todo
+from app.models.user import User
+from app.utils.account_purge import purge_user_data
+
+
+def add_account_data(db, user, todos=3, habits=2, entries=4):
+    db.add_all(Todo(title=f"Todo {n}", description="", owner_id=user.id) for n in range(todos))
+    db.add(PomodoroSession(title="Focus", owner_id=user.id))
+    for n in range(habits):
+        habit = Habit(name=f"Habit {n}", description="", owner_id=user.id)
+        db.add(habit)
+        db.flush()
+        db.add_all(HabitEntry(habit_id=habit.id, date=datetime(2025, 1, day + 1)) for day in range(entries))
+    db.commit()
+
+
+def test_purge_deletes_in_batches(client, db, test_user):
+    add_account_data(db, test_user)
+
+    deleted = purge_user_data(db, test_user.id, batch_size=3)
+
+    assert deleted == {"habit_entries": 8, "habit_entry_archive": 0, "habit_year_calendars": 2, "todos": 3,
+                       "pomodoro_sessions": 1, "habits": 2}
+    assert db.query(HabitEntry).count() == db.query(Todo).count() == db.query(Habit).count() == 0
+
+
+def test_database_cascades_user_delete(client, db, test_user):
+    add_account_data(db, test_user)
+
+    db.delete(test_user)
+    db.commit()
+
+    assert db.query(HabitEntry).count() == db.query(Todo).count() == db.query(PomodoroSession).count() == 0
+
+
+def test_admin_delete_deactivates_then_purges(client, db, test_user, auth_headers):
+    test_user.is_admin = True
+    other = User(email="leaving@example.com", username="leaving", is_verified=True)
+    db.add(other)
+    db.commit()
+    add_account_data(db, other)
+    other_id = other.id
+
+    response = client.delete(f"/admin/users/{other_id}", headers=auth_headers)
+
+    assert response.status_code == 202
+    db.expire_all()
+    # JOBS_EAGER (set in conftest) runs the queued purge job inline, before the response
+    assert db.get(User, other_id) is None
+    assert db.query(Todo).filter(Todo.owner_id == other_id).count() == 0
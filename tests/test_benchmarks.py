@@ -0,0 +1,68 @@
+import json
+from datetime import date
+from benchmarks.common import make_engine, percentile, summarize, write_results
+from benchmarks.endpoints import run_benchmarks
+from benchmarks.seed import SeedConfig, seed_database
+
+TINY = dict(users=3, habits_per_user=2, todos_per_user=5, pomodoros_per_user=3, years=0.1)
+
+
+def test_percentile_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert summarize([3.0, 1.0, 2.0])["p50_ms"] == 2.0
+
+
+def test_seed_database_row_counts(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    config = SeedConfig(entry_density=1.0, end_date=date(2024, 1, 31), **TINY)
+    summary = seed_database(engine, config)
+
+    assert summary.rows["users"] == 3
+    assert summary.rows["todos"] == 15
+    assert summary.rows["habits"] == 6
+    # Every habit gets one entry per day, inclusive of both ends of the window
+    assert summary.rows["habit_entries"] == 6 * (config.days + 1)
+
+
+def test_run_benchmarks_writes_comparable_json(client, tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    results = run_benchmarks(engine, SeedConfig(**TINY), iterations=2, warmup=0)
+
+    assert results["uncovered"] == []
+    by_route = {(row["method"], row["path"]): row for row in results["endpoints"]}
+    assert by_route[("GET", "/todos/")]["status_codes"] == [200]
+    assert by_route[("DELETE", "/todos/{todo_id}")]["status_codes"] == [204]
+    assert by_route[("GET", "/dashboard/stats")]["queries_per_request"] > 0
+    for row in results["endpoints"]:
+        assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+
+    path = write_results(results, str(tmp_path / "out.json"))
+    assert json.loads(path.read_text())["meta"]["database"] == "sqlite"
+
+
+def test_load_run_reports_windows(client, tmp_path):
+    import asyncio
+    from benchmarks.load import Scenario, run_load
+
+    engine = make_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    seed_config = SeedConfig(**TINY)
+    seed_database(engine, seed_config)
+    scenario = Scenario.from_dict({
+        "name": "smoke",
+        "window_seconds": 0.5,
+        "stages": [{"duration_seconds": 1}],
+        "requests": [
+            {"name": "todos", "method": "GET", "path": "/todos/", "rate": 10},
+            {"name": "entry", "method": "POST", "path": "/habits/{habit_id}/entries", "rate": 5,
+             "body": {"completed_count": 1}},
+        ],
+    })
+
+    report = asyncio.run(run_load(scenario, engine, seed_config))
+
+    assert len(report["windows"]) == 2
+    assert report["overall"]["count"] > 0
+    assert report["requests"]["todos"]["error_rate"] == 0
+    assert report["requests"]["entry"]["errors"] == []
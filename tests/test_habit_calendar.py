@@ -0,0 +1,104 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert
+
+from app.models.habit import Habit, HabitEntry, HabitYearCalendar
+from app.utils import local_dates
+from app.utils.habit_calendar import day_bit, load_calendars, longest_run, rebuild_calendars, to_bytes, year_summary
+
+
+def test_bit_helpers():
+    assert longest_run(0b1110111101) == 4
+    assert day_bit(date(2024, 12, 31)) == 365
+    # The 366th bit of a common year is never a day
+    assert year_summary({2023: 1 << 365 | 1}, 2023)["completed_days"] == 1
+
+
+def test_calendar_follows_entry_writes(client, db, test_user, auth_headers):
+    habit = Habit(name="Read", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    today = date.today()
+
+    def post(day, count=1):
+        return client.post(f"/habits/{habit.id}/entries", headers=auth_headers,
+                           json={"date": f"{day}T09:00:00", "completed_count": count})
+
+    days = [today - timedelta(days=n) for n in (0, 1, 2, 4)] + [date(today.year - 2, 1, 1)]
+    for day in days:
+        assert post(day).status_code == 200
+    post(today - timedelta(days=3), count=0)
+
+    response = client.get(f"/habits/{habit.id}/calendar", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    expected = {day_bit(day) for day in days if day.year == today.year}
+    assert body["completed_days"] == len(expected)
+    assert {n for n, done in enumerate(body["completed"]) if done} == expected
+    assert sum(body["monthly_completed_days"]) == body["completed_days"]
+
+    # Editing or deleting entries recomputes their days from what is left
+    def completed(day):
+        return (load_calendars(db, habit.id).get(day.year, 0) >> day_bit(day)) & 1
+
+    entry = db.query(HabitEntry).filter(HabitEntry.habit_id == habit.id).order_by(HabitEntry.date.desc()).first()
+    entry.completed_count = 0
+    db.commit()
+    assert completed(today) == 0
+    entry.completed_count = 2
+    db.commit()
+    assert completed(today) == 1
+    db.delete(entry)
+    db.commit()
+    assert completed(today) == 0
+
+    older = client.get(f"/habits/{habit.id}/calendar?year={today.year - 2}", headers=auth_headers).json()
+    assert older["completed"][0] == 1 and older["longest_streak"] == 1
+
+
+def test_rebuild_matches_raw_entries(client, db, test_user):
+    habits = [Habit(name=f"h{n}", description="", owner_id=test_user.id) for n in range(3)]
+    db.add_all(habits)
+    db.commit()
+    start = date(2022, 12, 25)
+    rows = [
+        {"habit_id": habit.id, "completed_count": (n + i) % 3, "date": datetime.combine(start + timedelta(days=n), time(9)),
+         "local_date": start + timedelta(days=n)}
+        for i, habit in enumerate(habits) for n in range(800)
+    ]
+    db.execute(insert(HabitEntry), rows)
+    db.add(HabitYearCalendar(habit_id=habits[0].id, year=2030, days=to_bytes(1)))  # stale
+    db.commit()
+
+    assert rebuild_calendars(db.connection(), chunk_size=2) == 3 * 4
+    db.commit()
+    for i, habit in enumerate(habits):
+        years = load_calendars(db, habit.id)
+        assert sorted(years) == [2022, 2023, 2024, 2025]
+        completed = {start + timedelta(days=n) for n in range(800) if (n + i) % 3}
+        assert sum(year_summary(years, year)["completed_days"] for year in years) == len(completed)
+        assert {year_summary(years, year)["longest_streak"] for year in years} == {2}
+
+
+def test_calendar_streaks_match_the_analytics(client, db, test_user, auth_headers):
+    today = local_dates.today(test_user.timezone)
+    daily = client.post("/habits/", headers=auth_headers, json={"name": "Read", "description": ""}).json()
+    weekly = client.post("/habits/", headers=auth_headers,
+                         json={"name": "Swim", "description": "", "frequency": "weekly"}).json()
+
+    def post(habit, day, count=1):
+        client.post(f"/habits/{habit['id']}/entries", headers=auth_headers,
+                    json={"date": f"{day}T09:00:00", "completed_count": count})
+
+    # A zero-count entry still keeps a streak going, though its day is not completed
+    for n, count in ((0, 1), (1, 0), (2, 1)):
+        post(daily, today - timedelta(days=n), count)
+    # One entry in each of the last three weeks
+    for weeks in range(3):
+        post(weekly, today - timedelta(weeks=weeks))
+
+    for habit, expected in ((daily, 3), (weekly, 3)):
+        calendar = client.get(f"/habits/{habit['id']}/calendar", headers=auth_headers).json()
+        analytics = client.get(f"/habits/{habit['id']}/analytics", headers=auth_headers).json()
+        assert (calendar["current_streak"], calendar["best_streak"]) == \
+            (analytics["current_streak"], analytics["best_streak"]) == (expected, expected)
@@ -0,0 +1,52 @@
+from datetime import date, datetime, time, timedelta
+
+from app.models.habit import Habit, HabitEntry
+
+
+def test_today_progress_and_etag(client, db, test_user, auth_headers):
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    water = Habit(name="Water", description="", frequency="daily", target_count=8, owner_id=test_user.id)
+    gym = Habit(name="Gym", description="", frequency="weekly", target_count=3, owner_id=test_user.id)
+    idle = Habit(name="Idle", description="", frequency="daily", owner_id=test_user.id)
+    retired = Habit(name="Retired", description="", is_active=False, owner_id=test_user.id)
+    db.add_all([water, gym, idle, retired])
+    db.commit()
+    at = lambda day, hour=9: datetime.combine(day, time(hour))
+    db.add_all([
+        HabitEntry(habit_id=water.id, completed_count=3, date=at(today)),
+        HabitEntry(habit_id=water.id, completed_count=2, date=at(today, 18)),
+        HabitEntry(habit_id=water.id, completed_count=8, date=at(today - timedelta(days=1))),
+        HabitEntry(habit_id=gym.id, completed_count=1, date=at(week_start)),
+        HabitEntry(habit_id=gym.id, completed_count=2, date=at(week_start + timedelta(days=6))),
+        HabitEntry(habit_id=gym.id, completed_count=5, date=at(week_start - timedelta(days=1))),
+        HabitEntry(habit_id=retired.id, completed_count=1, date=at(today)),
+    ])
+    db.commit()
+
+    response = client.get("/habits/today", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["date"] == today.isoformat()
+    progress = {habit["name"]: habit for habit in body["habits"]}
+    assert set(progress) == {"Water", "Gym", "Idle"}
+    assert {k: progress["Water"][k] for k in ("period", "progress", "entries", "completed", "remaining")} == {
+        "period": "day", "progress": 5, "entries": 2, "completed": False, "remaining": 3,
+    }
+    assert progress["Gym"]["period_start"] == week_start.isoformat()
+    assert progress["Gym"]["progress"] == 3 and progress["Gym"]["completed"]
+    assert [day["progress"] for day in progress["Gym"]["days"]] == [1, 0, 0, 0, 0, 0, 2]
+    assert progress["Idle"]["progress"] == 0 and progress["Idle"]["days"] is None
+
+    etag = response.headers["etag"]
+    assert client.get("/habits/today", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    # Entries outside the current periods leave the ETag alone
+    db.add(HabitEntry(habit_id=water.id, date=at(today - timedelta(days=3))))
+    db.commit()
+    assert client.get("/habits/today", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    client.post(f"/habits/{water.id}/entries", json={"completed_count": 3}, headers=auth_headers)
+    response = client.get("/habits/today", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert {habit["name"]: habit for habit in response.json()["habits"]}["Water"]["completed"]
@@ -0,0 +1,72 @@
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive
+from app.utils import negotiation
+from app.utils.habit_series import load_series, rolling_mean, summarize_series
+
+
+def test_rolling_mean_matches_a_loop():
+    values = np.arange(20, dtype=float).reshape(2, 10) ** 2
+    expected = [[values[h, max(0, i - 2):i + 1].mean() for i in range(10)] for h in range(2)]
+    assert np.allclose(rolling_mean(values, 3), expected)
+
+
+def test_series_for_several_habits_in_one_query(client, db, test_user):
+    start = date(2024, 1, 29)  # a Monday
+    water = Habit(name="Water", description="", target_count=3, owner_id=test_user.id)
+    gym = Habit(name="Gym", description="", frequency="weekly", target_count=3, owner_id=test_user.id)
+    db.add_all([water, gym])
+    db.commit()
+    at = lambda n: datetime.combine(start + timedelta(days=n), time(9))
+    db.add_all([
+        HabitEntry(habit_id=water.id, completed_count=2, date=at(0)),
+        HabitEntry(habit_id=water.id, completed_count=1, date=at(0)),
+        HabitEntry(habit_id=water.id, completed_count=2, date=at(1)),
+        HabitEntry(habit_id=water.id, completed_count=5, date=at(7)),
+        HabitEntry(habit_id=gym.id, completed_count=1, date=at(2)),
+        HabitEntry(habit_id=gym.id, completed_count=0, date=at(3)),
+        HabitEntry(habit_id=water.id, completed_count=9, date=at(20)),  # after the range
+        # An archived day adds to the live entries of the same day
+        HabitEntryArchive(habit_id=water.id, day=start + timedelta(days=1), entry_count=1,
+                          completed_entries=1, completed_total=1),
+    ])
+    db.commit()
+
+    series = load_series(db, [gym, water], start, start + timedelta(days=13))
+    assert series.habit_ids == [gym.id, water.id]
+    assert series.progress[1, :8].tolist() == [3, 3, 0, 0, 0, 0, 0, 5]
+    assert series.completed[1].sum() == 3
+    assert series.completed[0].nonzero()[0].tolist() == [2]
+
+    water_summary = summarize_series(series, windows=(2,))[1]
+    assert water_summary["completion_rate"] == round(3 / 14 * 100, 2)
+    assert water_summary["rolling_completion_rate"]["2"][:3] == [100.0, 100.0, 50.0]
+    assert water_summary["moving_average"]["2"][:3] == [3.0, 3.0, 1.5]
+    assert water_summary["weekday_completion_rate"] == [100.0, 50.0, 0, 0, 0, 0, 0]
+    assert water_summary["months"] == ["2024-01", "2024-02"]
+    assert water_summary["monthly_completion_rate"] == [round(2 / 3 * 100, 2), round(1 / 11 * 100, 2)]
+
+
+def test_series_endpoint(client, db, test_user, auth_headers):
+    habit = Habit(name="Read", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    today = date.today()
+    for n in range(0, 400, 2):
+        db.add(HabitEntry(habit_id=habit.id, date=datetime.combine(today - timedelta(days=n), time(8))))
+    db.commit()
+
+    response = client.get(f"/habits/{habit.id}/analytics/series?years=3", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["end"] == today.isoformat()
+    assert len(body["progress"]) == len(body["rolling_completion_rate"]["30"]) == 3 * 365
+    assert sum(body["completed"]) == 200
+    assert body["rolling_completion_rate"]["30"][-1] == 50.0
+
+    packed = client.get(f"/habits/{habit.id}/analytics/series?years=3",
+                        headers={**auth_headers, "Accept": negotiation.MSGPACK})
+    assert negotiation.unpackb(packed.content) == body
+    assert client.get(f"/habits/{habit.id}/analytics/series?years=6", headers=auth_headers).status_code == 422
@@ -0,0 +1,145 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.jobs import metrics
+from app.jobs.tasks import deliver_otp_email, deliver_password_reset_email, recompute_habit_streak
+from app.jobs.core import Job
+from app.models.habit import Habit, HabitEntry
+from app.utils import email
+
+
+@pytest.fixture(autouse=True)
+def job_metrics():
+    metrics.get_store().clear()
+    yield
+    metrics.get_store().clear()
+
+
+class Mailer:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def send_message(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("SMTP unavailable")
+        self.sent.append(message)
+
+
+class FakeRedis:
+    """The get/setex/exists/delete subset of Redis the email helpers use; setex ignores the TTL."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode() if value is not None else None
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(email, "get_redis", lambda: fake)
+    return fake
+
+
+def job_stats(client, headers, job):
+    response = client.get("/admin/jobs/metrics", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json(), response.json()["jobs"][job.name]
+
+
+def test_entry_streak_is_recomputed_by_a_job(client, db, test_user, auth_headers):
+    test_user.is_admin = True
+    db.commit()
+    habit = client.post("/habits/", json={"name": "read", "description": ""}, headers=auth_headers).json()
+
+    response = client.post(f"/habits/{habit['id']}/entries", json={"date": f"{date.today()}T08:00:00"},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Habit, habit["id"]).streak_count == 1
+
+    snapshot, stats = job_stats(client, auth_headers, recompute_habit_streak)
+    assert stats["succeeded"] == 1 and stats["failed"] == 0
+    assert stats["run_p50_ms"] is not None
+    assert snapshot["queue_depth"] == 0 and snapshot["dead_letter_count"] == 0
+
+
+def test_entry_is_saved_when_the_broker_is_down(client, db, auth_headers, monkeypatch, caplog):
+    def unreachable(self, *args, **kwargs):
+        raise ConnectionError("broker unreachable")
+
+    monkeypatch.setattr(Job, "delay", unreachable)
+    habit = client.post("/habits/", json={"name": "read", "description": ""}, headers=auth_headers).json()
+
+    response = client.post(f"/habits/{habit['id']}/entries", json={}, headers=auth_headers)
+    assert response.status_code == 200
+    assert db.query(HabitEntry).filter(HabitEntry.habit_id == habit["id"]).count() == 1
+    assert f"Could not queue {recompute_habit_streak.name}" in caplog.text
+
+
+def test_failing_job_is_retried_then_dead_lettered(client, db, test_user, auth_headers, redis, monkeypatch):
+    test_user.is_admin = True
+    db.commit()
+    flaky = Mailer(failures=2)
+    monkeypatch.setattr(email, "get_fastmail", lambda: flaky)
+
+    assert email.request_otp_email("user@example.com")
+    otp = email.current_otp("user@example.com")
+    assert len(flaky.sent) == 1 and otp in flaky.sent[0].body
+
+    monkeypatch.setattr(email, "get_fastmail", lambda: Mailer(failures=100))
+    assert email.request_otp_email("user@example.com")
+    otp = email.current_otp("user@example.com")
+
+    snapshot, stats = job_stats(client, auth_headers, deliver_otp_email)
+    assert stats["succeeded"] == 1
+    assert stats["failed"] == 1
+    assert stats["retried"] == 2 + 5  # JOBS_MAX_RETRIES
+    assert snapshot["dead_letter_count"] == 1
+    dead = snapshot["recent_dead_letters"][0]
+    assert dead["job"] == deliver_otp_email.name
+    # Only the address is queued; the code stays in Redis
+    assert dead["args"] == ["user@example.com"] and otp not in json.dumps(snapshot)
+    assert dead["retries"] == 5 and "SMTP unavailable" in dead["error"]
+
+
+def test_secret_emails_are_dropped_once_expired(redis, monkeypatch):
+    mailer = Mailer()
+    monkeypatch.setattr(email, "get_fastmail", lambda: mailer)
+
+    token = email.issue_password_reset_token("user@example.com")
+    deliver_password_reset_email.delay("user@example.com")
+    assert email.password_reset_link(token) in mailer.sent[0].body
+
+    # The token was used (or expired) and the OTP expired before the jobs ran
+    redis.delete(f"password_reset:{token}")
+    deliver_password_reset_email.delay("user@example.com")
+    deliver_otp_email.delay("user@example.com")
+    assert len(mailer.sent) == 1
+    assert metrics.get_store().length(metrics.DEAD_LETTER_KEY) == 0
+
+
+def test_job_metrics_are_admin_only(client, auth_headers):
+    assert client.get("/admin/jobs/metrics", headers=auth_headers).status_code == 403
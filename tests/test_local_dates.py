@@ -0,0 +1,154 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.models import Habit, HabitEntry, PomodoroSession, Todo, User
+from app.utils import local_dates
+from app.utils.local_dates import backfill_local_dates
+from app.utils.streaks import streak_stats_query
+
+
+def test_timezone_setting(client, auth_headers):
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "UTC"
+
+    response = client.put("/auth/me", headers=auth_headers, json={"timezone": "Asia/Tokyo"})
+    assert response.status_code == 200
+    assert response.json()["timezone"] == "Asia/Tokyo"
+    assert client.put("/auth/me", headers=auth_headers, json={"timezone": "Mars/Olympus"}).status_code == 422
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "Asia/Tokyo"
+
+
+def test_days_are_the_owners(client, db, test_user, auth_headers):
+    # UTC+14: its day is ahead of UTC's for most of the UTC day
+    client.put("/auth/me", headers=auth_headers, json={"timezone": "Pacific/Kiritimati"})
+    habit_id = client.post("/habits/", headers=auth_headers, json={"name": "Read", "description": ""}).json()["id"]
+
+    for day in ("2025-03-10T05:00:00-08:00", "2025-03-10T23:30:00", None):
+        response = client.post(f"/habits/{habit_id}/entries", headers=auth_headers,
+                               json={"date": day} if day else {})
+        assert response.status_code == 200
+    today = local_dates.today("Pacific/Kiritimati")
+    entries = db.query(HabitEntry).filter(HabitEntry.habit_id == habit_id).order_by(HabitEntry.id).all()
+    # Aware times are converted, naive ones keep the day the client wrote, and the default is the user's today
+    assert [entry.local_date for entry in entries] == [date(2025, 3, 11), date(2025, 3, 10), today]
+
+    progress = client.get("/habits/today", headers=auth_headers).json()
+    assert progress["date"] == today.isoformat()
+    assert progress["habits"][0]["progress"] == 1
+    calendar = client.get(f"/habits/{habit_id}/calendar?year=2025", headers=auth_headers).json()
+    assert calendar["completed"][68:70] == [1, 1]  # March 10 and 11
+
+    # Written outside a request: the owner's timezone is looked up
+    todo = Todo(title="Plan", description="", owner_id=test_user.id,
+                completed_at=datetime(2025, 3, 10, 11, 0, tzinfo=timezone.utc))
+    db.add(todo)
+    db.commit()
+    assert todo.completed_local_date == date(2025, 3, 11)
+    assert todo.created_local_date == local_dates.moment_day(todo.created_at, "Pacific/Kiritimati")
+    assert client.get("/dashboard/stats", headers=auth_headers).json()["todo_stats"]["total"] == 1
+
+
+def test_streaks_are_current_against_each_owners_today(client, db, test_user):
+    other = User(email="other@example.com", username="other")
+    db.add(other)
+    db.commit()
+    habits = [Habit(name="Walk", description="", owner_id=owner.id) for owner in (test_user, other)]
+    db.add_all(habits)
+    db.commit()
+    for habit in habits:
+        for day in (date(2025, 3, 9), date(2025, 3, 10)):
+            db.add(HabitEntry(habit_id=habit.id, date=datetime.combine(day, time(12))))
+    db.commit()
+
+    # The first owner is already two days on, the second is still on the last day logged
+    todays = {test_user.id: date(2025, 3, 12), other.id: date(2025, 3, 10)}
+    rows = db.execute(streak_stats_query(todays, Habit.id.in_([habit.id for habit in habits]))).all()
+    assert sorted(rows) == [(habits[0].id, 0, 2), (habits[1].id, 2, 2)]
+
+
+def test_backfill_fills_missing_days_in_chunks(client, db, test_user):
+    test_user.timezone = "America/Los_Angeles"
+    habit = Habit(name="Stretch", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    # Written before the columns existed: no local dates
+    early = datetime(2025, 3, 10, 3, 0)  # UTC; the evening before in Los Angeles
+    db.execute(insert(HabitEntry), [
+        {"habit_id": habit.id, "date": early + timedelta(days=n), "completed_count": 1} for n in range(5)
+    ])
+    db.execute(insert(Todo), [
+        {"title": str(n), "description": "", "owner_id": test_user.id, "created_at": early,
+         "completed_at": early + timedelta(hours=12) if n % 2 else None} for n in range(3)
+    ])
+    db.execute(insert(PomodoroSession), [{"title": "Focus", "owner_id": test_user.id, "created_at": early}])
+    db.commit()
+
+    filled = backfill_local_dates(db.get_bind(), chunk_size=2)
+    assert filled == {
+        "habit_entries.local_date": 5,
+        "todos.created_local_date": 3,
+        "todos.completed_local_date": 1,
+        "todo_occurrences.completed_local_date": 0,
+        "pomodoro_sessions.created_local_date": 1,
+    }
+    db.expire_all()
+    # Entry dates keep the day they were stored with; timestamps move to Los Angeles
+    assert [entry.local_date for entry in db.query(HabitEntry).order_by(HabitEntry.id)] == [
+        date(2025, 3, 10) + timedelta(days=n) for n in range(5)
+    ]
+    todos = db.query(Todo).order_by(Todo.id).all()
+    assert {todo.created_local_date for todo in todos} == {date(2025, 3, 9)}
+    assert [todo.completed_local_date for todo in todos] == [None, date(2025, 3, 10), None]
+    assert db.query(PomodoroSession).one().created_local_date == date(2025, 3, 9)
+
+    assert set(backfill_local_dates(db.get_bind()).values()) == {0}
+
+
+def test_rows_without_local_dates_still_count(client, db, test_user, auth_headers):
+    habit = Habit(name="Run", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    # Written before the columns existed, and not backfilled yet
+    today = local_dates.today(test_user.timezone)
+    noon = datetime.combine(today, time(12))
+    db.execute(insert(HabitEntry), [
+        {"habit_id": habit.id, "date": noon - timedelta(days=n), "completed_count": 1} for n in range(3)
+    ])
+    db.execute(insert(Todo), [{"title": "Old", "description": "", "owner_id": test_user.id, "created_at": noon,
+                               "is_completed": True, "completed_at": noon}])
+    db.execute(insert(PomodoroSession), [{"title": "Focus", "owner_id": test_user.id, "created_at": noon}])
+    db.commit()
+    assert db.query(HabitEntry).filter(HabitEntry.local_date.is_(None)).count() == 3
+
+    analytics = client.get(f"/habits/{habit.id}/analytics", headers=auth_headers).json()
+    assert analytics["total_entries"] == 3 and analytics["current_streak"] == 3
+    assert client.get("/habits/today", headers=auth_headers).json()["habits"][0]["progress"] == 1
+    entries = client.get(f"/habits/{habit.id}/entries?date_from={today - timedelta(days=1)}", headers=auth_headers)
+    assert len(entries.json()) == 2
+    stats = client.get("/dashboard/stats", headers=auth_headers).json()
+    assert stats["todo_stats"]["completed"] == 1 and stats["productivity_trend"][-1]["todos_completed"] == 1
+    assert stats["productivity_trend"][-1]["habits_completed"] == 1
+    assert len(client.get(f"/todos/?created_from={today}", headers=auth_headers).json()) == 1
+    assert client.get("/pomodoro/analytics", headers=auth_headers).json()["total_sessions"] == 1
+
+    # Any change through the ORM fills the row's days in
+    entry = db.query(HabitEntry).filter(HabitEntry.habit_id == habit.id).order_by(HabitEntry.id).first()
+    entry.notes = "Felt good"
+    db.commit()
+    assert entry.local_date == today
+
+
+def test_completing_a_todo_records_its_day(client, db, auth_headers):
+    client.put("/auth/me", headers=auth_headers, json={"timezone": "Pacific/Kiritimati"})
+    todo_id = client.post("/todos/", headers=auth_headers, json={"title": "Plan", "description": ""}).json()["id"]
+
+    response = client.put(f"/todos/{todo_id}", headers=auth_headers, json={"is_completed": True})
+    assert response.status_code == 200
+    assert response.json()["completed_at"] is not None
+    todo = db.get(Todo, todo_id)
+    assert todo.completed_local_date == local_dates.moment_day(todo.completed_at, "Pacific/Kiritimati")
+
+    client.put(f"/todos/{todo_id}", headers=auth_headers, json={"is_completed": False})
+    db.refresh(todo)
+    assert todo.completed_at is None
+    assert todo.completed_local_date is None
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive
+from app.partitions import (
+    add_months, archive_month, ensure_partitions, month_start, months_before, partition_name, restore_file,
+)
+
+
+def test_month_helpers():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name(date(2025, 3, 1)) == "habit_entries_y2025m03"
+
+
+def test_ensure_is_a_noop_without_partitioning(client, db):
+    assert ensure_partitions(db.connection()) == []
+
+
+def test_analytics_survive_archive_and_restore(client, db, test_user, auth_headers, tmp_path):
+    habit = Habit(name="Read", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    today = date.today()
+    old_days = [today - timedelta(days=n) for n in (95, 94, 94, 70)]
+    recent_days = [today - timedelta(days=n) for n in (1, 0)]
+    for day, count in zip(old_days + recent_days, (1, 2, 0, 3, 1, 1)):
+        db.add(HabitEntry(habit_id=habit.id, completed_count=count, date=datetime.combine(day, datetime.min.time())))
+    db.commit()
+
+    def analytics():
+        single = client.get(f"/habits/{habit.id}/analytics?days=120", headers=auth_headers).json()
+        dashboard = client.get(f"/dashboard/stats?start_date={today - timedelta(days=120)}", headers=auth_headers)
+        return single, dashboard.json()["habit_stats"]
+
+    before = analytics()
+    cutoff = month_start(today - timedelta(days=40))
+    conn = db.connection()
+    archived = [archive_month(conn, month, tmp_path) for month in months_before(conn, cutoff)]
+    db.commit()
+
+    assert sum(count for _, count in archived) == 4
+    assert db.query(HabitEntry).count() == 2
+    assert db.query(HabitEntryArchive).count() == 3
+    assert len(client.get(f"/habits/{habit.id}/entries", headers=auth_headers).json()) == 2
+    assert analytics() == before
+    assert before[0]["total_entries"] == 6
+    assert before[0]["completed_entries"] == 5
+
+    for path, _ in archived:
+        if path:
+            restore_file(db.connection(), path)
+    db.commit()
+
+    assert db.query(HabitEntry).count() == 6
+    assert db.query(HabitEntryArchive).count() == 0
+    assert analytics() == before
@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.models.habit import Habit
+from app.models.todo import Todo
+from app.utils.query_monitor import (
+    NPlusOneDetected, QueryMonitorMiddleware, normalize_sql, query_monitor, track_queries
+)
+
+
+def test_normalize_sql_ignores_literals_and_in_list_length():
+    first = normalize_sql("SELECT * FROM todos WHERE owner_id = 1 AND id IN (?, ?, ?)")
+    second = normalize_sql("SELECT *\n  FROM todos WHERE owner_id = 42 AND id IN (?, ?)")
+    assert first == second == "SELECT * FROM todos WHERE owner_id = ? AND id IN (?)"
+    assert normalize_sql("SELECT 'a' FROM t") == normalize_sql("SELECT 'b' FROM t")
+
+
+def test_repeated_statement_raises_in_strict_mode(client, db):
+    with track_queries() as stats:
+        for habit_id in range(query_monitor.repeat_threshold + 1):
+            db.query(Habit).filter(Habit.id == habit_id).first()
+
+    assert stats.count == query_monitor.repeat_threshold + 1
+    with pytest.raises(NPlusOneDetected):
+        query_monitor.check(stats)
+
+
+def test_repeated_statement_only_logged_outside_strict_mode(db, monkeypatch, caplog):
+    monkeypatch.setattr(query_monitor, "strict", False)
+    with track_queries() as stats:
+        for _ in range(query_monitor.repeat_threshold + 1):
+            db.execute(text("SELECT 1"))
+
+    with caplog.at_level(logging.WARNING, logger="app.queries"):
+        query_monitor.check(stats)
+    assert "Possible N+1 queries" in caplog.text
+
+
+def test_slow_query_logged_with_route_and_params(client, auth_headers, monkeypatch, caplog):
+    monkeypatch.setattr(query_monitor, "slow_query_ms", 0)
+    with caplog.at_level(logging.WARNING, logger="app.queries"):
+        response = client.get("/todos/?priority=high", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert "Slow query" in caplog.text
+    assert "GET /todos/" in caplog.text
+    assert "'high'" in caplog.text
+
+
+def test_per_item_loop_flagged_on_request(client, db, monkeypatch):
+    monkeypatch.setattr(query_monitor, "repeat_threshold", 5)
+    looped = FastAPI()
+    looped.add_middleware(QueryMonitorMiddleware)
+
+    @looped.get("/loop")
+    def loop():
+        return [db.query(Habit).filter(Habit.id == habit_id).count() for habit_id in range(7)]
+
+    with pytest.raises(NPlusOneDetected, match="GET /loop"):
+        TestClient(looped).get("/loop")
+
+
+def test_dashboard_trend_not_flagged(client, db, test_user, auth_headers, monkeypatch):
+    # The 7-day productivity trend counts each day's todos in one grouped query
+    db.add(Todo(title="Done", description="", owner_id=test_user.id, is_completed=True,
+                completed_at=datetime.now(timezone.utc)))
+    db.commit()
+    monkeypatch.setattr(query_monitor, "repeat_threshold", 5)
+    response = client.get("/dashboard/stats", headers=auth_headers)
+    assert response.status_code == 200
+    assert [day["todos_completed"] for day in response.json()["productivity_trend"]] == [0] * 6 + [1]
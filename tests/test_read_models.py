@@ -0,0 +1,49 @@
+from app.models.habit import Habit
+from app.models.todo import Todo
+from app.utils.read_models import row_class
+
+
+def test_row_class_is_slotted_and_cached():
+    cls = row_class("TodoRow", ("id", "title"))
+    row = cls(1, "Write report")
+
+    assert cls is row_class("TodoRow", ("id", "title"))
+    assert not hasattr(row, "__dict__")
+    assert row._asdict() == {"id": 1, "title": "Write report"}
+
+
+def test_todo_fields_projection(client, db, test_user, auth_headers):
+    db.add(Todo(title="Write report", description="quarterly", owner_id=test_user.id))
+    db.commit()
+
+    response = client.get("/todos/?fields=title,is_completed", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "title": "Write report", "is_completed": False}]
+
+
+def test_unknown_field_is_rejected(client, auth_headers):
+    response = client.get("/todos/?fields=title,hashed_password", headers=auth_headers)
+
+    assert response.status_code == 400
+    assert "hashed_password" in response.json()["detail"]
+
+
+def test_habit_fields_skip_entries(client, db, test_user, auth_headers):
+    db.add(Habit(name="Read", description="20 pages", owner_id=test_user.id))
+    db.commit()
+
+    projected = client.get("/habits/?fields=name", headers=auth_headers).json()
+    full = client.get("/habits/", headers=auth_headers).json()
+
+    assert projected == [{"id": full[0]["id"], "name": "Read"}]
+    assert full[0]["entries"] == []
+    assert client.get("/habits/?fields=entries", headers=auth_headers).status_code == 400
+
+
+def test_read_models_benchmark_paths_agree():
+    from benchmarks.read_models import run
+
+    results = run(rows=50, iterations=2)
+    assert set(results["meta"]["fields"]) == {"id", "title", "is_completed"}
+    assert results["fields"]["peak_kib"] < results["orm"]["peak_kib"]
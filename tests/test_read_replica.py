@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.database
+from app.database import Base
+from app.models.todo import Todo
+from app.models.user import User
+from app.utils.read_routing import primary_pins
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch, client, test_user):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    ReplicaSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(app.database, "ReadSessionLocal", ReplicaSession)
+    primary_pins.clear()
+    with ReplicaSession() as session:
+        session.add(User(id=test_user.id, email=test_user.email))
+        session.add(Todo(title="Replica todo", description="", owner_id=test_user.id))
+        session.commit()
+    yield ReplicaSession
+    primary_pins.clear()
+    engine.dispose()
+
+
+def titles(client, headers):
+    return [todo["title"] for todo in client.get("/todos/", headers=headers).json()]
+
+
+def test_list_reads_from_replica(client, replica, auth_headers):
+    assert titles(client, auth_headers) == ["Replica todo"]
+
+
+def test_writer_is_pinned_to_primary(client, replica, auth_headers):
+    client.post("/todos/", json={"title": "Fresh todo", "description": ""}, headers=auth_headers)
+
+    assert titles(client, auth_headers) == ["Fresh todo"]
+
+    primary_pins.clear()  # the read-your-writes window has passed
+    assert titles(client, auth_headers) == ["Replica todo"]
+
+
+def test_failed_write_does_not_pin(client, replica, auth_headers):
+    response = client.put("/todos/999", json={"title": "Missing"}, headers=auth_headers)
+
+    assert response.status_code == 404
+    assert titles(client, auth_headers) == ["Replica todo"]
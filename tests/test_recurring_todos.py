@@ -0,0 +1,88 @@
+from datetime import date
+
+from app.models.todo import TodoOccurrence
+from app.utils.recurrence import occurrence_dates
+
+
+def test_occurrences_start_in_the_window_not_at_the_anchor():
+    assert list(occurrence_dates("daily", 3, date(2000, 1, 1), None, date(2025, 1, 1), date(2025, 1, 7))) == [
+        date(2025, 1, 1), date(2025, 1, 4), date(2025, 1, 7)
+    ]
+    assert list(occurrence_dates("weekly", 2, date(2025, 1, 6), date(2025, 2, 1), date(2025, 1, 1), date(2025, 3, 1))) == [
+        date(2025, 1, 6), date(2025, 1, 20)
+    ]
+    # The 31st clamps to shorter months
+    assert list(occurrence_dates("monthly", 1, date(2024, 1, 31), None, date(2025, 1, 15), date(2025, 4, 30))) == [
+        date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)
+    ]
+
+
+def create_series(client, headers, **rule):
+    body = {"title": "Water plants", "description": "", "due_date": "2025-01-01T09:00:00", **rule}
+    return client.post("/todos/", json=body, headers=headers).json()
+
+
+def window(client, headers, start, end, **params):
+    query = "&".join(f"{k}={v}" for k, v in dict(due_date_from=start, due_date_to=end, **params).items())
+    return client.get(f"/todos/?{query}", headers=headers)
+
+
+def test_window_expands_series_and_merges_one_off_todos(client, auth_headers):
+    series = create_series(client, auth_headers, recurrence="weekly")
+    client.post("/todos/", json={"title": "Dentist", "description": "", "due_date": "2025-03-05T12:00:00"},
+                headers=auth_headers)
+
+    response = window(client, auth_headers, "2025-03-01", "2025-03-14", sort_by="due_date", sort_order="asc")
+
+    assert response.status_code == 200
+    items = response.json()
+    assert [(item["title"], item["occurrence_date"]) for item in items] == [
+        ("Water plants", "2025-03-05"), ("Dentist", None), ("Water plants", "2025-03-12"),
+    ]
+    assert items[0]["id"] == series["id"] and items[0]["due_date"] == "2025-03-05T09:00:00"
+    assert window(client, auth_headers, "2025-01-01", "2026-06-01").status_code == 400
+
+
+def test_only_completed_or_edited_occurrences_are_stored(client, db, auth_headers):
+    series = create_series(client, auth_headers, recurrence="daily", recurrence_interval=2)
+    url = f"/todos/{series['id']}/occurrences"
+
+    # Every other day from 2025-01-01 lands on even days in March
+    assert client.put(f"{url}/2025-03-03", json={"is_completed": True}, headers=auth_headers).status_code == 404
+    done = client.put(f"{url}/2025-03-02", json={"is_completed": True}, headers=auth_headers).json()
+    client.put(f"{url}/2025-03-04", json={"title": "Water the ferns"}, headers=auth_headers)
+
+    assert done["is_completed"] and done["completed_at"] and done["occurrence_date"] == "2025-03-02"
+    assert db.query(TodoOccurrence).count() == 2
+    items = window(client, auth_headers, "2025-03-01", "2025-03-07", sort_by="due_date", sort_order="asc").json()
+    assert [(item["title"], item["is_completed"]) for item in items] == [
+        ("Water plants", True), ("Water the ferns", False), ("Water plants", False),
+    ]
+    assert len(window(client, auth_headers, "2025-03-01", "2025-03-07", completed="true").json()) == 1
+
+    # Undoing the completion leaves nothing to store
+    client.put(f"{url}/2025-03-02", json={"is_completed": False}, headers=auth_headers)
+    db.expire_all()
+    assert db.query(TodoOccurrence).count() == 1
+
+
+def test_dashboard_counts_occurrences_in_range(client, auth_headers):
+    series = create_series(client, auth_headers, recurrence="daily")
+    client.put(f"/todos/{series['id']}/occurrences/2025-03-10", json={"is_completed": True}, headers=auth_headers)
+
+    stats = client.get("/dashboard/stats?start_date=2025-03-01&end_date=2025-03-10", headers=auth_headers).json()
+
+    assert stats["todo_stats"]["total"] == 10
+    assert stats["todo_stats"]["completed"] == 1
+    for start, end in (("2015-01-01", "2025-01-01"), ("2025-03-10", "2025-03-01")):
+        response = client.get(f"/dashboard/stats?start_date={start}&end_date={end}", headers=auth_headers)
+        assert response.status_code == 400
+
+
+def test_null_interval_rejected_on_update(client, auth_headers):
+    series = create_series(client, auth_headers, recurrence="weekly", recurrence_interval=2)
+    url = f"/todos/{series['id']}"
+
+    assert client.put(url, json={"recurrence_interval": None}, headers=auth_headers).status_code == 422
+    response = client.put(url, json={"title": "Water the garden"}, headers=auth_headers)
+    assert response.status_code == 200 and response.json()["recurrence_interval"] == 2
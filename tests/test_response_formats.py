@@ -0,0 +1,79 @@
+import msgpack
+
+from app.utils import negotiation
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+def create(client, headers, title, **body):
+    return client.post("/todos/", json={"title": title, "description": "", **body}, headers=headers).json()
+
+
+def both(client, headers, url):
+    as_json = client.get(url, headers=headers)
+    as_msgpack = client.get(url, headers={**headers, **MSGPACK})
+    assert as_json.status_code == as_msgpack.status_code == 200
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    for response in (as_json, as_msgpack):
+        assert "Accept" in response.headers["vary"].split(", ")
+    return as_json.json(), as_msgpack.content
+
+
+def test_todo_list_is_columnar_msgpack(client, auth_headers):
+    for n in range(3):
+        create(client, auth_headers, f"todo {n}", category="work", due_date="2025-01-01T09:00:00")
+
+    as_json, body = both(client, auth_headers, "/todos/?sort_by=title&sort_order=asc")
+    assert negotiation.unpackb(body) == as_json
+
+    # The page is one columnar value, not a list of maps
+    packed = msgpack.unpackb(body)
+    assert packed.code == negotiation.COLUMNAR_EXT
+    keys, *columns = msgpack.unpackb(packed.data)
+    assert columns[keys.index("title")] == ["todo 0", "todo 1", "todo 2"]
+
+    as_json, body = both(client, auth_headers, "/todos/?fields=title&due_date_from=2025-01-01&due_date_to=2025-01-31")
+    assert negotiation.unpackb(body) == as_json
+
+
+def test_entries_and_dashboard_negotiate(client, auth_headers):
+    habit = client.post("/habits/", json={"name": "read", "description": ""}, headers=auth_headers).json()
+    for day in ("2025-01-01", "2025-01-02"):
+        client.post(f"/habits/{habit['id']}/entries", json={"date": f"{day}T08:00:00"}, headers=auth_headers)
+
+    for url in (f"/habits/{habit['id']}/entries", "/dashboard/stats?start_date=2024-12-25&end_date=2025-01-05"):
+        as_json, body = both(client, auth_headers, url)
+        assert negotiation.unpackb(body) == as_json
+
+
+def test_accept_header_preferences():
+    def pick(accept):
+        return negotiation.response_format(type("Request", (), {"headers": {"accept": accept}})())
+
+    assert pick(None) == negotiation.JSON
+    assert pick("*/*") == negotiation.JSON
+    assert pick("application/x-msgpack") == negotiation.MSGPACK
+    assert pick("application/json;q=0.5, application/msgpack") == negotiation.MSGPACK
+    assert pick("application/msgpack;q=0.5, application/json") == negotiation.JSON
+    assert pick("application/msgpack;q=0") == negotiation.JSON
+
+
+def test_large_responses_are_gzipped(client, auth_headers):
+    create(client, auth_headers, "only one")
+    small = client.get("/todos/", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    for n in range(20):
+        create(client, auth_headers, f"todo {n}", description="Synthetic description. " * 5)
+    for headers in ({}, MSGPACK):
+        large = client.get("/todos/", headers={**auth_headers, **headers, "Accept-Encoding": "gzip"})
+        assert large.headers["content-encoding"] == "gzip"
+        assert len(large.content) > 1024
+
+
+def test_response_format_benchmark_runs():
+    from benchmarks.response_formats import run
+
+    results = run(rows=50, iterations=2)
+    assert results["msgpack"]["bytes"] < results["json"]["bytes"]
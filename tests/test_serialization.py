@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime
+from app.models.habit import Habit
+from app.models.todo import Todo
+from app.schemas.habit import Habit as HabitSchema
+from app.schemas.todo import Todo as TodoSchema
+from app.utils.serialization import ListSerializer
+
+
+def test_list_serializer_rejects_non_column_fields():
+    # Habit.entries is a relationship, not a column
+    with pytest.raises(ValueError):
+        ListSerializer(Habit, HabitSchema)
+
+
+def test_todo_list_matches_schema(client, db, test_user, auth_headers):
+    due = datetime(2030, 1, 2, 9, 30)
+    db.add(Todo(title="Write report", description="quarterly", priority="high",
+                category="work", due_date=due, owner_id=test_user.id))
+    db.commit()
+
+    response = client.get("/todos/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    [todo] = response.json()
+    assert set(todo) == set(TodoSchema.model_fields)
+    assert todo["title"] == "Write report"
+    assert todo["due_date"] == due.isoformat()
+    assert todo["is_completed"] is False
+
+
+def test_admin_lists_use_column_schemas(client, db, test_user, auth_headers):
+    test_user.is_admin = True
+    db.add(Habit(name="Read", description="20 pages", owner_id=test_user.id))
+    db.commit()
+
+    users = client.get("/admin/users", headers=auth_headers).json()
+    habits = client.get("/admin/habits", headers=auth_headers).json()
+
+    assert [u["email"] for u in users] == ["test@example.com"]
+    assert "hashed_password" not in users[0]
+    assert habits[0]["name"] == "Read"
+    assert "entries" not in habits[0]
+
+
+def test_serialization_benchmark_paths_agree():
+    from benchmarks.serialization import run
+
+    results = run(rows=20, iterations=5)
+    assert results["old_path"]["count"] == results["new_path"]["count"] == 5
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.habit import Habit
+from app.models.todo import Todo
+from app.models.user import User
+from app.sharding import move_user, shard_router
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch, client):
+    engines = [
+        create_engine(f"sqlite:///{tmp_path / f'shard{n}.db'}", connect_args={"check_same_thread": False})
+        for n in range(2)
+    ]
+    for engine in engines:
+        Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(shard_router, "engines", engines)
+    monkeypatch.setattr(shard_router, "_mirrored", set())
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+def shard_titles(engine, owner_id=None):
+    with Session(bind=engine) as session:
+        query = session.query(Todo.title).order_by(Todo.title)
+        if owner_id is not None:
+            query = query.filter(Todo.owner_id == owner_id)
+        return [title for title, in query]
+
+
+@pytest.fixture
+def other_user(db, shards):
+    user = User(email="other@example.com", username="other", is_verified=True, shard_id=1)
+    db.add(user)
+    db.commit()
+    shard_router.ensure_mirrored(1, user)
+    with Session(bind=shards[1]) as session:
+        session.add_all(Todo(title=title, description="", owner_id=user.id) for title in ("b", "d", "f"))
+        session.commit()
+    return user
+
+
+def test_new_users_get_a_shard(db, shards):
+    user = User(email="someone@example.com")
+    db.add(user)
+    db.commit()
+
+    assert user.shard_id == shard_router.shard_for_new_user("someone@example.com")
+    assert user.shard_id in (0, 1)
+
+
+def test_requests_use_the_users_shard(client, db, shards, test_user, auth_headers):
+    test_user.shard_id = 1
+    db.commit()
+
+    client.post("/todos/", json={"title": "Sharded", "description": ""}, headers=auth_headers)
+
+    assert shard_titles(shards[1]) == ["Sharded"]
+    assert shard_titles(shards[0]) == []
+    assert [t["title"] for t in client.get("/todos/", headers=auth_headers).json()] == ["Sharded"]
+
+
+def test_admin_lists_merge_shards(client, db, shards, test_user, auth_headers, other_user):
+    test_user.is_admin = True
+    test_user.shard_id = 0
+    db.commit()
+    shard_router.ensure_mirrored(0, test_user)
+    with Session(bind=shards[0]) as session:
+        session.add_all(Todo(title=title, description="", owner_id=test_user.id) for title in ("a", "c", "e"))
+        session.commit()
+
+    page = client.get("/admin/todos?sort_by=title&sort_order=asc&skip=1&limit=3", headers=auth_headers).json()
+    stats = client.get("/admin/dashboard", headers=auth_headers).json()
+
+    assert [todo["title"] for todo in page] == ["b", "c", "d"]
+    assert stats["todo_stats"]["total_todos"] == 6
+    assert client.get("/admin/todos?sort_by=owner", headers=auth_headers).status_code == 400
+
+
+def test_move_user_between_shards(db, shards, other_user):
+    moved = move_user(other_user.id, 0)
+    db.refresh(other_user)
+
+    assert moved["todos"] == 3
+    assert other_user.shard_id == 0
+    assert other_user.is_active
+    assert shard_titles(shards[0], other_user.id) == ["b", "d", "f"]
+    assert shard_titles(shards[1], other_user.id) == []
+
+
+def test_move_user_refuses_when_sharding_is_disabled(client, db, monkeypatch, test_user):
+    monkeypatch.setattr(shard_router, "engines", [])
+    db.add(Habit(name="Read", description="", owner_id=test_user.id))
+    db.commit()
+
+    with pytest.raises(ValueError):
+        move_user(test_user.id, 1)
+
+    assert db.query(Habit).filter(Habit.owner_id == test_user.id).count() == 1
+
+
+def test_move_user_refuses_between_shards_on_the_same_database(db, shards, monkeypatch, other_user):
+    monkeypatch.setattr(shard_router, "engines", [shards[1], shards[1]])
+
+    with pytest.raises(ValueError):
+        move_user(other_user.id, 0)
+
+    db.refresh(other_user)
+    assert other_user.shard_id == 1
+    assert other_user.is_active
+    assert shard_titles(shards[1], other_user.id) == ["b", "d", "f"]
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app.models.habit import Habit
+from app.models.todo import Todo
+from app.routers import admin, habits, pomodoro, todos
+from app.utils.sorting import ListQuery, equals, supporting_index
+from tests.conftest import engine
+
+
+def create(client, headers, title, **body):
+    return client.post("/todos/", json={"title": title, "description": "", **body}, headers=headers).json()
+
+
+def titles(client, headers, url, **params):
+    response = client.get(url, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["title"] for item in response.json()]
+
+
+def test_sorts_are_whitelisted_and_stable(client, auth_headers):
+    for title in ["b", "a", "b"]:
+        create(client, auth_headers, title)
+
+    page = client.get("/todos/?sort_by=title&sort_order=asc", headers=auth_headers).json()
+    assert [todo["title"] for todo in page] == ["a", "b", "b"]
+    assert page[1]["id"] < page[2]["id"]  # ties broken by id in the same direction
+
+    for url in ["/todos/?sort_by=description", "/todos/?sort_by=owner", "/habits/?sort_by=frequency",
+                "/pomodoro/?sort_by=duration"]:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 400
+        assert "Allowed:" in response.json()["detail"]
+
+
+def test_unindexed_combination_is_rejected(client, db, test_user, auth_headers):
+    test_user.is_admin = True
+    db.commit()
+    create(client, auth_headers, "later", due_date="2025-02-01T09:00:00")
+    create(client, auth_headers, "sooner", due_date="2025-01-01T09:00:00")
+
+    response = client.get("/admin/todos?sort_by=due_date", headers=auth_headers)
+    assert response.status_code == 400
+    assert "user_id" in response.json()["detail"]
+    assert titles(client, auth_headers, "/admin/todos", sort_by="due_date", sort_order="asc",
+                  user_id=test_user.id) == ["sooner", "later"]
+
+
+def test_same_shape_issues_the_same_sql(client, auth_headers):
+    create(client, auth_headers, "write report", category="work", due_date="2025-01-01T09:00:00")
+    create(client, auth_headers, "buy milk", category="home")
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert titles(client, auth_headers, "/todos/", category="work", search="report",
+                      created_from="2000-01-01") == ["write report"]
+        assert titles(client, auth_headers, "/todos/", category="home", search="milk",
+                      created_from="2001-01-01") == ["buy milk"]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    lists = [statement for statement in statements if "FROM todos" in statement and "ORDER BY" in statement]
+    assert len(lists) == 2 and lists[0] == lists[1]
+    assert "report" not in lists[0] and "work" not in lists[0]
+
+
+def test_every_declared_sort_has_an_index():
+    assert todos.todo_lists.index_for({"owner_id": 1}, "created_at") == "ix_todos_owner_id_created_at"
+    assert todos.todo_lists.index_for({"owner_id": 1}, "rank") == "ix_todos_owner_id_rank"
+    assert admin.todo_lists.index_for({}, "title") == "ix_todos_title"
+    assert admin.todo_lists.index_for({}, "due_date") is None
+    assert admin.user_lists.index_for({}, "email") == "ix_users_email"
+    assert habits.entry_lists.index_for({"habit_id": 1}, "date") == "ix_habit_entries_habit_id_date"
+    assert pomodoro.pomodoro_lists.index_for({"owner_id": 1}, "created_at") == \
+        "ix_pomodoro_sessions_owner_id_created_at"
+
+    # A plain btree gives ASC NULLS LAST forwards and DESC NULLS FIRST backwards
+    todo_table = Todo.__table__
+    assert supporting_index(todo_table, "created_at", frozenset(), True, nulls_first=True) == "ix_todos_created_at"
+    assert supporting_index(todo_table, "created_at", frozenset(), False, nulls_first=False) == "ix_todos_created_at"
+    assert supporting_index(todo_table, "created_at", frozenset(), True, nulls_first=False) is None
+    declared = Table("declared", MetaData(), Column("id", Integer, primary_key=True), Column("at", DateTime))
+    Index("ix_declared_at", declared.c.at.desc().nulls_last(), declared.c.id.desc().nulls_last())
+    assert supporting_index(declared, "at", frozenset(), True, nulls_first=False) == "ix_declared_at"
+    assert supporting_index(declared, "at", frozenset(), True, nulls_first=True) is None
+
+    with pytest.raises(ValueError):
+        ListQuery(Habit, {"owner_id": equals(Habit.owner_id)}, sorts=("frequency",))
+    with pytest.raises(ValueError):
+        ListQuery(Todo, {}, sorts=("due_date",))
+
+
+def test_admin_lists_order_nulls_as_their_index_does():
+    for lists, sort_by in ((admin.todo_lists, "created_at"), (admin.habit_lists, "created_at")):
+        for sort_order, nulls in (("desc", "DESC NULLS FIRST"), ("asc", "ASC NULLS LAST")):
+            query = lists.apply(Query(lists.model), {}, sort_by, sort_order, explicit_nulls=True)
+            sql = str(query.statement.compile(dialect=postgresql.dialect()))
+            assert f"{sort_by} {nulls}, " in sql and sql.endswith(f"id {nulls}")
@@ -0,0 +1,45 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time allowed for app.main, in milliseconds
+IMPORT_TIME_BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+# Modules that only some requests need and must be loaded on first use
+LAZY_MODULES = ["qrcode", "PIL", "fastapi_mail", "google.auth.transport.requests", "redis", "celery", "numpy"]
+
+
+def _import_app(tmp_path, code):
+    database = tmp_path / "startup.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return result, database
+
+
+def test_import_app_is_side_effect_free(tmp_path):
+    code = (
+        "import sys, app.main; "
+        f"print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    )
+    result, database = _import_app(tmp_path, code)
+
+    assert result.stdout.strip() == "[]"
+    # No connection is opened, so SQLite never creates the database file
+    assert not database.exists()
+
+
+def test_import_time_within_budget(tmp_path):
+    result, _ = _import_app(tmp_path, "import app.main")
+
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", result.stderr, re.MULTILINE)
+    assert match, "app.main missing from -X importtime output"
+    cumulative_ms = int(match.group(1)) / 1000
+    print(f"app.main import: {cumulative_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS} ms)")
+    assert cumulative_ms < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,99 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert, literal, select
+
+from app.models.habit import Habit, HabitEntry, HabitEntryArchive
+from app.utils.streaks import period_index, period_number, reconcile_streaks, streaks_by_habit
+
+
+def add_entries(db, habit, *days_ago, today):
+    for n in days_ago:
+        db.add(HabitEntry(habit_id=habit.id, date=datetime.combine(today - timedelta(days=n), datetime.min.time())))
+
+
+def test_reconcile_streaks_in_chunks(client, db, test_user):
+    today = date(2025, 3, 10)
+    stale, lapsed, logged_yesterday, archived, empty = habits = [
+        Habit(name=name, description="", owner_id=test_user.id, streak_count=7, best_streak=7)
+        for name in ("stale", "lapsed", "yesterday", "archived", "empty")
+    ]
+    db.add_all(habits)
+    db.commit()
+    # Two entries on one day count once
+    add_entries(db, stale, 0, 0, 1, 2, 5, 6, 7, 8, today=today)
+    add_entries(db, lapsed, 3, 4, today=today)
+    add_entries(db, logged_yesterday, 1, 2, 3, today=today)
+    add_entries(db, archived, 0, today=today)
+    # Last month's days were archived; only their totals are left
+    for n in (1, 2, 3, 40):
+        db.add(HabitEntryArchive(habit_id=archived.id, day=today - timedelta(days=n), entry_count=1,
+                                 completed_entries=1, completed_total=1))
+    db.commit()
+
+    assert reconcile_streaks(db, chunk_size=2, today=today) == {"habits": 5, "updated": 5}
+    for habit in habits:
+        db.refresh(habit)
+    assert [(h.streak_count, h.best_streak) for h in habits] == [(3, 4), (0, 2), (3, 3), (4, 4), (0, 0)]
+
+    assert reconcile_streaks(db, chunk_size=2, today=today) == {"habits": 5, "updated": 0}
+
+
+def test_streaks_over_ten_years_of_daily_entries(client, db, test_user, auth_headers):
+    habit = Habit(name="Run", description="", owner_id=test_user.id)
+    db.add(habit)
+    db.commit()
+    today = date.today()
+    # Daily for ten years, twice on even days, missing days 1000 and 2000 ago
+    rows = [
+        {"habit_id": habit.id, "completed_count": 1, "date": datetime.combine(today - timedelta(days=n), time(hour)),
+         "local_date": today - timedelta(days=n)}
+        for n in range(3653) if n not in (1000, 2000)
+        for hour in ((8, 20) if n % 2 == 0 else (8,))
+    ]
+    db.execute(insert(HabitEntry), rows)
+    db.commit()
+
+    def streaks():
+        analytics = client.get(f"/habits/{habit.id}/analytics", headers=auth_headers).json()
+        return analytics["current_streak"], analytics["best_streak"]
+
+    assert streaks() == (1000, 1652)
+
+    # Backdating the missing day joins the two older runs
+    response = client.post(f"/habits/{habit.id}/entries", headers=auth_headers,
+                           json={"date": f"{today - timedelta(days=2000)}T12:00:00"})
+    assert response.status_code == 200
+    assert streaks() == (1000, 2652)
+    db.refresh(habit)
+    assert (habit.streak_count, habit.best_streak) == (1000, 2652)
+
+
+def test_period_numbers_match_in_sql(client, db):
+    days = [date(2023, 12, 1) + timedelta(days=n) for n in range(0, 500, 3)]
+    for frequency in ("daily", "weekly", "monthly"):
+        in_sql = [db.execute(select(period_number(literal(day), literal(frequency)))).scalar() for day in days]
+        assert in_sql == [period_index(frequency, day) for day in days]
+
+
+def test_weekly_and_monthly_streaks_count_periods(client, db, test_user):
+    today = date(2025, 3, 12)  # a Wednesday
+    weekly = Habit(name="Gym", description="", frequency="weekly", owner_id=test_user.id)
+    monthly = Habit(name="Budget", description="", frequency="monthly", owner_id=test_user.id)
+    db.add_all([weekly, monthly])
+    db.commit()
+    # This week, last week twice, the week before; then seven weeks running across the new year
+    weeks = ["2025-03-12", "2025-03-09", "2025-03-03", "2025-02-26",
+             "2025-02-10", "2025-02-03", "2025-01-27", "2025-01-20", "2025-01-13", "2025-01-06", "2024-12-30"]
+    # Last month back to December, then June to October
+    months = ["2025-02-28", "2025-01-01", "2024-12-15", "2024-10-01", "2024-09-30", "2024-08-08", "2024-07-07",
+              "2024-06-06", "2024-06-07"]
+    for habit, days in ((weekly, weeks), (monthly, months)):
+        for day in days:
+            db.add(HabitEntry(habit_id=habit.id, date=datetime.combine(date.fromisoformat(day), time(12))))
+    db.commit()
+
+    streaks = streaks_by_habit(db, Habit.owner_id == test_user.id, today=today)
+    assert streaks == {weekly.id: (3, 7), monthly.id: (3, 5)}
+    # A weekly streak survives a week with nothing logged yet, but not two
+    assert streaks_by_habit(db, Habit.id == weekly.id, today=date(2025, 3, 19))[weekly.id] == (3, 7)
+    assert streaks_by_habit(db, Habit.id == weekly.id, today=date(2025, 3, 24))[weekly.id] == (0, 7)
@@ -0,0 +1,71 @@
+from sqlalchemy import event
+
+from app.models.todo import Todo, TodoCategory
+from tests.conftest import engine
+
+
+def create(client, headers, title, **body):
+    return client.post("/todos/", json={"title": title, "description": "", **body}, headers=headers).json()
+
+
+def fetch(db, todo_id):
+    db.expire_all()
+    return db.get(Todo, todo_id)
+
+
+def test_parent_counts_follow_subtask_changes(client, db, auth_headers):
+    parent = create(client, auth_headers, "Move house")
+    other = create(client, auth_headers, "Garden")
+    boxes = create(client, auth_headers, "Buy boxes", parent_id=parent["id"])
+    create(client, auth_headers, "Book van", parent_id=parent["id"])
+
+    client.put(f"/todos/{boxes['id']}", json={"is_completed": True}, headers=auth_headers)
+    assert (fetch(db, parent["id"]).child_count, fetch(db, parent["id"]).completed_child_count) == (2, 1)
+
+    # Moving a completed subtask moves both counts
+    client.put(f"/todos/{boxes['id']}", json={"parent_id": other["id"]}, headers=auth_headers)
+    assert (fetch(db, parent["id"]).child_count, fetch(db, parent["id"]).completed_child_count) == (1, 0)
+    assert (fetch(db, other["id"]).child_count, fetch(db, other["id"]).completed_child_count) == (1, 1)
+
+    client.delete(f"/todos/{boxes['id']}", headers=auth_headers)
+    assert (fetch(db, other["id"]).child_count, fetch(db, other["id"]).completed_child_count) == (0, 0)
+
+    assert client.put(f"/todos/{parent['id']}", json={"parent_id": parent["id"]},
+                      headers=auth_headers).status_code == 400
+    assert create(client, auth_headers, "Orphan", parent_id=9999) == {"detail": "Parent todo not found"}
+
+
+def test_tree_is_one_query_and_bounded_by_depth(client, auth_headers):
+    root = create(client, auth_headers, "root")
+    parent_id = root["id"]
+    for depth in range(1, 5):
+        child = create(client, auth_headers, f"level {depth}", parent_id=parent_id)
+        parent_id = child["id"]
+    create(client, auth_headers, "sibling", parent_id=root["id"], category="work")
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        tree = client.get(f"/todos/{root['id']}/tree?max_depth=2", headers=auth_headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert sum("WITH RECURSIVE" in statement for statement in statements) == 1
+    assert tree["child_count"] == 2 and tree["progress"] == 0
+    titles = sorted(child["title"] for child in tree["children"])
+    assert titles == ["level 1", "sibling"]
+    level1 = next(child for child in tree["children"] if child["title"] == "level 1")
+    assert [c["title"] for c in level1["children"]] == ["level 2"]
+    assert level1["children"][0]["children"] == []  # cut off at max_depth
+
+
+def test_deleting_a_parent_removes_subtasks_and_their_counts(client, db, auth_headers):
+    root = create(client, auth_headers, "root")
+    create(client, auth_headers, "child", parent_id=root["id"], category="errands")
+
+    client.delete(f"/todos/{root['id']}", headers=auth_headers)
+
+    db.expire_all()
+    assert db.query(Todo).count() == 0
+    assert db.query(TodoCategory).count() == 0
@@ -0,0 +1,62 @@
+from sqlalchemy import event
+
+from app.models.todo import Todo, TodoCategory, TodoPriorityCount
+from app.utils.todo_counts import rebuild_counts
+from tests.conftest import engine
+
+
+def counts(db, model, key):
+    db.expire_all()
+    return {getattr(row, key): row.todo_count for row in db.query(model)}
+
+
+def test_counts_follow_create_update_and_delete(client, db, auth_headers):
+    create = lambda **body: client.post("/todos/", json={"title": "t", "description": "", **body},
+                                        headers=auth_headers).json()
+    work = create(category="work", priority="high")
+    create(category="work")
+    home = create(category="home")
+    create()
+
+    assert counts(db, TodoCategory, "name") == {"work": 2, "home": 1}
+    assert counts(db, TodoPriorityCount, "priority") == {"high": 1, "medium": 3}
+
+    client.put(f"/todos/{work['id']}", json={"category": "home", "priority": "low"}, headers=auth_headers)
+    client.delete(f"/todos/{home['id']}", headers=auth_headers)
+
+    assert counts(db, TodoCategory, "name") == {"work": 1, "home": 1}
+    assert counts(db, TodoPriorityCount, "priority") == {"low": 1, "medium": 2}
+    assert client.get("/todos/categories", headers=auth_headers).json() == [
+        {"name": "home", "todo_count": 1}, {"name": "work", "todo_count": 1},
+    ]
+
+
+def test_dashboard_distributions_read_the_counts(client, db, test_user, auth_headers):
+    db.add_all([Todo(title="a", description="", category="work", priority="high", owner_id=test_user.id),
+                Todo(title="b", description="", category="work", owner_id=test_user.id)])
+    db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        stats = client.get("/dashboard/stats", headers=auth_headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert stats["category_distribution"] == {"work": 2}
+    assert stats["priority_distribution"] == {"high": 1, "medium": 1}
+    assert not any("GROUP BY todos.category" in statement for statement in statements)
+
+
+def test_rebuild_counts_matches_the_hook(client, db, test_user):
+    db.add_all(Todo(title=str(n), description="", category=["a", "b", None][n % 3], owner_id=test_user.id)
+               for n in range(7))
+    db.commit()
+    maintained = counts(db, TodoCategory, "name"), counts(db, TodoPriorityCount, "priority")
+
+    with engine.begin() as conn:
+        rebuild_counts(conn)
+
+    assert (counts(db, TodoCategory, "name"), counts(db, TodoPriorityCount, "priority")) == maintained
+    assert maintained == ({"a": 3, "b": 2}, {"medium": 7})
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+from sqlalchemy import event
+
+from app.models.todo import Todo
+from app.utils import ranking
+from app.utils.ranking import evenly_spaced_keys, key_between
+from tests.conftest import engine
+
+
+def test_key_between_stays_ordered_under_random_inserts():
+    rng = random.Random(7)
+    keys = [key_between(None, None)]
+    for _ in range(2000):
+        index = rng.randint(0, len(keys))
+        before = keys[index - 1] if index else None
+        after = keys[index] if index < len(keys) else None
+        keys.insert(index, key_between(before, after))
+
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    with pytest.raises(ValueError):
+        key_between("b", "a")
+
+
+def test_keys_at_the_ends_grow_slowly():
+    keys = [key_between(None, None)]
+    for _ in range(1000):
+        keys.insert(0, key_between(None, keys[0]))
+        keys.append(key_between(keys[-1], None))
+
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+    assert max(map(len, keys)) <= 4
+    assert key_between(None, "h5") == "h" and key_between(None, "1") == "0z"
+    assert key_between("z", None) == "z1"
+
+
+def test_evenly_spaced_keys_are_short_and_ordered():
+    keys = evenly_spaced_keys(1000)
+    assert keys == sorted(keys) and len(set(keys)) == 1000
+    assert max(map(len, keys)) <= 3
+    assert not any(key.endswith("0") for key in keys)
+
+
+def create(client, headers, title):
+    return client.post("/todos/", json={"title": title, "description": ""}, headers=headers).json()
+
+
+def manual_order(client, headers):
+    return [todo["title"] for todo in client.get("/todos/?sort_by=rank&sort_order=asc", headers=headers).json()]
+
+
+def test_move_updates_only_the_moved_row(client, auth_headers):
+    todos = {title: create(client, auth_headers, title) for title in "cba"}
+    assert manual_order(client, auth_headers) == ["a", "b", "c"]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.post(f"/todos/{todos['a']['id']}/move", json={"after_id": todos["c"]["id"]},
+                               headers=auth_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert manual_order(client, auth_headers) == ["b", "c", "a"]
+    updates = [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+    assert len(updates) == 1
+
+    client.post(f"/todos/{todos['a']['id']}/move", json={"before_id": todos["b"]["id"]}, headers=auth_headers)
+    client.post(f"/todos/{todos['c']['id']}/move",
+                json={"after_id": todos["a"]["id"], "before_id": todos["b"]["id"]}, headers=auth_headers)
+    assert manual_order(client, auth_headers) == ["a", "c", "b"]
+
+
+def test_move_rejects_bad_neighbours(client, auth_headers):
+    first, second = create(client, auth_headers, "first"), create(client, auth_headers, "second")
+    move = lambda body: client.post(f"/todos/{first['id']}/move", json=body, headers=auth_headers)
+
+    assert move({}).status_code == 400
+    assert move({"after_id": first["id"]}).status_code == 400
+    assert move({"after_id": 9999}).status_code == 404
+    other = create(client, auth_headers, "third")
+    assert move({"after_id": second["id"], "before_id": other["id"]}).status_code == 409
+
+
+def test_long_keys_are_rebalanced_in_background(client, db, auth_headers, monkeypatch):
+    monkeypatch.setattr(ranking, "MAX_KEY_LENGTH", 3)
+    top, bottom = create(client, auth_headers, "top"), create(client, auth_headers, "bottom")
+    moving = create(client, auth_headers, "moving")
+
+    # Keep moving into the same gap until the key passes the limit
+    for _ in range(10):
+        client.post(f"/todos/{moving['id']}/move", json={"after_id": bottom["id"], "before_id": top["id"]},
+                    headers=auth_headers)
+        client.post(f"/todos/{moving['id']}/move", json={"after_id": top["id"]}, headers=auth_headers)
+
+    db.expire_all()
+    ranks = [todo.rank for todo in db.query(Todo).order_by(Todo.rank)]
+    assert max(map(len, ranks)) <= 3
+    assert manual_order(client, auth_headers) == ["bottom", "top", "moving"]
+
+
+def test_move_between_equal_ranks_respaces_in_background(client, db, auth_headers):
+    first, second, third = (create(client, auth_headers, title) for title in ("first", "second", "third"))
+    # Two concurrent moves left the same key on two rows
+    db.query(Todo).filter(Todo.id == second["id"]).update({"rank": first["rank"]})
+    db.commit()
+
+    move = {"after_id": first["id"], "before_id": second["id"]}
+    response = client.post(f"/todos/{third['id']}/move", json=move, headers=auth_headers)
+    assert response.status_code == 409
+
+    db.expire_all()
+    assert len({todo.rank for todo in db.query(Todo)}) == 3
+    assert manual_order(client, auth_headers) == ["third", "first", "second"]
+    response = client.post(f"/todos/{third['id']}/move", json=move, headers=auth_headers)
+    assert response.status_code == 200
+    assert manual_order(client, auth_headers) == ["first", "third", "second"]
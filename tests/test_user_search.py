@@ -0,0 +1,57 @@
+from app.models.user import User
+
+
+def search(client, headers, term, **params):
+    response = client.get("/admin/users", params={"search": term, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [user["email"] for user in response.json()]
+
+
+def make_admin_with_users(db, test_user):
+    test_user.is_admin = True
+    db.add_all([
+        User(email="rosa.smith@example.com", username="rossmith", full_name="Rosa Smith"),
+        User(email="ann@example.com", username="ann", full_name="Ann Rose"),
+        User(email="prose100%@example.com", username="prose", full_name=None),
+    ])
+    db.commit()
+
+
+def test_search_ranks_exact_then_prefix_then_substring(client, db, test_user, auth_headers):
+    make_admin_with_users(db, test_user)
+
+    assert search(client, auth_headers, "ROS") == ["rosa.smith@example.com", "ann@example.com",
+                                                   "prose100%@example.com"]
+    assert search(client, auth_headers, "ann") == ["ann@example.com"]
+
+
+def test_short_terms_match_prefixes_only(client, db, test_user, auth_headers):
+    make_admin_with_users(db, test_user)
+
+    assert search(client, auth_headers, "an") == ["ann@example.com"]
+    assert search(client, auth_headers, "nn") == []
+
+
+def test_like_wildcards_are_literal(client, db, test_user, auth_headers):
+    make_admin_with_users(db, test_user)
+
+    assert search(client, auth_headers, "100%") == ["prose100%@example.com"]
+    assert search(client, auth_headers, "%") == []
+    # Two characters however long they are escaped: a prefix, not a substring
+    assert search(client, auth_headers, "0%") == []
+
+
+def test_relevance_sort_needs_a_search_term(client, db, test_user, auth_headers):
+    make_admin_with_users(db, test_user)
+
+    response = client.get("/admin/users?sort_by=relevance", headers=auth_headers)
+    assert response.status_code == 400
+    assert search(client, auth_headers, "example", sort_by="email", sort_order="asc")[0] == "ann@example.com"
+
+
+def test_user_search_benchmark_runs():
+    from benchmarks.user_search import run
+
+    results = run(users=200, iterations=1, database_url="sqlite://")
+    assert results["terms"]["smith"]["old"]["matches"] > 0
+    assert results["terms"]["qxzv"]["new"]["matches"] == 0